@@ -0,0 +1,141 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import typer
+from data_store import ElectionDataStore
+from schema import normalize_election_frame, report_failures
+
+# uv run analytics.py (出力ファイル) と入力すると、全市町村・全選挙の指標を CSV（.feather の場合は列指向ファイル）に出力します
+
+MERGED_DIR = Path(__file__).parent / "data" / "merged_output"
+
+# 投票率の移動平均に使う選挙の回数（その回を含む直近の回数）
+ROLLING_WINDOW = 3
+
+# 選挙を識別する列
+KEY_COLUMNS = ['municipality_code', 'vote_type']
+
+# 指標の表の列（元の列の一部と、派生した指標）
+INDICATOR_COLUMNS = [
+    'municipality_code', 'vote_type', 'year', 'vote_date',
+    'turnout_rate', 'previous_turnout_rate', 'total_voters', 'fixed_seats', 'candidate_count',
+    'turnout_change', 'turnout_rolling_mean', 'candidates_per_seat', 'contested', 'female_ratio',
+    'voters_change_rate',
+]
+
+def group_starts(df):
+    """
+    市町村・選挙種別の順に並んだ表について、各行が属するグループの先頭の行番号を返す
+    """
+    codes = df['municipality_code'].astype(str).to_numpy()
+    vote_types = df['vote_type'].astype(str).to_numpy()
+    first = np.ones(len(df), dtype=bool)
+    first[1:] = (codes[1:] != codes[:-1]) | (vote_types[1:] != vote_types[:-1])
+    return np.maximum.accumulate(np.where(first, np.arange(len(df)), 0))
+
+def shift_within_groups(values, starts):
+    """各行の1つ前の行の値を返す（グループの先頭の行はNaN）"""
+    shifted = np.empty_like(values)
+    shifted[0:1] = np.nan
+    shifted[1:] = values[:-1]
+    shifted[starts == np.arange(len(values))] = np.nan
+    return shifted
+
+def rolling_group_mean(values, starts, window):
+    """
+    グループ内の直近 window 行の平均を返す（NaNの行は除き、値が1つも無ければNaN）
+
+    累積和の差で計算するため、グループ数によらず配列演算だけで済む（groupby().rolling() はグループごとに処理する）。
+    """
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    positions = np.arange(len(values))
+    window_starts = np.maximum(positions - window + 1, starts)
+    total = sums[positions + 1] - sums[window_starts]
+    count = counts[positions + 1] - counts[window_starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+def build_indicators(combined, window=ROLLING_WINDOW):
+    """
+    全市町村・全選挙の派生指標を、市町村・選挙種別ごとのグループ演算でまとめて計算する
+
+    - turnout_change: 前回からの投票率の変化（ポイント）。整理済みの前回投票率を使い、無ければ同じ市町村・
+      選挙種別の直前の選挙の投票率を使う
+    - turnout_rolling_mean: 直近 window 回の選挙の投票率の平均（無投票の回は除く）
+    - candidates_per_seat: 定数1あたりの候補者数（競争率）。contested は候補者数が定数を超えるか
+    - female_ratio: 有権者に占める女性の割合（男女別の人数が無い場合はNaN）
+    - voters_change_rate: 直前の選挙からの有権者数の増減率
+
+    Parameters:
+    -----------
+    combined : pandas.DataFrame or None
+        ElectionDataStore.combined() の結果
+    window : int
+        移動平均に使う選挙の回数
+
+    Returns:
+    --------
+    pandas.DataFrame
+        INDICATOR_COLUMNS の列を持ち、市町村・選挙種別・投票日の順に並んだ表
+    """
+    if combined is None or len(combined) == 0:
+        return pd.DataFrame(columns=INDICATOR_COLUMNS)
+
+    df = combined.sort_values(KEY_COLUMNS + ['vote_date'], kind='stable').reset_index(drop=True)
+    starts = group_starts(df)
+
+    # 投票率はfloat32で保持しているため、float64に変換した際の端数（72.18000030...）を丸めてから計算する
+    turnout = df['turnout_rate'].astype('float64').round(4).to_numpy(na_value=np.nan)
+    previous = df['previous_turnout_rate'].astype('float64').round(4).to_numpy(na_value=np.nan)
+    previous = np.where(np.isnan(previous), shift_within_groups(turnout, starts), previous)
+
+    seats = df['fixed_seats'].astype('float64').to_numpy(na_value=np.nan)
+    candidates = df['candidate_count'].astype('float64').to_numpy(na_value=np.nan)
+    male = df['male_voters'].astype('float64').to_numpy(na_value=np.nan)
+    female = df['female_voters'].astype('float64').to_numpy(na_value=np.nan)
+    voters = df['total_voters'].astype('float64').to_numpy(na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        candidates_per_seat = np.where(seats > 0, candidates / seats, np.nan)
+        female_ratio = np.where(male + female > 0, female / (male + female), np.nan)
+        voters_change_rate = voters / shift_within_groups(voters, starts) - 1
+
+    result = df.reindex(columns=INDICATOR_COLUMNS[:9]).copy()
+    result['turnout_change'] = turnout - previous
+    result['turnout_rolling_mean'] = rolling_group_mean(turnout, starts, window)
+    result['candidates_per_seat'] = candidates_per_seat
+    result['contested'] = pd.array(candidates > seats, dtype='boolean')
+    result.loc[np.isnan(candidates) | np.isnan(seats), 'contested'] = pd.NA
+    result['female_ratio'] = female_ratio
+    result['voters_change_rate'] = voters_change_rate
+    return result
+
+def load_combined(data_dir=MERGED_DIR):
+    """統合済みのデータ（列指向ファイル、無ければ統合済みCSV）をすべて読み込み、1つの表にして返す"""
+    def load(municipality_code, vote_type):
+        return pd.read_csv(Path(data_dir) / f"{municipality_code}_{vote_type}_merged.csv")
+
+    def process(df):
+        typed, failures = normalize_election_frame(df)
+        report_failures(failures, "統合済みCSV")
+        return typed
+
+    store = ElectionDataStore(data_dir, load, process, columnar_path=Path(data_dir) / "elections.feather")
+    return store.combined()
+
+def main(output: str, directory: str = str(MERGED_DIR), window: int = ROLLING_WINDOW):
+    """
+    全市町村・全選挙の指標を計算してファイルに出力する（拡張子が .feather の場合は列指向ファイル）
+    """
+    indicators = build_indicators(load_combined(directory), window)
+    output_path = Path(output)
+    if output_path.suffix == ".feather":
+        indicators.to_feather(output_path)
+    else:
+        indicators.to_csv(output_path, index=False, encoding='utf-8-sig')
+    print(f"✓ 指標を出力しました: {output_path} ({len(indicators)} 選挙 / "
+          f"{indicators['municipality_code'].nunique()} 市町村 / 無投票 {int(indicators['contested'].eq(False).sum())} 件)")
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,34 +1,23 @@
 from shiny import App, reactive, render, ui
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
 from pathlib import Path
-import warnings
-
-# matplotlibの警告を抑制
-warnings.filterwarnings('ignore', category=UserWarning, module='matplotlib')
-
-# 日本語フォントの設定
-try:
-    import japanize_matplotlib
-except ImportError:
-    # japanize_matplotlibがない場合は手動でフォント設定
-    # DejaVu Sansを除外し、日本語対応フォントのみを指定
-    plt.rcParams['font.sans-serif'] = ['Hiragino Sans', 'Yu Gothic', 'Meiryo', 'MS Gothic', 'Arial Unicode MS', 'sans-serif']
-    plt.rcParams['axes.unicode_minus'] = False  # マイナス記号の文字化け対策
-
-# 市町村データとコードのマッピング
-municipalities_mapping = {
-    "null": "選択なし", "oosk": "大阪市", "ski": "堺市", "tynk": "豊中市", "suita": "吹田市", "tktk": "高槻市",
-    "hrkt": "枚方市", "yo": "八尾市", "nygw": "寝屋川市", "hoska": "東大阪市", "kswd": "岸和田市",
-    "ikd": "池田市", "izmot": "泉大津市", "kizk": "貝塚市", "mrgt": "守口市", "ibrk": "茨木市",
-    "dit": "大東市", "izmi": "和泉市", "mno": "箕面市", "kswr": "柏原市", "hbkn": "羽曳野市",
-    "kdma": "門真市", "stt": "摂津市", "tkis": "高石市", "fuji": "藤井寺市", "sennan": "泉南市",
-    "sijo": "四條畷市", "kata": "交野市", "osksa": "大阪狭山市", "hannan": "阪南市", "izmsn": "泉佐野市",
-    "tdbys": "富田林市", "kwtngn": "河内長野市", "mtbr": "松原市", "smam": "島本町", "tyn": "豊能町",
-    "nose": "能勢町", "tdok": "忠岡町", "kuma": "熊取町", "tjr": "田尻町", "mski": "岬町",
-    "tis": "太子町", "kanan": "河南町", "chyaksk": "千早赤阪村"
-}
+import base64
+import io
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from data_store import ElectionDataStore, filter_years
+from estat import join_covariates
+from municipalities import municipalities_mapping, covariate_items, load_covariate_table
+from plot_cache import PlotCache, PrerenderedImages
+from plotting import pyplot
+from metrics import metrics_from_env, metrics_route
+from schema import normalize_election_frame, report_failures
+from analytics import build_indicators
+from overview import build_turnout_table, turnout_matrix, turnout_ranking, build_overview_figure
+
+# 統合済みCSVの格納先
+MERGED_DIR = Path(__file__).parent / "data" / "merged_output"
 
 def load_csv_data(municipality_code, vote_type):
     """
@@ -46,11 +35,11 @@ def load_csv_data(municipality_code, vote_type):
     pandas.DataFrame or None
     """
     # app.pyの親ディレクトリ/data/merged_outputからファイルを読み込む
-    base_dir = Path(__file__).parent
-    csv_path = base_dir / "data" / "merged_output" / f"{municipality_code}_{vote_type}_merged.csv"
+    csv_path = MERGED_DIR / f"{municipality_code}_{vote_type}_merged.csv"
     
     try:
-        df = pd.read_csv(csv_path)
+        with metrics.timer("read_csv"):
+            df = pd.read_csv(csv_path)
         print(f"✅ ファイル読み込み成功: {csv_path}")
         return df
     except FileNotFoundError:
@@ -62,70 +51,399 @@ def load_csv_data(municipality_code, vote_type):
 
 def process_dataframe(df):
     """
-    データフレームを処理して必要な列を準備する
-    CSVの列名を標準的な列名にマッピング
+    統合済みCSVを型付きの列（schema.ELECTION_SCHEMA、merge.pyの列指向ファイルと同じ形式）に変換する
+    
+    変換できなかった値は欠損値とし、その行・列・値を出力する。
     """
     if df is None:
         return None
     
-    # 列名のマッピング
-    column_mapping = {
-        '投票日': 'vote_date',
-        '告示日': 'announcement_date',
-        '投票率': 'turnout_rate',
-        '定数/候補者数': 'seats_candidates',
-        '有権者数': 'total_voters',
-        '男性': 'male_voters',
-        '女性': 'female_voters',
-        '前回より': 'change_from_previous'
-    }
+    with metrics.timer("normalize"):
+        typed, failures = normalize_election_frame(df)
+    report_failures(failures, "統合済みCSV")
+    return typed
+
+# 処理時間の計測（環境変数 ELECTION_METRICS=1 で有効にする。無効の場合はほぼコストなし）
+metrics = metrics_from_env()
+
+# 全セッションで共有するデータストア（起動時に一度だけ読み込み、更新されたファイルのみ再読み込み）
+# dataset.py で作成した共有データセット（全ワーカーで同じファイルをメモリマップする）があればそれを使い、
+# 無ければ merge.pyが出力する列指向ファイル、それも無ければ統合済みCSVを読み込む
+# （読み込みは起動直後に warm_up() がバックグラウンドで行い、それより先に要求された場合はその時に読み込む）
+data_store = ElectionDataStore(MERGED_DIR, load_csv_data, process_dataframe,
+                                columnar_path=MERGED_DIR / "elections.feather",
+                                dataset_dir=Path(__file__).parent / "data" / "dataset")
+
+# 市町村コードごとの統計データ（最初に使う時、または warm_up() で一度だけ作成する）
+covariate_state = {'table': None}
+covariate_lock = threading.Lock()
+
+def covariate_table():
+    """load_covariate_table() の結果を返す（初回のみ作成する）"""
+    with covariate_lock:
+        if covariate_state['table'] is None:
+            covariate_state['table'] = load_covariate_table()
+        return covariate_state['table']
+
+def attach_covariates(df, municipality_code):
+    """
+    選挙データに統計データの列を結合する（e-Statのデータが無い市町村はそのまま返す）
     
-    # 列名を変換
-    df = df.rename(columns=column_mapping)
-    
-    # 投票日からyear列を作成
-    if 'vote_date' in df.columns:
-        try:
-            df['vote_date'] = pd.to_datetime(df['vote_date'], errors='coerce')
-            df['year'] = df['vote_date'].dt.year
-        except:
-            # 日付変換に失敗した場合、文字列から年を抽出
-            try:
-                df['year'] = df['vote_date'].astype(str).str.extract(r'(\d{4})')[0].astype(float)
-            except:
-                pass
-    
-    # 数値列の処理（パーセント記号やカンマを削除して数値に変換）
-    numeric_columns = ['turnout_rate', 'total_voters', 'male_voters', 'female_voters']
-    
-    for col in numeric_columns:
-        if col in df.columns:
-            try:
-                # %記号、カンマ、全角数字などを処理
-                df[col] = df[col].astype(str).str.replace('%', '').str.replace(',', '').str.replace('，', '')
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            except:
-                pass
-    
-    # 定数/候補者数の処理
-    if 'seats_candidates' in df.columns:
-        try:
-            # "20/25" のような形式を分割
-            split_data = df['seats_candidates'].astype(str).str.split('/', expand=True)
-            if len(split_data.columns) >= 2:
-                df['fixed_seats'] = pd.to_numeric(split_data[0], errors='coerce')
-                df['candidate_count'] = pd.to_numeric(split_data[1], errors='coerce')
-                # 候補者比率を計算
-                df['candidate_ratio'] = df['fixed_seats'] / df['candidate_count']
-        except:
-            pass
-    
-    return df
+    共有データセットの行には結合済みのため、そのまま返す（統計データの表も作成しない）。
+    """
+    if df is not None and all(column in df.columns for column in covariate_items):
+        return df
+    covariates = covariate_table().get(municipality_code)
+    if df is None or covariates is None or 'year' not in df.columns:
+        return df
+    return join_covariates(df, covariates)
+
+# 描画済みグラフのキャッシュ（全セッションで共有）
+PLOT_DPI = 100
+plot_cache = PlotCache(max_entries=256, max_bytes=64 * 1024 * 1024)
+
+# prerender.py で事前に描画したグラフ（www/ 以下に置き、静的ファイルとして配信する）
+prerendered = PrerenderedImages(Path(__file__).parent / "www" / "prerendered")
+
+# reactiveの各段（読み込み・絞り込み・描画・matplotlibでの描画）の実行回数（benchmarks/reactive_recompute.pyで計測）
+reactive_counts = Counter()
+
+# Falseにすると、読み込みが市町村・年度範囲のどの変更でも両方の市町村を読み込み直す以前の構成に戻る
+# （benchmarks/reactive_recompute.pyで変更前後の再計算回数を比較するために使う）
+LAYERED_LOADS = True
+
+metrics.add_source("plot_cache", plot_cache.stats)
+metrics.add_source("reactive_runs", lambda: dict(reactive_counts))
+
+# メトリクス名とラベルのマッピング
+metric_labels = {
+    "turnout_rate": "投票率（％）",
+    "total_voters": "有権者数（合計）",
+    "male_voters": "有権者数（男性）",
+    "female_voters": "有権者数（女性）",
+    "candidate_ratio": "定数/候補者数比率",
+    "population": "総人口（人）",
+    "elderly_ratio": "65歳以上人口割合（％）",
+    "fiscal_strength": "財政力指数",
+    "welfare_cost": "民生費（千円）"
+}
+
+# 表示項目ごとの色設定（市町村1: 濃い色、市町村2: 薄い色）
+metric_colors = {
+    "turnout_rate": ['#2563eb', '#93c5fd'],  # 青系
+    "total_voters": ['#dc2626', '#fca5a5'],  # 赤系
+    "male_voters": ['#059669', '#86efac'],   # 緑系
+    "female_voters": ['#7c3aed', '#c4b5fd'], # 紫系
+    "candidate_ratio": ['#ea580c', '#fdba74'], # オレンジ系
+    "population": ['#0d9488', '#5eead4'],     # 青緑系
+    "elderly_ratio": ['#db2777', '#f9a8d4'],  # ピンク系
+    "fiscal_strength": ['#a16207', '#facc15'], # 黄土色系
+    "welfare_cost": ['#475569', '#cbd5e1']    # グレー系
+}
+
+def build_statistics_figure(valid_data, selected_metrics, year_range, vote_type):
+    """
+    選挙データの推移グラフ（matplotlibのFigure）を作成する
+    
+    Parameters:
+    -----------
+    valid_data : list of dict
+        'name' と 'data'（年度範囲で絞り込み済みのDataFrame）を持つ市町村ごとのデータ
+    selected_metrics : sequence of str
+        表示する統計項目
+    year_range : tuple
+        (開始年, 終了年)
+    vote_type : str
+        選挙種別（"a": 首長選挙, "b": 議員選挙）
+    
+    Returns:
+    --------
+    matplotlib.figure.Figure
+    """
+    plt = pyplot()
+    
+    if len(valid_data) == 0:
+        fig, ax = plt.subplots(figsize=(12, 8))
+        ax.text(0.5, 0.5, '市町村を選択してください', 
+               ha='center', va='center', transform=ax.transAxes, fontsize=16, color='red')
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        ax.axis('off')
+        return fig
+    
+    if not selected_metrics:
+        fig, ax = plt.subplots(figsize=(12, 8))
+        ax.text(0.5, 0.5, '統計項目を選択してください', 
+               ha='center', va='center', transform=ax.transAxes, fontsize=16, color='red')
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        ax.axis('off')
+        return fig
+    
+    markers = ['o', 's']  # 市町村1: 丸、市町村2: 四角
+    linestyles = ['-', '--']  # 市町村1: 実線、市町村2: 破線
+    
+    # 統計データ（人口・財政）は単位が異なるため、項目ごとにグラフの下に別の段を設けて表示する
+    covariate_metrics = [m for m in selected_metrics if m in covariate_items]
+    if covariate_metrics:
+        # メインのグラフは統計データが無い場合と同じ大きさ（6.4インチ）とし、各段（1.6インチ）を0.9インチ間隔で追加する
+        count = len(covariate_metrics)
+        fig, axes = plt.subplots(1 + count, 1, sharex=True, figsize=(12, 8 + 2.5 * count),
+                                 gridspec_kw={'height_ratios': [6.4] + [1.6] * count,
+                                              'hspace': 0.9 * (1 + count) / (6.4 + 1.6 * count)})
+        ax1 = axes[0]
+    else:
+        fig, ax1 = plt.subplots(figsize=(12, 8))
+    
+    # 左軸用の項目（投票率のみ）
+    left_axis_metrics = [m for m in selected_metrics if m in ['turnout_rate']]
+    
+    # 右軸用の項目（有権者数、定数/候補者数比率）
+    right_axis_metrics = [m for m in selected_metrics if m in ['total_voters', 'male_voters', 'female_voters', 'candidate_ratio']]
+    
+    # 左軸にプロット（投票率）
+    lines1 = []
+    labels1 = []
+    
+    for metric in left_axis_metrics:
+        for idx, item in enumerate(valid_data):
+            data = item['data']
+            if metric in data.columns:
+                color = metric_colors[metric][idx]
+                line = ax1.plot(data['year'], data[metric].astype(float), 
+                               marker=markers[idx], linewidth=2.5, markersize=7,
+                               linestyle=linestyles[idx],
+                               color=color, label=f"{item['name']} - {metric_labels[metric]}")
+                lines1.extend(line)
+                labels1.append(f"{item['name']} - {metric_labels[metric]}")
+    
+    # 左軸の設定
+    if left_axis_metrics:
+        ax1.set_xlabel('年', fontsize=12)
+        ax1.set_ylabel('投票率（％）', fontsize=12, color='#2563eb')
+        ax1.set_ylim(20, 80)  # 投票率の縦軸を20-80%に固定
+        ax1.tick_params(axis='y', labelcolor='#2563eb')
+    else:
+        # 投票率がない場合でも軸のラベルは設定
+        ax1.set_xlabel('年', fontsize=12)
+    
+    # 右軸の設定
+    lines2 = []
+    labels2 = []
+    if right_axis_metrics:
+        ax2 = ax1.twinx()
+    
+        bar_width = 0.3
+    
+        for metric in right_axis_metrics:
+            if metric == 'candidate_ratio':
+                # 棒グラフで表示
+                for idx, item in enumerate(valid_data):
+                    data = item['data']
+                    if 'candidate_count' in data.columns and 'fixed_seats' in data.columns:
+                        offset = (idx - 0.5) * bar_width if len(valid_data) == 2 else 0
+                        color_candidate = metric_colors[metric][idx]
+                        color_seats = '#808080' if idx == 0 else '#b0b0b0'  # グレー（市町村1: 濃いグレー、市町村2: 薄いグレー）
+    
+                        bars1 = ax2.bar(data['year'] + offset, data['candidate_count'].astype(float), 
+                                      width=bar_width, alpha=0.6, color=color_candidate, 
+                                      label=f"{item['name']} - 候補者数")
+                        bars2 = ax2.bar(data['year'] + offset, data['fixed_seats'].astype(float), 
+                                      width=bar_width, alpha=0.8, color=color_seats, 
+                                      label=f"{item['name']} - 定数")
+                        lines2.extend([bars1, bars2])
+                        labels2.extend([f"{item['name']} - 候補者数", f"{item['name']} - 定数"])
+            else:
+                # 線グラフで表示
+                for idx, item in enumerate(valid_data):
+                    data = item['data']
+                    if metric in data.columns:
+                        color = metric_colors[metric][idx]
+                        line = ax2.plot(data['year'], data[metric].astype(float), 
+                                       marker=markers[idx], linewidth=2.5, markersize=7,
+                                       linestyle=linestyles[idx],
+                                       color=color, label=f"{item['name']} - {metric_labels[metric]}")
+                        lines2.extend(line)
+                        labels2.append(f"{item['name']} - {metric_labels[metric]}")
+    
+        # 右軸のラベル設定
+        ax2.set_ylabel('有権者数 (人)', fontsize=12)
+        ax2.tick_params(axis='y')
+        ax2.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{int(x):,}'))
+    
+    # タイトル設定
+    vote_type_name = "首長選挙" if vote_type == "a" else "議員選挙"
+    
+    municipality_names = " & ".join([item['name'] for item in valid_data])
+    title = f"{municipality_names} - {vote_type_name}データの推移（{year_range[0]}年 - {year_range[1]}年）"
+    ax1.set_title(title, fontsize=14, fontweight='bold', pad=30)
+    
+    # 凡例の位置を調整
+    all_lines = lines1 + lines2
+    all_labels = labels1 + labels2
+    if all_lines:
+        ax1.legend(all_lines, all_labels, loc='upper left', bbox_to_anchor=(-0.08, 1.25), fontsize=9)
+    
+    # グリッド
+    ax1.grid(True, alpha=0.3)
+    
+    # 統計データの段
+    for ax, metric in zip(axes[1:] if covariate_metrics else [], covariate_metrics):
+        for idx, item in enumerate(valid_data):
+            data = item['data']
+            if metric in data.columns:
+                color = metric_colors[metric][idx]
+                ax.plot(data['year'], data[metric].astype(float),
+                        marker=markers[idx], linewidth=2, markersize=5,
+                        linestyle=linestyles[idx],
+                        color=color, label=f"{item['name']} - {metric_labels[metric]}")
+        ax.set_ylabel(metric_labels[metric], fontsize=9)
+        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x:,.0f}' if abs(x) >= 1000 else f'{x:g}'))
+        ax.grid(True, alpha=0.3)
+        if ax.get_lines():
+            ax.legend(loc='upper left', fontsize=8)
+    if covariate_metrics:
+        ax1.set_xlabel('')
+        axes[-1].set_xlabel('年', fontsize=12)
+    
+    # X軸の年表示を調整（year_rangeで固定）
+    ax1.set_xlim(year_range[0] - 0.5, year_range[1] + 0.5)
+    
+    # レイアウトの調整
+    if covariate_metrics:
+        # 図の高さが変わっても上下の余白（0.8インチ）が変わらないようにする
+        height = fig.get_figheight()
+        fig.subplots_adjust(top=1 - 0.8 / height, bottom=0.8 / height, left=0.1, right=0.85)
+    else:
+        plt.subplots_adjust(top=0.9, bottom=0.1, left=0.1, right=0.85)
+    
+    return fig
+
+def figure_to_png(fig):
+    """FigureをPNGのバイト列に変換し、Figureを閉じる"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=PLOT_DPI)
+    pyplot().close(fig)
+    return buffer.getvalue()
+
+def plot_cache_key(valid_data, selected_metrics, year_range, vote_type):
+    """
+    描画結果のキャッシュキーを作成する
+    
+    統計項目は選択順に依存しない集合として扱う（描画も metric_labels の順で行う）。
+    市町村の並びは色・線種（メイン/比較用）が変わるため順序を保持し、
+    データの更新を反映するためにストアのバージョン（mtime）を含める。
+    """
+    municipalities = tuple(
+        (item['code'], data_store.version(item['code'], vote_type)) for item in valid_data
+    )
+    metric_keys = tuple(metric for metric in metric_labels if metric in selected_metrics)
+    return (municipalities, vote_type, tuple(year_range), metric_keys)
+
+# 全市町村・全選挙の指標（analytics.build_indicators の結果。ストアが更新された時だけ作り直す）
+indicator_state = {'source': None, 'table': None}
+
+def current_indicators():
+    """全市町村・全選挙の指標の表を返す（府内全体の一覧などで共有する）"""
+    combined = data_store.combined()
+    if indicator_state['table'] is None or indicator_state['source'] is not combined:
+        indicator_state['table'] = build_indicators(combined)
+        indicator_state['source'] = combined
+    return indicator_state['table']
+
+# 府内全体の一覧用の投票率の表（指標の表から作成する。指標が作り直された時だけ作り直す）
+overview_state = {'source': None, 'table': None, 'version': 0}
+
+def current_turnout_table():
+    """
+    府内全体の一覧用の投票率の表と、そのバージョン（作り直すたびに増える）を返す
+    
+    Returns:
+    --------
+    tuple
+        (pandas.DataFrame, int)
+    """
+    indicators = current_indicators()
+    if overview_state['table'] is None or overview_state['source'] is not indicators:
+        overview_state['table'] = build_turnout_table(indicators)
+        overview_state['source'] = indicators
+        overview_state['version'] += 1
+    return overview_state['table'], overview_state['version']
+
+# 一覧に表示する市町村（"選択なし" を除く）
+overview_municipalities = {code: name for code, name in municipalities_mapping.items() if code != "null"}
+
+# ブラウザ描画モードで送る列（年と各統計項目。定数/候補者数比率は定数・候補者数の2列で送る）
+chart_series_columns = {
+    "turnout_rate": ["turnout_rate"],
+    "total_voters": ["total_voters"],
+    "male_voters": ["male_voters"],
+    "female_voters": ["female_voters"],
+    "candidate_ratio": ["fixed_seats", "candidate_count"],
+    "population": ["population"],
+    "elderly_ratio": ["elderly_ratio"],
+    "fiscal_strength": ["fiscal_strength"],
+    "welfare_cost": ["welfare_cost"]
+}
+
+def build_chart_payload(items, selected_metrics, vote_type, year_range):
+    """
+    ブラウザ側のグラフ（www/election_chart.js）に送るデータを作成する
+    
+    年度範囲での絞り込みはブラウザ側で行うため、各市町村の全期間の系列を列ごとの配列で送る。
+    
+    Parameters:
+    -----------
+    items : list of dict
+        'name' と 'data'（絞り込み前のDataFrame）を持つ市町村ごとのデータ
+    selected_metrics : sequence of str
+        表示する統計項目
+    vote_type : str
+        選挙種別（"a": 首長選挙, "b": 議員選挙）
+    year_range : tuple
+        初期表示の (開始年, 終了年)
+    
+    Returns:
+    --------
+    dict
+        JSONに変換可能な辞書（欠損値はNone）
+    """
+    metric_keys = [metric for metric in metric_labels if metric in selected_metrics]
+    municipalities = []
+    for item in items:
+        df = item['data']
+        if df is None or 'year' not in df.columns or len(df) == 0:
+            continue
+        df = df[df['year'].notna()]
+        series = {'year': df['year'].astype(int).tolist()}
+        for metric in metric_keys:
+            for column in chart_series_columns[metric]:
+                if column in df.columns:
+                    # float32の列は桁が増えて送られないよう丸める
+                    values = df[column].astype(float).round(6)
+                    series[column] = values.astype(object).where(values.notna(), None).tolist()
+        municipalities.append({'name': item['name'], 'series': series})
+    
+    return {
+        'municipalities': municipalities,
+        'metrics': metric_keys,
+        'labels': {metric: metric_labels[metric] for metric in metric_keys},
+        'covariates': [metric for metric in metric_keys if metric in covariate_items],
+        'colors': {metric: metric_colors[metric] for metric in metric_keys},
+        'vote_type_name': "首長選挙" if vote_type == "a" else "議員選挙",
+        'year_range': list(year_range)
+    }
 
 # UIの定義
 app_ui = ui.page_sidebar(
     ui.sidebar(
         ui.h4("表示内容の設定"),
+        ui.input_radio_buttons(
+            "render_mode",
+            "グラフの表示方式",
+            {"image": "画像（サーバーで描画）", "interactive": "インタラクティブ（ブラウザで描画）"},
+            selected="image"
+        ),
         ui.input_selectize(
             "municipality_1",
             "市町村を選択（メイン）",
@@ -160,240 +478,224 @@ app_ui = ui.page_sidebar(
                 "total_voters": "有権者数（合計）",
                 "male_voters": "有権者数（男性）",
                 "female_voters": "有権者数（女性）",
-                "candidate_ratio": "定数/候補者数比率"
+                "candidate_ratio": "定数/候補者数比率",
+                "population": "総人口（人）",
+                "elderly_ratio": "65歳以上人口割合（％）",
+                "fiscal_strength": "財政力指数",
+                "welfare_cost": "民生費（千円）"
             },
             selected=["turnout_rate"]
         ),
         ui.br(),
         ui.p("※ 有権者数（-） × 定数/候補者数比率は非対応"),
-        ui.p("※ データのない期間は空白もしくはゼロと表示されます。")
+        ui.p("※ データのない期間は空白もしくはゼロと表示されます。"),
+        ui.p("※ 人口・財政の項目はe-Stat（都道府県・市区町村のすがた）の、各選挙に最も近い調査年の値です。")
     ),
-    ui.card(
-        ui.card_header("選挙データの推移"),
-        ui.output_plot("statistics_plot")
+    ui.navset_card_tab(
+        ui.nav_panel(
+            "選挙データの推移",
+            ui.panel_conditional(
+                "input.render_mode === 'image'",
+                ui.output_ui("statistics_plot")
+            ),
+            ui.panel_conditional(
+                "input.render_mode === 'interactive'",
+                ui.div(id="election_chart", style="width: 100%; min-height: 700px;")
+            )
+        ),
+        ui.nav_panel(
+            "府内全体の投票率",
+            ui.output_ui("overview_heatmap"),
+            ui.h5("直近の選挙の投票率ランキング"),
+            ui.output_data_frame("overview_ranking")
+        ),
+        id="main_tab"
+    ),
+    # Plotly は election_chart.js がブラウザ描画モードで最初にデータを受け取った時に読み込む
+    ui.head_content(
+        ui.tags.script(src="election_chart.js")
     )
 )
 
 def server(input, output, session):
     
+    # lifespan を使わずに起動された場合も、最初のセッションで読み込みを始める
+    start_warm_up()
+    
+    session_id = session.id
+    metrics.session_started(session_id)
+    session.on_ended(lambda: metrics.session_ended(session_id))
+    
+    layered_loads = LAYERED_LOADS
+    
+    def municipality_loader(input_id):
+        """市町村ごとの読み込み用calcを作成（年度範囲・統計項目の変更では再実行されない）"""
+        @reactive.calc
+        def load_municipality():
+            code = input[input_id]()
+            vote_type = input.vote_type()
+            if not layered_loads:
+                # 以前の構成と同じく、もう一方の市町村・年度範囲の変更でも読み込み直す
+                input.municipality_1()
+                input.municipality_2()
+                input.year_range()
+            reactive_counts[f"load:{input_id}"] += 1
+            if not code:
+                return None
+            with metrics.timer("load", session_id):
+                data = attach_covariates(data_store.get(code, vote_type), code)
+            return {
+                'code': code,
+                'name': municipalities_mapping[code],
+                'data': data
+            }
+        return load_municipality
+    
+    load_municipality_1 = municipality_loader("municipality_1")
+    load_municipality_2 = municipality_loader("municipality_2")
+    
     @reactive.calc
     def load_all_data():
-        """選択された市町村のデータを読み込む"""
-        municipality_1 = input.municipality_1()
-        municipality_2 = input.municipality_2()
-        vote_type = input.vote_type()
+        """読み込み済みのデータを年度範囲で絞り込む（メモリ上のフィルタのみ）"""
         year_range = input.year_range()
+        reactive_counts["filter"] += 1
         
         results = []
-        
-        # 市町村1のデータ読み込み
-        if municipality_1:
-            df1 = load_csv_data(municipality_1, vote_type)
-            if df1 is not None:
-                df1 = process_dataframe(df1)
-                if df1 is not None and 'year' in df1.columns:
-                    df1 = df1[(df1['year'] >= year_range[0]) & (df1['year'] <= year_range[1])]
-                    results.append({
-                        'code': municipality_1,
-                        'name': municipalities_mapping[municipality_1],
-                        'data': df1,
-                        'success': True
-                    })
-                else:
-                    results.append({
-                        'code': municipality_1,
-                        'name': municipalities_mapping[municipality_1],
-                        'data': None,
-                        'success': False
-                    })
-            else:
-                results.append({
-                    'code': municipality_1,
-                    'name': municipalities_mapping[municipality_1],
-                    'data': None,
-                    'success': False
-                })
-        
-        # 市町村2のデータ読み込み（選択されている場合）
-        if municipality_2 and municipality_2 != "":
-            df2 = load_csv_data(municipality_2, vote_type)
-            if df2 is not None:
-                df2 = process_dataframe(df2)
-                if df2 is not None and 'year' in df2.columns:
-                    df2 = df2[(df2['year'] >= year_range[0]) & (df2['year'] <= year_range[1])]
-                    results.append({
-                        'code': municipality_2,
-                        'name': municipalities_mapping[municipality_2],
-                        'data': df2,
-                        'success': True
-                    })
-                else:
-                    results.append({
-                        'code': municipality_2,
-                        'name': municipalities_mapping[municipality_2],
-                        'data': None,
-                        'success': False
-                    })
-            else:
-                results.append({
-                    'code': municipality_2,
-                    'name': municipalities_mapping[municipality_2],
-                    'data': None,
-                    'success': False
-                })
+        for item in [load_municipality_1(), load_municipality_2()]:
+            if item is None:
+                continue
+            with metrics.timer("filter", session_id):
+                df = filter_years(item['data'], year_range)
+            results.append({
+                'code': item['code'],
+                'name': item['name'],
+                'data': df,
+                'success': df is not None
+            })
         
         return results
     
-    @render.plot
+    @render.ui
     def statistics_plot():
         selected_metrics = input.selected_metrics()
         data_list = load_all_data()
+        year_range = input.year_range()
+        vote_type = input.vote_type()
+        reactive_counts["plot"] += 1
         
         # データが読み込まれているかチェック
         valid_data = [item for item in data_list if item['success'] and item['data'] is not None and len(item['data']) > 0]
         
-        if len(valid_data) == 0:
-            fig, ax = plt.subplots(figsize=(12, 8))
-            ax.text(0.5, 0.5, '市町村を選択してください', 
-                   ha='center', va='center', transform=ax.transAxes, fontsize=16, color='red')
-            ax.set_xlim(0, 1)
-            ax.set_ylim(0, 1)
-            ax.axis('off')
-            return fig
-        
-        if not selected_metrics:
-            fig, ax = plt.subplots(figsize=(12, 8))
-            ax.text(0.5, 0.5, '統計項目を選択してください', 
-                   ha='center', va='center', transform=ax.transAxes, fontsize=16, color='red')
-            ax.set_xlim(0, 1)
-            ax.set_ylim(0, 1)
-            ax.axis('off')
-            return fig
-        
-        # メトリクス名とラベルのマッピング
-        metric_labels = {
-            "turnout_rate": "投票率（％）",
-            "total_voters": "有権者数（合計）",
-            "male_voters": "有権者数（男性）",
-            "female_voters": "有権者数（女性）",
-            "candidate_ratio": "定数/候補者数比率"
-        }
-        
-        # 表示項目ごとの色設定（市町村1: 濃い色、市町村2: 薄い色）
-        metric_colors = {
-            "turnout_rate": ['#2563eb', '#93c5fd'],  # 青系
-            "total_voters": ['#dc2626', '#fca5a5'],  # 赤系
-            "male_voters": ['#059669', '#86efac'],   # 緑系
-            "female_voters": ['#7c3aed', '#c4b5fd'], # 紫系
-            "candidate_ratio": ['#ea580c', '#fdba74'] # オレンジ系
-        }
-        
-        markers = ['o', 's']  # 市町村1: 丸、市町村2: 四角
-        linestyles = ['-', '--']  # 市町村1: 実線、市町村2: 破線
-        
-        fig, ax1 = plt.subplots(figsize=(12, 8))
-        
-        # 左軸用の項目（投票率のみ）
-        left_axis_metrics = [m for m in selected_metrics if m in ['turnout_rate']]
+        # 同じ入力の描画結果はキャッシュから返す（matplotlibを使わない）
+        key = plot_cache_key(valid_data, selected_metrics, year_range, vote_type)
         
-        # 右軸用の項目（有権者数、定数/候補者数比率）
-        right_axis_metrics = [m for m in selected_metrics if m in ['total_voters', 'male_voters', 'female_voters', 'candidate_ratio']]
+        # 事前に描画した画像があれば、そのURLを返す（matplotlibでの描画も画像の送信も行わない）
+        url = prerendered.lookup(key) if valid_data else None
+        if url is not None:
+            reactive_counts["prerendered"] += 1
+            return ui.img(src=url, style="width: 100%; height: auto;")
         
-        # 左軸にプロット（投票率）
-        lines1 = []
-        labels1 = []
+        png = plot_cache.get(key)
+        if png is None:
+            reactive_counts["render"] += 1
+            with metrics.timer("render", session_id):
+                fig = build_statistics_figure(valid_data, key[3], year_range, vote_type)
+                png = figure_to_png(fig)
+            plot_cache.put(key, png)
         
-        for metric in left_axis_metrics:
-            for idx, item in enumerate(valid_data):
-                data = item['data']
-                if metric in data.columns:
-                    color = metric_colors[metric][idx]
-                    line = ax1.plot(data['year'], data[metric], 
-                                   marker=markers[idx], linewidth=2.5, markersize=7,
-                                   linestyle=linestyles[idx],
-                                   color=color, label=f"{item['name']} - {metric_labels[metric]}")
-                    lines1.extend(line)
-                    labels1.append(f"{item['name']} - {metric_labels[metric]}")
-        
-        # 左軸の設定
-        if left_axis_metrics:
-            ax1.set_xlabel('年', fontsize=12)
-            ax1.set_ylabel('投票率（％）', fontsize=12, color='#2563eb')
-            ax1.set_ylim(20, 80)  # 投票率の縦軸を20-80%に固定
-            ax1.tick_params(axis='y', labelcolor='#2563eb')
-        else:
-            # 投票率がない場合でも軸のラベルは設定
-            ax1.set_xlabel('年', fontsize=12)
-        
-        # 右軸の設定
-        lines2 = []
-        labels2 = []
-        if right_axis_metrics:
-            ax2 = ax1.twinx()
-            
-            bar_width = 0.3
-            
-            for metric in right_axis_metrics:
-                if metric == 'candidate_ratio':
-                    # 棒グラフで表示
-                    for idx, item in enumerate(valid_data):
-                        data = item['data']
-                        if 'candidate_count' in data.columns and 'fixed_seats' in data.columns:
-                            offset = (idx - 0.5) * bar_width if len(valid_data) == 2 else 0
-                            color_candidate = metric_colors[metric][idx]
-                            color_seats = '#808080' if idx == 0 else '#b0b0b0'  # グレー（市町村1: 濃いグレー、市町村2: 薄いグレー）
-                            
-                            bars1 = ax2.bar(data['year'] + offset, data['candidate_count'], 
-                                          width=bar_width, alpha=0.6, color=color_candidate, 
-                                          label=f"{item['name']} - 候補者数")
-                            bars2 = ax2.bar(data['year'] + offset, data['fixed_seats'], 
-                                          width=bar_width, alpha=0.8, color=color_seats, 
-                                          label=f"{item['name']} - 定数")
-                            lines2.extend([bars1, bars2])
-                            labels2.extend([f"{item['name']} - 候補者数", f"{item['name']} - 定数"])
-                else:
-                    # 線グラフで表示
-                    for idx, item in enumerate(valid_data):
-                        data = item['data']
-                        if metric in data.columns:
-                            color = metric_colors[metric][idx]
-                            line = ax2.plot(data['year'], data[metric], 
-                                           marker=markers[idx], linewidth=2.5, markersize=7,
-                                           linestyle=linestyles[idx],
-                                           color=color, label=f"{item['name']} - {metric_labels[metric]}")
-                            lines2.extend(line)
-                            labels2.append(f"{item['name']} - {metric_labels[metric]}")
-            
-            # 右軸のラベル設定
-            ax2.set_ylabel('有権者数 (人)', fontsize=12)
-            ax2.tick_params(axis='y')
-            ax2.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{int(x):,}'))
-        
-        # タイトル設定
-        year_range = input.year_range()
+        return ui.img(
+            src="data:image/png;base64," + base64.b64encode(png).decode("ascii"),
+            style="width: 100%; height: auto;"
+        )
+    
+    @render.ui
+    def overview_heatmap():
+        """全市町村 × 年の投票率のヒートマップ（選挙種別・年度範囲はサイドバーの設定を使う）"""
         vote_type = input.vote_type()
-        vote_type_name = "首長選挙" if vote_type == "a" else "議員選挙"
-        
-        municipality_names = " & ".join([item['name'] for item in valid_data])
-        title = f"{municipality_names} - {vote_type_name}データの推移（{year_range[0]}年 - {year_range[1]}年）"
-        ax1.set_title(title, fontsize=14, fontweight='bold', pad=30)
-        
-        # 凡例の位置を調整
-        all_lines = lines1 + lines2
-        all_labels = labels1 + labels2
-        if all_lines:
-            ax1.legend(all_lines, all_labels, loc='upper left', bbox_to_anchor=(-0.08, 1.25), fontsize=9)
-        
-        # グリッド
-        ax1.grid(True, alpha=0.3)
+        year_range = input.year_range()
+        reactive_counts["overview"] += 1
         
-        # X軸の年表示を調整（year_rangeで固定）
-        year_range_values = input.year_range()
-        ax1.set_xlim(year_range_values[0] - 0.5, year_range_values[1] + 0.5)
+        table, version = current_turnout_table()
+        key = ('overview', version, vote_type, tuple(year_range))
+        png = plot_cache.get(key)
+        if png is None:
+            reactive_counts["render"] += 1
+            with metrics.timer("overview_render", session_id):
+                matrix = turnout_matrix(table, vote_type, year_range, overview_municipalities)
+                vote_type_name = "首長選挙" if vote_type == "a" else "議員選挙"
+                title = f"府内市町村の{vote_type_name}の投票率（{year_range[0]}年 - {year_range[1]}年）"
+                png = figure_to_png(build_overview_figure(matrix, title))
+            plot_cache.put(key, png)
         
-        # レイアウトの調整
-        plt.subplots_adjust(top=0.9, bottom=0.1, left=0.1, right=0.85)
+        return ui.img(
+            src="data:image/png;base64," + base64.b64encode(png).decode("ascii"),
+            style="width: 100%; height: auto;"
+        )
+    
+    @render.data_frame
+    def overview_ranking():
+        """年度範囲内で直近の選挙の投票率が高い順の一覧"""
+        table, _ = current_turnout_table()
+        ranking = turnout_ranking(table, input.vote_type(), input.year_range(), overview_municipalities)
+        return render.DataGrid(ranking, width="100%")
+    
+    @reactive.effect
+    async def send_chart_data():
+        """ブラウザ描画モードでは系列データだけを送る（年度範囲の変更はブラウザ側で反映）"""
+        if input.render_mode() != "interactive":
+            return
+        items = [item for item in [load_municipality_1(), load_municipality_2()] if item is not None]
+        selected_metrics = input.selected_metrics()
+        vote_type = input.vote_type()
+        with reactive.isolate():
+            year_range = input.year_range()
+        reactive_counts["chart"] += 1
         
-        return fig
+        with metrics.timer("chart_payload", session_id):
+            payload = build_chart_payload(items, selected_metrics, vote_type, year_range)
+        await session.send_custom_message("election_chart", payload)
+
+app = App(app_ui, server, static_assets=Path(__file__).parent / "www")
+
+def warm_up():
+    """
+    データ・統計データの読み込みと matplotlib（日本語フォント）の準備をまとめて行う
+    
+    起動を待たせないよう、アプリの起動時（start_warm_up()）にバックグラウンドのスレッドで実行する。
+    先にセッションから要求された場合は、その処理が同じものを読み込み、ここでは読み込み済みのものを使う。
+    """
+    try:
+        with metrics.timer("warm_up"):
+            data_store.preload()
+            if not data_store.uses_dataset():
+                covariate_table()
+            pyplot()
+    except Exception as e:
+        print(f"❌ 起動時の読み込みに失敗しました: {e}")
+
+# warm_up() のスレッド（app を読み込むだけのスクリプトでは開始しない。スレッドがあるとプロセスを fork できないため）
+warm_up_state = {'thread': None}
+warm_up_lock = threading.Lock()
+
+def start_warm_up():
+    """warm_up() をバックグラウンドのスレッドで開始する（開始済みの場合はそのスレッドを返す）"""
+    with warm_up_lock:
+        if warm_up_state['thread'] is None:
+            warm_up_state['thread'] = threading.Thread(target=warm_up, name="warm_up", daemon=True)
+            warm_up_state['thread'].start()
+        return warm_up_state['thread']
+
+def with_warm_up(lifespan):
+    """アプリの起動時（ASGIのlifespan）に start_warm_up() を呼ぶようにする"""
+    @asynccontextmanager
+    async def lifespan_with_warm_up(starlette_app):
+        start_warm_up()
+        async with lifespan(starlette_app) as state:
+            yield state
+    return lifespan_with_warm_up
+
+app.starlette_app.router.lifespan_context = with_warm_up(app.starlette_app.router.lifespan_context)
 
-app = App(app_ui, server)
\ No newline at end of file
+# 計測が有効な場合は /metrics で集計を返す（Prometheusのテキスト形式、?format=json でJSON）
+if metrics.enabled:
+    app.starlette_app.router.routes.insert(0, metrics_route(metrics))
\ No newline at end of file
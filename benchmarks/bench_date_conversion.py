@@ -0,0 +1,84 @@
+"""
+日付変換のマイクロベンチマーク（convert_japanese_date の apply と convert_japanese_dates の比較）
+
+年月日・スラッシュ・ハイフン・日なし・和暦（令和/平成/昭和）・全角の数字・欠損を混ぜた列（既定: 100万行）を作成し、
+従来の「Series.apply(convert_japanese_date) → pd.to_datetime」と、ベクトル化した
+convert_japanese_dates の処理時間を計測して、両者の結果が一致することを確認する。
+
+使い方:
+    uv run benchmarks/bench_date_conversion.py --rows 1000000
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import merge
+
+# 半角の数字を全角にする変換表（"２０２５年１月２日" のような値を作る）
+FULL_WIDTH_DIGITS = str.maketrans("0123456789", "０１２３４５６７８９")
+
+def sample_dates(rows, seed=0):
+    """各形式を混ぜた日付文字列の列を作成する"""
+    rng = random.Random(seed)
+    formats = [
+        lambda y, m, d: f"{y}年{m:02d}月{d:02d}日",
+        lambda y, m, d: f"{y}年{m}月{d}日",
+        lambda y, m, d: f"{y}/{m}/{d}",
+        lambda y, m, d: f"{y}-{m}-{d}",
+        lambda y, m, d: f"{y}年{m}月",
+        lambda y, m, d: f"令和{y - 2018 if y > 2019 else '元'}年{m}月{d}日",
+        lambda y, m, d: f"平成{y - 1988}年{m}月{d}日",
+        lambda y, m, d: f"昭和{y - 1925}年{m}月{d}日",
+        lambda y, m, d: None,
+        lambda y, m, d: "",
+        lambda y, m, d: f"{y}年{m}月{d}日".translate(FULL_WIDTH_DIGITS),
+        lambda y, m, d: f"{y}/{m:02d}/{d:02d}".translate(FULL_WIDTH_DIGITS),
+    ]
+    values = []
+    for _ in range(rows):
+        kind = rng.randrange(len(formats))
+        if kind == 5:
+            year = rng.randint(2019, 2025)
+        elif kind == 6:
+            year = rng.randint(1989, 2019)
+        elif kind == 7:
+            year = rng.randint(1926, 1988)
+        else:
+            year = rng.randint(1950, 2025)
+        values.append(formats[kind](year, rng.randint(1, 12), rng.randint(1, 28)))
+    return pd.Series(values, dtype=object)
+
+def main(rows: int = 1_000_000, seed: int = 0):
+    """
+    従来の行ごとの変換とベクトル化した変換の処理時間を比較する
+    """
+    values = sample_dates(rows, seed)
+    print(f"行数: {rows:,}")
+
+    start = time.perf_counter()
+    expected = pd.to_datetime(values.apply(merge.convert_japanese_date), errors='coerce')
+    apply_seconds = time.perf_counter() - start
+    print(f"apply(convert_japanese_date) + to_datetime: {apply_seconds:8.3f} 秒")
+
+    start = time.perf_counter()
+    actual = merge.convert_japanese_dates(values)
+    vectorized_seconds = time.perf_counter() - start
+    print(f"convert_japanese_dates:                     {vectorized_seconds:8.3f} 秒")
+
+    print(f"速度向上: {apply_seconds / vectorized_seconds:.1f} 倍")
+
+    matches = actual.equals(expected.astype(actual.dtype))
+    print("結果の一致:", "OK" if matches else "不一致")
+    if not matches:
+        diff = actual.ne(expected) & ~(actual.isna() & expected.isna())
+        print(pd.DataFrame({'value': values, 'expected': expected, 'actual': actual})[diff].head(20))
+        raise typer.Exit(1)
+
+if __name__ == "__main__":
+    typer.run(main)
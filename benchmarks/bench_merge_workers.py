@@ -0,0 +1,58 @@
+"""
+merge.merge_csv_files のワーカー数ごとの処理時間を比較する
+
+合成した *_cleaned.csv（既定: 1,000市町村 × 2種別 = 2,000グループ）を一時ディレクトリに作成し、
+--full で全グループを統合し直す処理を workers=1 と workers=N で計測する。
+
+使い方:
+    uv run benchmarks/bench_merge_workers.py --municipalities 1000 --workers 4
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import merge
+from benchmarks.synthetic import write_cleaned_corpus
+
+def timed_merge(directory, workers):
+    """統合処理1回分の経過時間（秒）を返す（ログは捨てる）"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        merge.merge_csv_files(directory, convert_dates=True, full=True, workers=workers)
+    return time.perf_counter() - start
+
+def main(municipalities: int = 1000, elections: int = 5, workers: int = os.cpu_count() or 1):
+    """
+    workers=1 と workers=N の統合時間を比較する
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_cleaned_corpus(tmp, municipalities=municipalities, elections=elections)
+        groups = municipalities * 2
+        print(f"合成データ: {files} ファイル / {groups} グループ")
+
+        results = {}
+        for count in sorted({1, workers}):
+            elapsed = timed_merge(tmp, count)
+            results[count] = elapsed
+            print(f"workers={count:<3} {elapsed:8.2f} 秒  ({groups / elapsed:8.1f} グループ/秒)")
+
+        # 出力が決定的であることを確認（最後の実行結果と workers=1 の結果を比較）
+        columnar = Path(tmp) / "merged_output" / merge.COLUMNAR_FILENAME
+        if columnar.exists() and workers > 1:
+            parallel_bytes = columnar.read_bytes()
+            timed_merge(tmp, 1)
+            print("出力の一致:", "OK" if columnar.read_bytes() == parallel_bytes else "不一致")
+
+        if workers > 1:
+            print(f"速度向上: {results[1] / results[workers]:.2f} 倍")
+
+if __name__ == "__main__":
+    typer.run(main)
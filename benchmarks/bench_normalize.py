@@ -0,0 +1,117 @@
+"""
+統合済みCSVの整形のマイクロベンチマーク（従来の process_dataframe と schema.normalize_election_frame の比較）
+
+合成した統合済みCSV（*_merged.csv と同じ形式）を --rows の各行数で1つ作成して read_csv で読み込み、
+列名の変換と %・桁区切りの除去だけを行っていた従来の app.process_dataframe と、
+全列を型付きで変換して変換できなかった値も報告する normalize_election_frame の処理時間
+（--repeat 回のうち最短）を計測する。両者の投票日・投票率・有権者数・定数・候補者数が一致することも確認する。
+どれかの行数で normalize_election_frame の方が遅い場合は終了コード1で終了する。
+
+使い方:
+    uv run benchmarks/bench_normalize.py --rows 16000 --rows 98600
+"""
+import io
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import CLEANED_HEADER, merged_row
+from schema import normalize_election_frame
+
+# 比較する列（従来の列名, 変換後の列名）
+COMPARED_COLUMNS = [
+    ('vote_date', 'vote_date'),
+    ('turnout_rate', 'turnout_rate'),
+    ('total_voters', 'total_voters'),
+    ('fixed_seats', 'fixed_seats'),
+    ('candidate_count', 'candidate_count'),
+]
+
+def baseline_process_dataframe(df):
+    """従来の app.process_dataframe（列名を変換し、数値の列の %・桁区切りを除いて数値にする）"""
+    column_mapping = {
+        '投票日': 'vote_date',
+        '告示日': 'announcement_date',
+        '投票率': 'turnout_rate',
+        '定数/候補者数': 'seats_candidates',
+        '有権者数': 'total_voters',
+        '男性': 'male_voters',
+        '女性': 'female_voters',
+        '前回より': 'change_from_previous'
+    }
+    df = df.rename(columns=column_mapping)
+    df['vote_date'] = pd.to_datetime(df['vote_date'], errors='coerce')
+    df['year'] = df['vote_date'].dt.year
+    for col in ['turnout_rate', 'total_voters', 'male_voters', 'female_voters']:
+        df[col] = df[col].astype(str).str.replace('%', '').str.replace(',', '').str.replace('，', '')
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    split_data = df['seats_candidates'].astype(str).str.split('/', expand=True)
+    df['fixed_seats'] = pd.to_numeric(split_data[0], errors='coerce')
+    df['candidate_count'] = pd.to_numeric(split_data[1], errors='coerce')
+    df['candidate_ratio'] = df['fixed_seats'] / df['candidate_count']
+    return df
+
+def merged_csv(rows, seed=0):
+    """rows 行の統合済みCSVを読み込んだDataFrameを返す（4年ごとの選挙を続けて並べる）"""
+    rng = random.Random(seed)
+    lines = [CLEANED_HEADER]
+    previous_rate = previous_voters = None
+    for index in range(rows):
+        if index % 6 == 0:
+            previous_rate = previous_voters = None
+        year = 2000 + (index % 6) * 4
+        row, previous_rate, previous_voters = merged_row(rng, year, "b", previous_rate, previous_voters)
+        lines.append(row)
+    return pd.read_csv(io.StringIO("\n".join(lines) + "\n"))
+
+def best_time(function, df, repeat):
+    """function(df) の処理時間の最短（秒）と、最後の結果を返す"""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(df.copy())
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), result
+
+def main(rows: List[int] = typer.Option([16_000, 98_600]), repeat: int = 5, seed: int = 0):
+    """
+    従来の整形と normalize_election_frame の処理時間を行数ごとに比較する
+    """
+    slower = []
+    for count in rows:
+        df = merged_csv(count, seed)
+        baseline_seconds, expected = best_time(baseline_process_dataframe, df, repeat)
+        normalize_seconds, (actual, failures) = best_time(normalize_election_frame, df, repeat)
+        print(f"行数: {count:,}")
+        print(f"    process_dataframe（従来）: {baseline_seconds:8.4f} 秒")
+        print(f"    normalize_election_frame: {normalize_seconds:8.4f} 秒 "
+              f"({baseline_seconds / normalize_seconds:.2f} 倍, 変換できなかった値: {len(failures)} 個)")
+
+        for old_column, new_column in COMPARED_COLUMNS:
+            old_values = expected[old_column].to_numpy(dtype='datetime64[s]' if old_column == 'vote_date' else 'float64')
+            new_values = actual[new_column].to_numpy(dtype=old_values.dtype, na_value=np.nan)
+            if old_values.dtype.kind == 'f':
+                matches = np.allclose(old_values, new_values, rtol=1e-6, equal_nan=True)
+            else:
+                matches = np.array_equal(old_values, new_values)
+            if not matches:
+                print(f"❌ {new_column} の値が従来の整形と一致しません")
+                raise typer.Exit(1)
+        if normalize_seconds > baseline_seconds:
+            slower.append(count)
+
+    if slower:
+        print(f"❌ normalize_election_frame が従来の整形より遅い行数があります: {slower}")
+        raise typer.Exit(1)
+    print("✅ すべての行数で normalize_election_frame が従来の整形より速く、結果も一致しました")
+
+if __name__ == "__main__":
+    typer.run(main)
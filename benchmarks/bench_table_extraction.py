@@ -0,0 +1,91 @@
+"""
+選挙ページからの表の取り出しの比較（pd.read_html でページ全体を読み込む方法と、
+shared.read_table_rows で概要の表だけを取り出す方法）
+
+--pages に保存済みのページ（*.html）のディレクトリを指定すると、それらを使う。
+指定しない場合は data/*.csv（スクレイピングした表）から同じ構成のページを作成する
+（--save で作成したページを保存できる）。
+各ページについて両方の方法で clean_data.scan_election_cells までを行い、処理時間と、
+取り出した値・data/{name}.csv に出力するDataFrame（shared.read_table）が一致することを確認する。
+
+使い方:
+    uv run benchmarks/bench_table_extraction.py --limit 500
+    uv run benchmarks/bench_table_extraction.py --pages saved_pages/
+"""
+import csv
+import random
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import clean_data
+import shared
+from pipeline import table_rows
+from benchmarks.synthetic import election_page_html
+
+def build_pages(limit, seed=0):
+    """data/*.csv から選挙ページのHTMLを作成する（名前 -> HTML）"""
+    rng = random.Random(seed)
+    pages = {}
+    for path in clean_data.find_raw_files(shared.DATA_DIR)[:limit]:
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))[1:]
+        pages[path.stem] = election_page_html(rows, rng)
+    return pages
+
+def load_pages(directory):
+    """保存済みのページ（*.html）を読み込む（名前 -> HTML）"""
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(Path(directory).glob("*.html"))}
+
+def read_html_record(html):
+    """従来の方法: ページ全体を pd.read_html で読み込み、最初の表から値を取り出す"""
+    table = pd.read_html(StringIO(html))[0]
+    return clean_data.scan_election_cells(table_rows(table))
+
+def targeted_record(html):
+    """概要の表だけを取り出し、DataFrameを作らずに値を取り出す"""
+    return clean_data.scan_election_cells(shared.read_table_rows(html))
+
+def timed(function, pages):
+    """全ページに function を適用し、(経過時間（秒）, 名前 -> 結果) を返す"""
+    start = time.perf_counter()
+    results = {name: function(html) for name, html in pages.items()}
+    return time.perf_counter() - start, results
+
+def main(pages: str = "", limit: int = 300, save: str = "", seed: int = 0):
+    """
+    pd.read_html と概要の表だけを取り出す方法の処理時間を比較する
+    """
+    corpus = load_pages(pages) if pages else build_pages(limit, seed)
+    if save:
+        Path(save).mkdir(parents=True, exist_ok=True)
+        for name, html in corpus.items():
+            (Path(save) / f"{name}.html").write_text(html, encoding="utf-8")
+    size = sum(len(html) for html in corpus.values())
+    print(f"ページ数: {len(corpus)} ({size / len(corpus) / 1024:.1f} KB/ページ)")
+
+    baseline_seconds, expected = timed(read_html_record, corpus)
+    print(f"pd.read_html（ページ全体）:     {baseline_seconds:8.3f} 秒 ({baseline_seconds / len(corpus) * 1000:6.2f} ms/ページ)")
+    targeted_seconds, actual = timed(targeted_record, corpus)
+    print(f"read_table_rows（概要の表のみ）: {targeted_seconds:8.3f} 秒 ({targeted_seconds / len(corpus) * 1000:6.2f} ms/ページ)")
+    frame_seconds, frames = timed(shared.read_table, corpus)
+    print(f"read_table（CSV出力用）:         {frame_seconds:8.3f} 秒 ({frame_seconds / len(corpus) * 1000:6.2f} ms/ページ)")
+    print(f"速度向上: {baseline_seconds / targeted_seconds:.1f} 倍")
+
+    record_mismatches = [name for name in corpus if expected[name] != actual[name]]
+    frame_mismatches = [name for name in corpus if not pd.read_html(StringIO(corpus[name]))[0].equals(frames[name])]
+    print("取り出した値の一致:", "OK" if not record_mismatches else f"不一致 {len(record_mismatches)} 件")
+    print("DataFrameの一致:", "OK" if not frame_mismatches else f"不一致 {len(frame_mismatches)} 件")
+    for name in record_mismatches[:5]:
+        print(f"  {name}: {expected[name]} != {actual[name]}")
+    if record_mismatches or frame_mismatches:
+        raise typer.Exit(1)
+
+if __name__ == "__main__":
+    typer.run(main)
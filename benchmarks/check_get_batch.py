@@ -0,0 +1,160 @@
+"""
+shared.get_batch（get_data.py get-batch）の動作を、ローカルのHTTPサーバーを相手に確認する
+
+http.server で選挙ページを返すサーバーを別スレッドで起動し、一時ディレクトリに出力しながら
+次の各場合を順に確認する。どれかが期待と異なる場合は終了コード1で終了する。
+
+    初回の取得      すべてのページを取得し、ETag/Last-Modified を記録する
+    再実行          記録したETagで条件付きリクエストを送り、304 で変更なしとする
+    404             失敗として報告し、他のページの取得は続ける
+    5xx の再試行    503 を2回返した後に取得でき、2回目の再試行の前にバックオフの時間だけ待つ
+
+使い方:
+    uv run benchmarks/check_get_batch.py
+"""
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import shared
+
+# 再試行のバックオフの基準秒数（2回目の再試行の前に BACKOFF × 2 秒待つ）
+BACKOFF = 0.2
+
+# サーバーが返すページ（パス -> 投票日）
+PAGES = {
+    "/kuma2012a.html": "2012年1月22日",
+    "/kuma2016a.html": "2016年1月24日",
+}
+
+# 503 を返す回数（その後は通常のページを返す）
+FLAKY_PATH = "/flaky2020a.html"
+FLAKY_FAILURES = 2
+
+def page_html(vote_date):
+    """概要の表を1つ含む選挙ページ"""
+    return (
+        "<html><body><h1>選挙結果</h1><table>"
+        "<tr><th>投票日</th><th>投票率</th></tr>"
+        f"<tr><td>{vote_date}</td><td>45.67%</td></tr>"
+        "</table></body></html>"
+    )
+
+
+class PageServer(ThreadingHTTPServer):
+    """リクエストを記録するテスト用のサーバー（パスごとの (時刻, ステータス) のリスト）"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), PageHandler)
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def record(self, path, status):
+        with self.lock:
+            self.requests.setdefault(path, []).append((time.monotonic(), status))
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """PAGES のページを ETag 付きで返し、FLAKY_PATH は最初の FLAKY_FAILURES 回 503 を返す"""
+
+    def do_GET(self):
+        if self.path == FLAKY_PATH:
+            with self.server.lock:
+                failures = sum(1 for _, status in self.server.requests.get(self.path, []) if status == 503)
+            if failures < FLAKY_FAILURES:
+                return self.reply(503)
+            return self.reply(200, page_html("2020年1月19日"), etag='"flaky"')
+
+        vote_date = PAGES.get(self.path)
+        if vote_date is None:
+            return self.reply(404)
+        etag = f'"{self.path.strip("/")}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self.reply(304)
+        return self.reply(200, page_html(vote_date), etag=etag)
+
+    def reply(self, status, body=None, etag=None):
+        self.server.record(self.path, status)
+        payload = body.encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_batch(server, directory, names):
+    """get_batch で names のページを取得し、出力を directory に書く（get-batch と同じ既定値で、間隔は空けない）"""
+    def handler(html, name):
+        shared.read_table(html).to_csv(directory / f"{name}.csv", index=False)
+
+    entries = [(f"{server.url}/{name}.html", name) for name in names]
+    return shared.get_batch(entries, workers=2, min_interval=0, backoff=BACKOFF,
+                            cache_path=directory / "http_cache.json", handler=handler,
+                            output_path=lambda name: directory / f"{name}.csv")
+
+def main():
+    """
+    初回の取得・304・404・5xx の再試行を確認する
+    """
+    server = PageServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    failures = []
+
+    def check(label, condition, detail=""):
+        print(f"{'✅' if condition else '❌'} {label}" + (f": {detail}" if detail and not condition else ""))
+        if not condition:
+            failures.append(label)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            names = ["kuma2012a", "kuma2016a", "missing2099a"]
+
+            first = run_batch(server, directory, names)
+            check("初回の取得", sorted(first["downloaded"]) == ["kuma2012a", "kuma2016a"], first)
+            check("表の出力", "2012年1月22日" in (directory / "kuma2012a.csv").read_text(encoding="utf-8"))
+            check("404 を失敗として報告", [name for name, _ in first["failed"]] == ["missing2099a"], first)
+
+            second = run_batch(server, directory, names)
+            check("再実行で 304（変更なし）", sorted(second["not_modified"]) == ["kuma2012a", "kuma2016a"]
+                  and not second["downloaded"], second)
+            statuses = [status for _, status in server.requests["/kuma2012a.html"]]
+            check("条件付きリクエスト", statuses == [200, 304], statuses)
+
+            start = time.monotonic()
+            flaky = run_batch(server, directory, ["flaky2020a"])
+            requests = server.requests[FLAKY_PATH]
+            check("503 の後に再試行して取得", flaky["downloaded"] == ["flaky2020a"]
+                  and [status for _, status in requests] == [503, 503, 200], (flaky, requests))
+            # urllib3 は1回目の再試行はすぐに行い、2回目は BACKOFF × 2 秒待つ
+            wait = requests[-1][0] - requests[-2][0] if len(requests) >= 2 else 0.0
+            check("再試行のバックオフ", wait >= BACKOFF * 2 * 0.9, f"{wait:.2f} 秒")
+            print(f"   (再試行を含む取得: {time.monotonic() - start:.2f} 秒)")
+    finally:
+        server.shutdown()
+
+    if failures:
+        raise typer.Exit(1)
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,349 @@
+"""
+app.py に同時に接続するセッション数を増やしたときの、グラフ描画の応答時間と処理量を計測する
+
+app.py を別プロセスで起動し（--url を指定した場合は起動済みのアプリに接続する）、--sessions 個の
+セッションをShinyのWebSocketで開いて、実際の操作に近い入力の変更（市町村の切り替え・比較用の
+市町村の選択・年度範囲のスライダーのドラッグ・統計項目の切り替え・選挙種別の切り替え）を
+--duration 秒間送り続ける。
+
+各セッションは入力を1つ変更するたびに、statistics_plot の新しい出力が届くまで待ってから、
+次の操作までの間（平均 --think-time 秒の指数分布、ドラッグ中は --drag-interval 秒）をおく。
+入力の変更から出力が届くまでの時間を応答時間として、p50/p95/p99 と処理量（件/秒）を表示する。
+アプリを起動した場合は ELECTION_METRICS=1 で起動し、/metrics から取得したサーバー側の
+描画時間（render）とキャッシュの利用状況も表示する。
+
+--output で結果をJSONに保存し、次回 --baseline にそのファイルを渡すと、p95 が
+--tolerance（既定: 20%）を超えて増えた場合に終了コード1で終了する。
+
+使い方:
+    uv run benchmarks/load_test.py --sessions 10 --duration 30
+    uv run benchmarks/load_test.py --sessions 1 --sessions 5 --sessions 20 --output load.json
+    uv run benchmarks/load_test.py --url http://127.0.0.1:8000/ --sessions 50
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import typer
+import websockets
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from municipalities import municipalities_mapping
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 応答を待つ時間の上限（秒）。超えた場合はエラーとして数え、そのセッションを終了する
+RESPONSE_TIMEOUT = 60.0
+
+# アプリの起動を待つ時間の上限（秒）
+STARTUP_TIMEOUT = 60.0
+
+MUNICIPALITY_CODES = [code for code in municipalities_mapping if code != "null"]
+METRICS = ("turnout_rate", "total_voters", "male_voters", "female_voters", "candidate_ratio",
+           "population", "elderly_ratio", "fiscal_strength", "welfare_cost")
+YEAR_LIMITS = (1990, 2030)
+
+# 操作の種類と、選ばれる割合
+ACTIONS = {
+    "municipality": 4,
+    "comparison": 1,
+    "drag": 3,
+    "metrics": 2,
+    "vote_type": 1,
+}
+
+# app.py の既定値（ブラウザで開いた直後の状態）
+INITIAL_INPUTS = {
+    "render_mode": "image",
+    "municipality_1": "oosk",
+    "municipality_2": "",
+    "vote_type": "a",
+    "year_range": [2000, 2025],
+    "selected_metrics": ["turnout_rate"],
+    "main_tab": "選挙データの推移",
+    ".clientdata_output_statistics_plot_hidden": False,
+    ".clientdata_output_overview_heatmap_hidden": True,
+    ".clientdata_output_overview_ranking_hidden": True,
+    ".clientdata_url_search": "",
+}
+
+def next_steps(state, rng):
+    """
+    現在の入力（state）から、次の操作で送る入力の変更のリストを返す
+
+    どの変更も statistics_plot の入力を現在と違う値にする（同じ値では出力が再送されず、応答を待てないため）。
+    スライダーのドラッグは、ブラウザと同じく1年ずつ動かした値を続けて送る。
+
+    Returns:
+    --------
+    tuple
+        (操作の種類, [(入力ID, 値), ...])
+    """
+    action = rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+    if action == "municipality":
+        code = rng.choice([code for code in MUNICIPALITY_CODES if code != state["municipality_1"]])
+        return action, [("municipality_1", code)]
+    if action == "comparison":
+        choices = ["", *MUNICIPALITY_CODES]
+        code = rng.choice([code for code in choices if code not in (state["municipality_2"], state["municipality_1"])])
+        return action, [("municipality_2", code)]
+    if action == "vote_type":
+        return action, [("vote_type", "b" if state["vote_type"] == "a" else "a")]
+    if action == "metrics":
+        selected = list(state["selected_metrics"])
+        metric = rng.choice(METRICS)
+        if metric in selected and len(selected) > 1:
+            selected.remove(metric)
+        elif metric not in selected:
+            selected.append(metric)
+        else:
+            selected = [rng.choice([other for other in METRICS if other != metric])]
+        return action, [("selected_metrics", [name for name in METRICS if name in selected])]
+
+    # 開始年か終了年のつまみを、範囲内で何年か動かす
+    start, end = state["year_range"]
+    handle = rng.randrange(2)
+    target = rng.randint(YEAR_LIMITS[0], end - 1) if handle == 0 else rng.randint(start + 1, YEAR_LIMITS[1])
+    steps = []
+    current = [start, end]
+    while current[handle] != target:
+        current[handle] += 1 if target > current[handle] else -1
+        steps.append(("year_range", list(current)))
+    if not steps:
+        steps.append(("year_range", [start, end - 1] if handle == 1 else [start + 1, end]))
+    return action, steps
+
+async def wait_for_output(ws, output_id):
+    """
+    output_id の出力（またはエラー）を含むメッセージが届くまで受信する
+
+    他のセッションの更新でも出力の無いメッセージが届くため、出力を含むものだけを数える。
+
+    Returns:
+    --------
+    int
+        出力のメッセージの大きさ（バイト）
+    """
+    while True:
+        message = json.loads(await ws.recv())
+        if output_id in message.get("values", {}) or output_id in message.get("errors", {}):
+            if output_id in message.get("errors", {}):
+                raise RuntimeError(f"{output_id}: {message['errors'][output_id]}")
+            return len(json.dumps(message["values"][output_id]))
+
+async def run_session(url, deadline, rng, think_time, drag_interval, records):
+    """
+    1つのセッションを開き、deadline まで操作を続ける
+
+    応答ごとに (操作の種類, 応答時間（秒）, 出力の大きさ, 完了時刻) を records に追加する。
+    失敗した場合は応答時間を None とする。
+    """
+    state = dict(INITIAL_INPUTS)
+    async with websockets.connect(url, max_size=None) as ws:
+        start = time.perf_counter()
+        await ws.send(json.dumps({"method": "init", "data": state}))
+        size = await asyncio.wait_for(wait_for_output(ws, "statistics_plot"), RESPONSE_TIMEOUT)
+        records.append(("init", time.perf_counter() - start, size, time.perf_counter()))
+
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(rng.expovariate(1 / think_time) if think_time > 0 else 0)
+            action, steps = next_steps(state, rng)
+            for index, (input_id, value) in enumerate(steps):
+                if time.perf_counter() >= deadline:
+                    break
+                if index > 0:
+                    await asyncio.sleep(drag_interval)
+                start = time.perf_counter()
+                try:
+                    await ws.send(json.dumps({"method": "update", "data": {input_id: value}}))
+                    size = await asyncio.wait_for(wait_for_output(ws, "statistics_plot"), RESPONSE_TIMEOUT)
+                except (asyncio.TimeoutError, RuntimeError) as e:
+                    records.append((action, None, 0, time.perf_counter()))
+                    print(f"⚠️ 応答がありません: {input_id} = {value} ({e})")
+                    return
+                state[input_id] = value
+                records.append((action, time.perf_counter() - start, size, time.perf_counter()))
+
+def percentile(sorted_values, fraction):
+    """昇順に並んだ値の分位点（最も近い順位の値）を返す"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def summarize(records, elapsed):
+    """応答の記録から応答時間の分位点と処理量をまとめる（初期表示の応答は含めない）"""
+    latencies = sorted(latency for action, latency, _, _ in records if action != "init" and latency is not None)
+    actions = {}
+    for action in ACTIONS:
+        values = sorted(latency for name, latency, _, _ in records if name == action and latency is not None)
+        if values:
+            actions[action] = {'count': len(values), 'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95)}
+    return {
+        'responses': len(latencies),
+        'errors': sum(1 for _, latency, _, _ in records if latency is None),
+        'throughput': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else None,
+        'mean_bytes': sum(size for action, _, size, _ in records if action != "init") / max(len(latencies), 1),
+        'actions': actions,
+    }
+
+async def run_load(url, sessions, duration, ramp_up, think_time, drag_interval, seed):
+    """
+    sessions 個のセッションを ramp_up 秒かけて順に開き、duration 秒間操作を続ける
+
+    Returns:
+    --------
+    dict
+        summarize() の結果
+    """
+    records = []
+    start = time.perf_counter()
+    deadline = start + ramp_up + duration
+
+    async def delayed(index):
+        await asyncio.sleep(ramp_up * index / sessions)
+        rng = random.Random(seed * 100003 + index)
+        await run_session(url, deadline, rng, think_time, drag_interval, records)
+
+    results = await asyncio.gather(*(delayed(index) for index in range(sessions)), return_exceptions=True)
+    failures = [result for result in results if isinstance(result, Exception)]
+    for failure in failures[:3]:
+        print(f"❌ セッションが失敗しました: {failure!r}")
+
+    # 全セッションがそろってからの区間だけで処理量を数える
+    measured_from = start + ramp_up
+    measured = [record for record in records if record[3] >= measured_from]
+    summary = summarize(measured, time.perf_counter() - measured_from)
+    summary['sessions'] = sessions
+    summary['failed_sessions'] = len(failures)
+    return summary
+
+def free_port():
+    """空いているTCPポートを返す"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(port):
+    """app.py を別プロセスで起動し、ページを返すようになるまで待つ"""
+    env = {**os.environ, "ELECTION_METRICS": "1"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "shiny", "run", "app.py", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.perf_counter() + STARTUP_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py が終了しました（終了コード {process.returncode}）")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("app.py が起動しませんでした")
+
+def server_metrics(http_url):
+    """/metrics?format=json の描画時間と描画キャッシュの集計を返す（取得できない場合はNone）"""
+    try:
+        with urllib.request.urlopen(http_url.rstrip("/") + "/metrics?format=json", timeout=5) as response:
+            snapshot = json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+    render = snapshot.get('timings', {}).get('render', {})
+    return {
+        'render_count': render.get('count', 0),
+        'render_mean': render.get('mean', 0.0),
+        'render_max': render.get('max', 0.0),
+        'plot_cache': snapshot.get('plot_cache'),
+        'reactive_runs': snapshot.get('reactive_runs'),
+    }
+
+def format_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:8.1f}"
+
+def main(sessions: list[int] = [10], duration: float = 30.0, ramp_up: float = 5.0, think_time: float = 1.0,
+         drag_interval: float = 0.1, url: str = "", seed: int = 0, output: str = "", baseline: str = "",
+         tolerance: float = 0.2):
+    """
+    同時セッション数ごとに app.py へ負荷をかけ、応答時間と処理量を表示する
+    """
+    process = None
+    if url:
+        http_url = url
+    else:
+        port = free_port()
+        print(f"app.py を起動しています（ポート {port}）...")
+        process = start_app(port)
+        http_url = f"http://127.0.0.1:{port}/"
+    ws_url = http_url.replace("http", "ws", 1).rstrip("/") + "/websocket/"
+
+    results = []
+    try:
+        for count in sessions:
+            before = server_metrics(http_url)
+            summary = asyncio.run(run_load(ws_url, count, duration, ramp_up, think_time, drag_interval, seed))
+            after = server_metrics(http_url)
+            if before is not None and after is not None:
+                renders = after['render_count'] - before['render_count']
+                summary['server'] = {**after, 'renders': renders}
+            results.append(summary)
+
+            print(f"\nセッション数 {count}: 応答 {summary['responses']} 件 / エラー {summary['errors']} 件 / "
+                  f"処理量 {summary['throughput']:.2f} 件/秒")
+            print(f"  応答時間（ms） p50 {format_ms(summary['p50'])}  p95 {format_ms(summary['p95'])}  "
+                  f"p99 {format_ms(summary['p99'])}  最大 {format_ms(summary['max'])}")
+            for action, values in summary['actions'].items():
+                print(f"    {action:<13} {values['count']:>6} 件  p50 {format_ms(values['p50'])}  "
+                      f"p95 {format_ms(values['p95'])}")
+            if 'server' in summary:
+                server = summary['server']
+                print(f"  サーバー: matplotlibでの描画 {server['renders']} 回 "
+                      f"(平均 {server['render_mean'] * 1000:.1f} ms / 最大 {server['render_max'] * 1000:.1f} ms) "
+                      f"描画キャッシュ {server['plot_cache']}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({'duration': duration, 'think_time': think_time, 'results': results}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"\n✓ 結果を保存しました: {output}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            previous = {result['sessions']: result for result in json.load(f)['results']}
+        regressions = []
+        for result in results:
+            old = previous.get(result['sessions'])
+            if old is None or old['p95'] is None or result['p95'] is None:
+                continue
+            if result['p95'] > old['p95'] * (1 + tolerance):
+                regressions.append(f"セッション数 {result['sessions']}: p95 {format_ms(old['p95']).strip()} ms → "
+                                   f"{format_ms(result['p95']).strip()} ms")
+        if regressions:
+            print("❌ 応答時間が基準を超えて増えています:")
+            for line in regressions:
+                print(f"  {line}")
+            raise typer.Exit(1)
+        print("✅ 応答時間は基準の範囲内です")
+
+    if any(result['errors'] or result['failed_sessions'] for result in results):
+        raise typer.Exit(1)
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,126 @@
+"""
+入力変更1回あたりのreactive再計算回数を計測する
+
+app.pyのserverをモックのセッション上で実行し、代表的な入力操作ごとに
+読み込み（load:*）・年度絞り込み（filter）・描画（plot）の各段と、キャッシュに無く
+matplotlibで描画した回数（render）、ブラウザ描画用データの送信（chart）、
+府内全体の一覧（overview）が何回実行されたかを表示する。
+各段の回数は「変更前→変更後」の形式で表示する。変更前は app.LAYERED_LOADS を False にして、
+市町村・年度範囲のどの変更でも両方の市町村を読み込み直す以前の構成で計測した回数
+（描画キャッシュは計測ごとに空にする）。
+
+使い方:
+    uv run benchmarks/reactive_recompute.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shiny import reactive
+from shiny._connection import MockConnection
+from shiny._namespaces import ResolvedId
+from shiny.session import session_context
+from shiny.session._session import AppSession
+
+import app as app_module
+
+# 初期状態
+INITIAL_INPUTS = {
+    "render_mode": "image",
+    "municipality_1": "oosk",
+    "municipality_2": "ski",
+    "vote_type": "a",
+    "year_range": (2000, 2025),
+    "selected_metrics": ("turnout_rate",),
+    "main_tab": "選挙データの推移",
+}
+
+# ブラウザが送るclientdata（出力を表示中として扱わせる）
+CLIENT_DATA = {
+    ".clientdata_output_statistics_plot_hidden": False,
+    ".clientdata_output_overview_heatmap_hidden": True,
+    ".clientdata_output_overview_ranking_hidden": True,
+}
+
+# 入力変更に合わせてブラウザ側で切り替わるclientdata（render_mode・タブによる表示・非表示）
+OVERVIEW_HIDDEN = {
+    ".clientdata_output_overview_heatmap_hidden": True,
+    ".clientdata_output_overview_ranking_hidden": True,
+}
+CLIENT_DATA_UPDATES = {
+    ("render_mode", "interactive"): {".clientdata_output_statistics_plot_hidden": True},
+    ("render_mode", "image"): {".clientdata_output_statistics_plot_hidden": False},
+    ("main_tab", "府内全体の投票率"): {name: False for name in OVERVIEW_HIDDEN},
+    ("main_tab", "選挙データの推移"): OVERVIEW_HIDDEN,
+}
+
+# 計測する入力操作（入力ID, 新しい値）
+SCENARIO = [
+    ("year_range", (2001, 2025)),
+    ("year_range", (2001, 2020)),
+    ("selected_metrics", ("turnout_rate", "total_voters")),
+    ("municipality_2", "tynk"),
+    ("municipality_1", "ski"),
+    ("vote_type", "b"),
+    ("vote_type", "a"),
+    ("municipality_1", "oosk"),
+    ("render_mode", "interactive"),
+    ("year_range", (2005, 2020)),
+    ("selected_metrics", ("turnout_rate",)),
+    ("main_tab", "府内全体の投票率"),
+    ("vote_type", "b"),
+    ("year_range", (2010, 2020)),
+    ("municipality_1", "ski"),
+    ("main_tab", "選挙データの推移"),
+]
+
+async def measure(layered_loads):
+    """layered_loads の構成で SCENARIO を実行し、[(入力変更, {段: 実行回数}), ...] を返す"""
+    app_module.LAYERED_LOADS = layered_loads
+    app_module.plot_cache.clear()
+    session = AppSession(app_module.app, "benchmark", MockConnection())
+    for name, value in {**INITIAL_INPUTS, **CLIENT_DATA}.items():
+        session.input[ResolvedId(name)]._set(value)
+
+    with session_context(session):
+        app_module.server(session.input, session.output, session)
+
+    counts = app_module.reactive_counts
+    rows = []
+
+    counts.clear()
+    await reactive.flush()
+    rows.append(("(初期表示)", dict(counts)))
+
+    for name, value in SCENARIO:
+        counts.clear()
+        session.input[ResolvedId(name)]._set(value)
+        for client_name, client_value in CLIENT_DATA_UPDATES.get((name, value), {}).items():
+            session.input[ResolvedId(client_name)]._set(client_value)
+        session.output._manage_hidden()
+        await reactive.flush()
+        rows.append((f"{name} = {value}", dict(counts)))
+
+    return rows
+
+def main():
+    before = asyncio.run(measure(layered_loads=False))
+    after = asyncio.run(measure(layered_loads=True))
+    app_module.LAYERED_LOADS = True
+    stages = sorted({stage for rows in (before, after) for _, counts in rows for stage in counts})
+
+    print("各段の実行回数（変更前→変更後）")
+    print(f"{'入力変更':<48}" + "".join(f"{stage:>22}" for stage in stages))
+    for (label, old_counts), (_, new_counts) in zip(before, after):
+        cells = [f"{old_counts.get(stage, 0)}→{new_counts.get(stage, 0)}" for stage in stages]
+        print(f"{label:<48}" + "".join(f"{cell:>22}" for cell in cells))
+
+    totals = [f"{sum(counts.get(stage, 0) for _, counts in before)}→"
+              f"{sum(counts.get(stage, 0) for _, counts in after)}" for stage in stages]
+    print(f"{'合計':<48}" + "".join(f"{cell:>22}" for cell in totals))
+    print(f"\n描画キャッシュ（変更後）: {app_module.plot_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
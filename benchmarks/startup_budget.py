@@ -0,0 +1,82 @@
+"""
+app.py の起動時間が予算内に収まっているかを確認する
+
+新しいPythonプロセスで、app が使うライブラリ（shiny・pandas）を先に読み込んでから app を読み込み、
+app 自身の読み込み時間（import）と、start_warm_up() で開始した読み込み（データ・統計データ・
+matplotlib）が終わるまでの時間（ready）を --runs 回計測する。
+ライブラリの読み込み時間（約1.2〜1.4秒）は環境によるばらつきが大きいため、予算には含めない。
+
+次のどれかに当てはまる場合は終了コード1で終了する。
+    - app の読み込みで matplotlib を読み込んでいる、データを読み込んでいる、または
+      warm_up のスレッドを開始している（読み込みを遅延できていない）
+    - import の中央値が --budget 秒を超えている
+
+使い方:
+    uv run benchmarks/startup_budget.py --runs 5 --budget 0.3
+"""
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import typer
+
+# app 自身の読み込み時間の予算（秒）。遅延後は約0.08秒（matplotlib を読み込むと約0.5秒増える）
+IMPORT_BUDGET_SECONDS = 0.3
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 子プロセスで実行するコード（読み込み時間と、遅延した読み込みの状態をJSONで出力する）
+MEASURE_CODE = """
+import json, sys, threading, time
+import pandas, shiny, shiny.render, shiny.ui
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+state = {
+    "matplotlib": "matplotlib" in sys.modules,
+    "data": app.data_store._dataset is not None or app.data_store._columnar is not None,
+    "thread": any(thread.name == "warm_up" for thread in threading.enumerate()),
+}
+start = time.perf_counter()
+app.start_warm_up().join()
+ready = time.perf_counter() - start
+print(json.dumps({"import": imported, "ready": ready, "state": state}))
+"""
+
+def measure_once():
+    """新しいプロセスで1回計測し、{'import': 秒, 'ready': 秒, 'state': {...}} を返す"""
+    result = subprocess.run([sys.executable, "-c", MEASURE_CODE], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(runs: int = 5, budget: float = IMPORT_BUDGET_SECONDS):
+    """
+    app の読み込み時間を計測し、予算と比較する
+    """
+    # 1回目はバイトコードのコンパイルなどを含むため計測から外す
+    measure_once()
+    results = [measure_once() for _ in range(runs)]
+    imports = [result["import"] for result in results]
+    readies = [result["ready"] for result in results]
+    print(f"import: 中央値 {statistics.median(imports):.3f} 秒 (最小 {min(imports):.3f} / 最大 {max(imports):.3f})")
+    print(f"ready:  中央値 {statistics.median(readies):.3f} 秒 (最小 {min(readies):.3f} / 最大 {max(readies):.3f})")
+
+    eager = {
+        "matplotlib": "matplotlib を読み込んでいます",
+        "data": "データを読み込んでいます",
+        "thread": "warm_up のスレッドを開始しています",
+    }
+    problems = sorted({message for result in results for name, message in eager.items() if result["state"][name]})
+    for message in problems:
+        print(f"❌ app の読み込み時に{message}")
+    if statistics.median(imports) > budget:
+        print(f"❌ 読み込み時間が予算（{budget:.2f} 秒）を超えています")
+        raise typer.Exit(1)
+    if problems:
+        raise typer.Exit(1)
+    print(f"✅ 読み込み時間は予算（{budget:.2f} 秒）以内です")
+
+if __name__ == "__main__":
+    typer.run(main)
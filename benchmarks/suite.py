@@ -0,0 +1,195 @@
+"""
+データ処理とダッシュボードの主な処理のベンチマーク
+
+合成データ（既定: 1,000市町村 × 2種別 × 5回）を一時ディレクトリに作成し、次の各段の
+経過時間・ピークメモリ（tracemalloc）・処理量（件/秒）を計測する。
+
+    clean  clean_data.clean_election_data（スクレイピングしたCSV 1ファイルずつ）
+    dates  merge.convert_japanese_dates（日付文字列の列をまとめて。merge.py が日付列を変換するのと同じ呼び出し）
+    merge  merge.merge_csv_files（全グループを統合し直す）
+    load   app.load_csv_data + app.process_dataframe（統合済みCSV 1つずつ）
+    plot   app.build_statistics_figure + PNGへの変換（2市町村・全項目）
+
+--output で結果をJSONに保存し、次回 --baseline にそのファイルを渡すと、経過時間が
+--tolerance（既定: 20%）を超えて増えた段がある場合に終了コード1で終了する。
+
+使い方:
+    uv run benchmarks/suite.py --municipalities 1000 --output bench.json
+    uv run benchmarks/suite.py --municipalities 1000 --baseline bench.json
+"""
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app
+import clean_data
+import merge
+from benchmarks.bench_date_conversion import sample_dates
+from benchmarks.synthetic import write_raw_corpus, write_cleaned_corpus
+
+STAGES = ("clean", "dates", "merge", "load", "plot")
+
+def measure(function, memory=True):
+    """
+    function() を実行し、(経過時間（秒）, ピークメモリ（バイト）, 戻り値) を返す
+
+    tracemalloc は処理を遅くするため、経過時間は計測しない状態で別に1回実行して測る。
+    memory=False の場合はピークメモリを計測しない（None を返す）。
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+
+        peak = None
+        if memory:
+            tracemalloc.start()
+            try:
+                function()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return seconds, peak, result
+
+def clean_stage(raw_dir):
+    """スクレイピングしたCSVを1ファイルずつ整理する（ファイルには書き出さない）"""
+    paths = clean_data.find_raw_files(raw_dir)
+    def run():
+        for path in paths:
+            clean_data.clean_election_data(path)
+        return len(paths)
+    return run
+
+def dates_stage(values):
+    """日付文字列の列（Series）をまとめて変換する（merge.py と同じく convert_japanese_dates を使う）"""
+    def run():
+        merge.convert_japanese_dates(values)
+        return len(values)
+    return run
+
+def merge_stage(cleaned_dir):
+    """すべてのグループを統合し直し、統合したグループ数を返す"""
+    def run():
+        merge.merge_csv_files(cleaned_dir, convert_dates=True, full=True)
+        return len(list((Path(cleaned_dir) / "merged_output").glob("*_merged.csv")))
+    return run
+
+def load_stage(merged_dir):
+    """統合済みCSVを1つずつ読み込み、ダッシュボードで使う形式に変換する"""
+    keys = sorted(path.name[:-len("_merged.csv")].rsplit('_', 1) for path in Path(merged_dir).glob("*_merged.csv"))
+    def run():
+        original = app.MERGED_DIR
+        app.MERGED_DIR = Path(merged_dir)
+        try:
+            for code, vote_type in keys:
+                app.process_dataframe(app.load_csv_data(code, vote_type))
+        finally:
+            app.MERGED_DIR = original
+        return len(keys)
+    return run
+
+def plot_stage(merged_dir, repeat):
+    """2市町村・全項目のグラフを repeat 回描画してPNGに変換する"""
+    paths = sorted(Path(merged_dir).glob("*_a_merged.csv"))[:2]
+    valid_data = [
+        {'code': path.name.split('_')[0], 'name': path.name.split('_')[0],
+         'data': app.process_dataframe(pd.read_csv(path))}
+        for path in paths
+    ]
+    year_range = (2000, 2025)
+    metrics = [metric for metric in app.metric_labels if metric in valid_data[0]['data'].columns]
+    def run():
+        for _ in range(repeat):
+            app.figure_to_png(app.build_statistics_figure(valid_data, metrics, year_range, "a"))
+        return repeat
+    return run
+
+def format_bytes(size):
+    """バイト数を MiB 単位の文字列にする"""
+    return "-" if size is None else f"{size / 2**20:8.1f} MiB"
+
+def compare(results, baseline, tolerance):
+    """
+    基準の結果より経過時間が tolerance を超えて増えた段を返す
+
+    Returns:
+    --------
+    list of tuple
+        (段, 基準の秒数, 今回の秒数)
+    """
+    regressions = []
+    for stage, result in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous and result["seconds"] > previous["seconds"] * (1 + tolerance):
+            regressions.append((stage, previous["seconds"], result["seconds"]))
+    return regressions
+
+def main(municipalities: int = 1000, elections: int = 5, dates: int = 200_000, plots: int = 5,
+         stages: str = ",".join(STAGES), memory: bool = True, output: str = "", baseline: str = "",
+         tolerance: float = 0.2):
+    """
+    各段の経過時間・ピークメモリ・処理量を計測する
+    """
+    selected = [stage.strip() for stage in stages.split(",") if stage.strip()]
+    unknown = set(selected) - set(STAGES)
+    if unknown:
+        raise typer.BadParameter(f"不明な段: {', '.join(sorted(unknown))}（{', '.join(STAGES)} から選択）")
+
+    results = {
+        "corpus": {"municipalities": municipalities, "elections": elections, "dates": dates, "plots": plots},
+        "stages": {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = Path(tmp) / "raw"
+        cleaned_dir = Path(tmp) / "cleaned"
+        merged_dir = cleaned_dir / "merged_output"
+        files = write_raw_corpus(raw_dir, municipalities=municipalities, elections=elections)
+        write_cleaned_corpus(cleaned_dir, municipalities=municipalities, elections=elections)
+        print(f"合成データ: {municipalities} 市町村 × 2種別 × {elections} 回 ({files} ファイル)")
+
+        # load・plot は統合済みCSVを使うため、merge を計測しない場合も先に統合しておく
+        if "merge" not in selected and ({"load", "plot"} & set(selected)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                merge.merge_csv_files(cleaned_dir, convert_dates=True, full=True)
+
+        stage_functions = {
+            "clean": lambda: clean_stage(raw_dir),
+            "dates": lambda: dates_stage(sample_dates(dates)),
+            "merge": lambda: merge_stage(cleaned_dir),
+            "load": lambda: load_stage(merged_dir),
+            "plot": lambda: plot_stage(merged_dir, plots),
+        }
+
+        print(f"{'段':<6} {'経過時間':>10} {'ピークメモリ':>12} {'処理量':>16}")
+        for stage in STAGES:
+            if stage not in selected:
+                continue
+            seconds, peak, items = measure(stage_functions[stage](), memory)
+            results["stages"][stage] = {"seconds": seconds, "peak_bytes": peak, "items": items,
+                                        "items_per_second": items / seconds if seconds else None}
+            print(f"{stage:<6} {seconds:8.3f} 秒 {format_bytes(peak):>12} {items / seconds:12.1f} 件/秒")
+
+    if output:
+        Path(output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ 結果を保存しました: {output}")
+
+    if baseline:
+        regressions = compare(results, json.loads(Path(baseline).read_text(encoding="utf-8")), tolerance)
+        for stage, previous, current in regressions:
+            print(f"❌ {stage}: {previous:.3f} 秒 → {current:.3f} 秒 (+{current / previous - 1:.0%})")
+        if regressions:
+            raise typer.Exit(1)
+        print(f"✅ 基準からの劣化はありません（許容 +{tolerance:.0%}）")
+
+if __name__ == "__main__":
+    typer.run(main)
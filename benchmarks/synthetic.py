@@ -0,0 +1,195 @@
+"""
+ベンチマーク用の合成データを作成する
+
+大阪府の43市町村を大きく超える規模（市町村数 × 選挙回数）で、
+スクレイピングしたCSV（data/*.csv）と、clean_data.pyの出力（*_cleaned.csv）と同じ形式のファイルを作成する。
+"""
+import random
+from pathlib import Path
+
+CLEANED_HEADER = "投票日,告示日,投票率,前回投票率,定数/候補者数,有権者数,男性,女性,前回より"
+
+def municipality_codes(count):
+    """合成用の市町村コード（"m0001" 形式）を返す"""
+    return [f"m{index:04d}" for index in range(1, count + 1)]
+
+def cleaned_row(rng, year, vote_type, previous_rate):
+    """*_cleaned.csv の1行分（CSV文字列）と、その回の投票率を返す"""
+    month = rng.randint(1, 12)
+    day = rng.randint(8, 28)
+    rate = round(rng.uniform(25, 75), 2)
+    male = rng.randint(2_000, 600_000)
+    female = rng.randint(2_000, 600_000)
+    seats = 1 if vote_type == "a" else rng.randint(10, 80)
+    candidates = seats + rng.randint(1, 40)
+    previous = f"{previous_rate}%" if previous_rate is not None else ""
+    row = (
+        f"{year}年{month:02d}月{day:02d}日,{year}年{month:02d}月{day - 7:02d}日,{rate}%,{previous},"
+        f"{seats}/{candidates},\"{male + female:,}\",\"{male:,}\",\"{female:,}\","
+    )
+    return row, rate
+
+def merged_row(rng, year, vote_type, previous_rate, previous_voters):
+    """*_merged.csv の1行分（CSV文字列）と、その回の投票率・有権者数を返す"""
+    month = rng.randint(1, 12)
+    day = rng.randint(8, 28)
+    rate = round(rng.uniform(25, 75), 2)
+    male = rng.randint(2_000, 600_000)
+    female = rng.randint(2_000, 600_000)
+    seats = 1 if vote_type == "a" else rng.randint(10, 80)
+    candidates = seats + rng.randint(1, 40)
+    previous = f"{previous_rate}%" if previous_rate is not None else ""
+    change = f"{float(male + female - previous_voters)}" if previous_voters is not None else ""
+    row = (
+        f"{year}-{month:02d}-{day:02d},{year}-{month:02d}-{day - 7:02d},{rate}%,{previous},"
+        f"{seats}/{candidates},\"{male + female:,}\",{male},{female},{change}"
+    )
+    return row, rate, male + female
+
+def raw_table_text(rng, year, vote_type, previous_rate):
+    """スクレイピングしたCSV（data/{name}.csv）1つ分の内容と、その回の投票率を返す"""
+    month = rng.randint(1, 12)
+    day = rng.randint(8, 28)
+    rate = round(rng.uniform(25, 75), 2)
+    male = rng.randint(2_000, 600_000)
+    female = rng.randint(2_000, 600_000)
+    seats = 1 if vote_type == "a" else rng.randint(10, 80)
+    candidates = seats + rng.randint(1, 40)
+    previous = f"{previous_rate}%" if previous_rate is not None else "-%"
+    voters = f"\"{male + female:,}人  男性  {male:,}人  女性  {female:,}人\""
+    lines = [
+        "0,1,2,3,4,5",
+        f"投票日,{year}年{month:02d}月{day:02d}日,投票率,{rate}%,定数/候補者数,{seats} / {candidates}",
+        f"告示日,{year}年{month:02d}月{day - 7:02d}日,前回投票率,{previous},{previous},{previous}",
+        "有権者数," + ",".join([voters] * 5),
+        "事由・ポイント," + ",".join(["任期満了"] * 5),
+    ]
+    return "\n".join(lines) + "\n", rate
+
+def write_raw_corpus(directory, municipalities=500, elections=5, seed=0):
+    """
+    合成したスクレイピング結果（{code}{year}{type}.csv）を directory に書き出す
+
+    引数と戻り値は write_cleaned_corpus() と同じ。
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    count = 0
+    for code in municipality_codes(municipalities):
+        for vote_type in ("a", "b"):
+            previous_rate = None
+            start = rng.randint(2000, 2003)
+            for index in range(elections):
+                year = start + index * 4
+                text, previous_rate = raw_table_text(rng, year, vote_type, previous_rate)
+                (directory / f"{code}{year}{vote_type}.csv").write_text(text, encoding="utf-8")
+                count += 1
+    return count
+
+def write_cleaned_corpus(directory, municipalities=500, elections=5, seed=0):
+    """
+    合成した *_cleaned.csv を directory に書き出す
+
+    Parameters:
+    -----------
+    directory : str or Path
+        出力先ディレクトリ
+    municipalities : int
+        市町村数（首長選挙・議員選挙の2グループずつ作成する）
+    elections : int
+        グループあたりの選挙回数（4年ごと）
+    seed : int
+        乱数のシード（同じ値なら同じデータを作成する）
+
+    Returns:
+    --------
+    int
+        作成したファイル数
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    count = 0
+    for code in municipality_codes(municipalities):
+        for vote_type in ("a", "b"):
+            previous_rate = None
+            start = rng.randint(2000, 2003)
+            for index in range(elections):
+                year = start + index * 4
+                row, previous_rate = cleaned_row(rng, year, vote_type, previous_rate)
+                path = directory / f"{code}{year}{vote_type}_cleaned.csv"
+                path.write_text(f"{CLEANED_HEADER}\n{row}\n", encoding="utf-8-sig")
+                count += 1
+    return count
+
+# 選挙ページの表以外の部分（ヘッダー・ナビゲーションなど）の代わりに入れるリンクの数
+PAGE_NAV_LINKS = 200
+
+def summary_table_html(rows):
+    """スクレイピングした表の行から、選挙の概要の表のHTMLを作成する（同じ内容が続くセルは colspan でまとめる）"""
+    lines = ["<table class=\"summary\">"]
+    for row in rows:
+        cells = []
+        for value in row:
+            if cells and cells[-1][0] == value:
+                cells[-1][1] += 1
+            else:
+                cells.append([value, 1])
+        tds = "".join(
+            f"<td colspan=\"{span}\">{value}</td>" if span > 1 else f"<td>{value}</td>"
+            for value, span in cells
+        )
+        lines.append(f"<tr>{tds}</tr>")
+    lines.append("</table>")
+    return "\n".join(lines)
+
+def election_page_html(rows, rng, candidates=None):
+    """
+    選挙ページ（1つの選挙の結果）と同じ構成のHTMLを作成する
+
+    概要の表の後ろに、候補者の一覧・過去の選挙の一覧の表と、多数のリンクを置く
+    （pd.read_html はこれらの表もすべて解析する）。
+
+    Parameters:
+    -----------
+    rows : list of list of str
+        概要の表の行（data/{name}.csv の2行目以降）
+    rng : random.Random
+        候補者の一覧などに使う乱数
+    candidates : int or None
+        候補者数（Noneの場合は乱数で決める）
+    """
+    candidates = candidates or rng.randint(2, 60)
+    nav = "\n".join(f"<li><a href=\"/area/{index}\">地域 {index}</a></li>" for index in range(PAGE_NAV_LINKS))
+    candidate_rows = "\n".join(
+        f"<tr><td>{'当選' if index < candidates // 2 else '落選'}</td><td>候補者 {index}</td>"
+        f"<td>{rng.randint(25, 80)}歳</td><td>{rng.choice(['男', '女'])}</td><td>政党{rng.randint(1, 9)}</td>"
+        f"<td>{rng.choice(['新', '現', '元'])}</td><td>{rng.randint(100, 50_000):,}票</td>"
+        f"<td>{rng.uniform(0.1, 20):.2f}%</td></tr>"
+        for index in range(candidates)
+    )
+    history_rows = "\n".join(
+        f"<tr><td><a href=\"/election/{index}\">{2024 - index * 4}年 選挙</a></td>"
+        f"<td>{rng.uniform(25, 75):.2f}%</td><td>{rng.randint(1, 80)}</td></tr>"
+        for index in range(12)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>選挙結果</title>
+<script>window.dataLayer = window.dataLayer || [];</script></head>
+<body><header><nav><ul>{nav}</ul></nav></header>
+<main>
+{summary_table_html(rows)}
+<h2>候補者</h2>
+<table class="candidates"><thead><tr><th>当落</th><th>名前</th><th>年齢</th><th>性別</th><th>党派</th>
+<th>新旧</th><th>得票数</th><th>得票率</th></tr></thead><tbody>
+{candidate_rows}
+</tbody></table>
+<h2>過去の選挙</h2>
+<table class="history"><tr><th>選挙</th><th>投票率</th><th>定数</th></tr>
+{history_rows}
+</table>
+</main><footer><ul>{nav}</ul></footer></body></html>
+"""
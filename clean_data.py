@@ -1,67 +1,269 @@
 import pandas as pd
 import re
 from pathlib import Path
+import time
 import typer
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
 
-def clean_election_data(input_file):
+# 抽出する項目（出力列名, 値の正規表現）。値は項目名のセルの次のセル、
+# または同じセル内の「項目名 値」（例: "96,024人  男性  46,079人  女性  49,945人"）から読み取る
+FIELD_PATTERNS = {
+    '投票日': r'\d{4}年\d{2}月\d{2}日',
+    '告示日': r'\d{4}年\d{2}月\d{2}日',
+    '投票率': r'[\d.]+%',
+    '前回投票率': r'[\d.]+%',
+    '定数/候補者数': r'\d+\s*/\s*\d+',
+    '有権者数': r'[\d,]+(?=人)',
+    '男性': r'[\d,]+(?=人)',
+    '女性': r'[\d,]+(?=人)',
+    '前回より': r'[+-]?[\d,]+(?=人)',
+}
+
+# 取り出せなかった場合にまとめて整理した結果で報告する項目
+REQUIRED_FIELDS = ('投票日', '定数/候補者数', '有権者数')
+
+# 出力列名とセル内の項目名に使う正規表現のグループ名
+FIELD_KEYS = {label: f"f{index}" for index, label in enumerate(FIELD_PATTERNS)}
+
+# 項目名のセルの次のセルの先頭にある値
+VALUE_PATTERNS = {label: re.compile(rf'\s*({pattern})') for label, pattern in FIELD_PATTERNS.items()}
+
+# セル内に含まれる「項目名 値」をまとめて1回で読み取る正規表現
+INLINE_PATTERN = re.compile('|'.join(
+    rf'{re.escape(label)}[,\s]*(?P<{FIELD_KEYS[label]}>{pattern})'
+    for label, pattern in sorted(FIELD_PATTERNS.items(), key=lambda item: -len(item[0]))
+))
+
+def iter_cells(table):
     """
-    乱れた選挙データCSVを整理する
+    表のセルを行順に1つずつ返す（空のセルと、同じ行で繰り返される同一内容のセルは除く）
+
+    Parameters:
+    -----------
+    table : pandas.DataFrame or iterable of rows
+        スクレイピングした表
+    """
+    rows = table.to_numpy(dtype=object).tolist() if isinstance(table, pd.DataFrame) else table
+    for row in rows:
+        seen = set()
+        for value in row:
+            if value is None or (isinstance(value, float) and value != value):
+                continue
+            text = str(value).strip()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            yield text
+
+def scan_election_cells(table):
+    """
+    表のセルを1回だけ走査して、各項目の値を文字列のまま取り出す
+
+    Returns:
+    --------
+    dict
+        項目名 -> 値の文字列（見つからない場合は空文字）
     """
-    # CSVを読み込み
-    df = pd.read_csv(input_file, header=None)
-    
-    # すべてのセルを文字列に変換して結合
-    all_text = ' '.join(df.astype(str).values.flatten())
-    
-    # 各項目を抽出
     result = {}
+    pending = None  # 直前のセルが項目名だった場合、その項目名
     
-    # 投票日
-    vote_date = re.search(r'投票日[,\s]*(\d{4}年\d{2}月\d{2}日)', all_text)
-    result['投票日'] = vote_date.group(1) if vote_date else ''
-    
-    # 告示日
-    announce_date = re.search(r'告示日[,\s]*(\d{4}年\d{2}月\d{2}日)', all_text)
-    result['告示日'] = announce_date.group(1) if announce_date else ''
-    
-    # 投票率
-    vote_rate = re.search(r'投票率[,\s]*([\d.]+%)', all_text)
-    result['投票率'] = vote_rate.group(1) if vote_rate else ''
-    
-    # 前回投票率
-    prev_rate = re.search(r'前回投票率[,\s]*([\d.]+%)', all_text)
-    result['前回投票率'] = prev_rate.group(1) if prev_rate else ''
-    
-    # 定数/候補者数
-    quota = re.search(r'定数/候補者数[,\s]*(\d+\s*/\s*\d+)', all_text)
-    result['定数/候補者数'] = quota.group(1).replace(' ', '') if quota else ''
+    for text in iter_cells(table):
+        if pending is not None:
+            match = VALUE_PATTERNS[pending].match(text)
+            if match and pending not in result:
+                result[pending] = match.group(1)
+            pending = None
+        
+        if text in FIELD_PATTERNS:
+            pending = text
+            continue
+        
+        for match in INLINE_PATTERN.finditer(text):
+            label = next(label for label, key in FIELD_KEYS.items() if match.group(key) is not None)
+            result.setdefault(label, match.group(FIELD_KEYS[label]))
     
-    # 有権者数（カンマ区切りの数値に対応）
-    voters = re.search(r'有権者数[,\s]*["\']?([\d,]+)人', all_text)
-    result['有権者数'] = voters.group(1) if voters else ''
+    if '定数/候補者数' in result:
+        result['定数/候補者数'] = result['定数/候補者数'].replace(' ', '')
+    return {label: result.get(label, '') for label in FIELD_PATTERNS}
+
+def parse_japanese_date(text):
+    """"2024年04月21日" 形式の文字列をdateに変換する（空ならNone）"""
+    match = re.match(r'(\d{4})年(\d{2})月(\d{2})日', text)
+    return date(int(match.group(1)), int(match.group(2)), int(match.group(3))) if match else None
+
+def parse_number(text, number_type=int):
+    """"%"・"," を取り除いて数値に変換する（空ならNone）"""
+    text = text.replace('%', '').replace(',', '')
+    return number_type(text) if text else None
+
+def extract_election_record(table):
+    """
+    表から選挙データを型付きで取り出す（大量のファイルをまとめて処理する場合に使う）
+
+    Parameters:
+    -----------
+    table : pandas.DataFrame or iterable of rows
+        スクレイピングした表（pd.read_csv(header=None) や pd.read_html の結果など）
+
+    Returns:
+    --------
+    dict
+        vote_date・announcement_date（date）、turnout_rate・previous_turnout_rate（float）、
+        fixed_seats・candidate_count・total_voters・male_voters・female_voters・
+        change_from_previous（int）。見つからない項目はNone
+    """
+    raw = scan_election_cells(table)
+    seats, _, candidates = raw['定数/候補者数'].partition('/')
+    return {
+        'vote_date': parse_japanese_date(raw['投票日']),
+        'announcement_date': parse_japanese_date(raw['告示日']),
+        'turnout_rate': parse_number(raw['投票率'], float),
+        'previous_turnout_rate': parse_number(raw['前回投票率'], float),
+        'fixed_seats': parse_number(seats),
+        'candidate_count': parse_number(candidates),
+        'total_voters': parse_number(raw['有権者数']),
+        'male_voters': parse_number(raw['男性']),
+        'female_voters': parse_number(raw['女性']),
+        'change_from_previous': parse_number(raw['前回より']),
+    }
+
+def clean_election_data(input_file):
+    """
+    乱れた選挙データCSVを整理する
+
+    Parameters:
+    -----------
+    input_file : str or Path or pandas.DataFrame
+        スクレイピングしたCSVのパス、または読み込み済みの表
+    """
+    # CSVを読み込み
+    if isinstance(input_file, pd.DataFrame):
+        df = input_file
+    else:
+        df = pd.read_csv(input_file, header=None)
     
-    # 男性有権者数
-    male = re.search(r'男性[,\s]*([\d,]+)人', all_text)
-    result['男性'] = male.group(1) if male else ''
+    return pd.DataFrame([scan_election_cells(df)])
+
+def cleaned_path_for(input_path):
+    """スクレイピングしたCSVに対応する整理済みCSVのパス（{stem}_cleaned.csv）を返す"""
+    input_path = Path(input_path)
+    return input_path.parent / f"{input_path.stem}_cleaned.csv"
+
+def find_raw_files(directory_path):
+    """ディレクトリ内のスクレイピングしたCSV（*_cleaned.csv 以外）を名前順に返す"""
+    return sorted(
+        path for path in Path(directory_path).glob("*.csv")
+        if not path.stem.endswith("_cleaned")
+    )
+
+def is_fresh(input_path, output_path):
+    """整理済みCSVが入力より新しい（整理し直す必要が無い）場合にTrueを返す"""
+    try:
+        return Path(output_path).stat().st_mtime_ns >= Path(input_path).stat().st_mtime_ns
+    except OSError:
+        return False
+
+def clean_file(input_path):
+    """
+    1ファイル分の整理処理（プロセスプールで実行する）
+
+    Returns:
+    --------
+    dict
+        'name'・'seconds'（処理時間）・'missing'（値を取り出せなかった項目）・'error'（失敗時のエラー内容）
+    """
+    input_path = Path(input_path)
+    start = time.perf_counter()
+    result = {'name': input_path.name, 'missing': [], 'error': None}
+    try:
+        cleaned_df = clean_election_data(input_path)
+        cleaned_df.to_csv(cleaned_path_for(input_path), index=False, encoding='utf-8-sig')
+        result['missing'] = [label for label in REQUIRED_FIELDS if not cleaned_df.at[0, label]]
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def clean_directory(directory_path, workers=1, force=False):
+    """
+    ディレクトリ内のスクレイピングしたCSVをまとめて整理する
+
+    整理済みCSVが入力より新しいファイルはスキップする（force=Trueの場合はすべて整理し直す）。
+
+    Parameters:
+    -----------
+    directory_path : str or Path
+        スクレイピングしたCSVが格納されているディレクトリ
+    workers : int
+        並列に処理するプロセス数（1の場合は逐次処理）
+    force : bool
+        Trueの場合は新しさに関係なくすべて整理し直す
+
+    Returns:
+    --------
+    dict
+        'cleaned'（clean_file の結果のリスト）・'skipped'（ファイル名のリスト）
+    """
+    targets = []
+    skipped = []
+    for input_path in find_raw_files(directory_path):
+        if not force and is_fresh(input_path, cleaned_path_for(input_path)):
+            skipped.append(input_path.name)
+        else:
+            targets.append(input_path)
     
-    # 女性有権者数
-    female = re.search(r'女性[,\s]*([\d,]+)人', all_text)
-    result['女性'] = female.group(1) if female else ''
+    if workers <= 1 or len(targets) <= 1:
+        cleaned = [clean_file(path) for path in targets]
+    else:
+        # ファイル数が多い場合はまとめて渡してプロセス間通信の回数を減らす
+        chunksize = max(1, len(targets) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            cleaned = list(executor.map(clean_file, targets, chunksize=chunksize))
     
-    # 前回より
-    diff = re.search(r'前回より[,\s]*([+-]?[\d,]+)人', all_text)
-    result['前回より'] = diff.group(1) if diff else ''
+    return {'cleaned': cleaned, 'skipped': skipped}
+
+def print_summary(results, elapsed):
+    """まとめて整理した結果（ファイルごとの処理時間・失敗）を出力する"""
+    cleaned = results['cleaned']
+    for result in cleaned:
+        if result['error']:
+            print(f"❌ {result['name']} ({result['seconds'] * 1000:.1f} ms): {result['error']}")
+        elif result['missing']:
+            print(f"⚠️ {result['name']} ({result['seconds'] * 1000:.1f} ms): {', '.join(result['missing'])} を取り出せませんでした")
+        else:
+            print(f"✓ {result['name']} ({result['seconds'] * 1000:.1f} ms)")
     
-    return pd.DataFrame([result])
+    failed = [result for result in cleaned if result['error']]
+    incomplete = [result for result in cleaned if not result['error'] and result['missing']]
+    print(f"\n整理: {len(cleaned) - len(failed)} 件 / スキップ（整理済み）: {len(results['skipped'])} 件 / "
+          f"失敗: {len(failed)} 件 / 項目不足: {len(incomplete)} 件")
+    if cleaned:
+        total = sum(result['seconds'] for result in cleaned)
+        slowest = max(cleaned, key=lambda result: result['seconds'])
+        print(f"処理時間: 合計 {elapsed:.2f} 秒（1ファイル平均 {total / len(cleaned) * 1000:.1f} ms、"
+              f"最長 {slowest['name']} {slowest['seconds'] * 1000:.1f} ms）")
 
-def main(input_file: str, output_file: str = ""):
+def main(input_file: str, output_file: str = "", workers: int = 1, force: bool = False):
     """
     選挙データを整理する
+    
+    input_file にディレクトリを指定した場合は、その中の *.csv（*_cleaned.csv 以外）を
+    1つのプロセスでまとめて整理する（整理済みCSVが新しいファイルはスキップ、--force ですべて整理し直す）。
+    --workers N でN個のプロセスで並列に整理する。
     """
     input_path = Path(input_file)
     
+    if input_path.is_dir():
+        start = time.perf_counter()
+        results = clean_directory(input_path, workers=workers, force=force)
+        print_summary(results, time.perf_counter() - start)
+        if any(result['error'] for result in results['cleaned']):
+            raise typer.Exit(1)
+        return
+    
     if not output_file:
-        output_file = str(input_path.parent / f"{input_path.stem}_cleaned.csv")
+        output_file = str(cleaned_path_for(input_path))
     
     # データを整理
     cleaned_df = clean_election_data(input_path)
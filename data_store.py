@@ -0,0 +1,298 @@
+import re
+import threading
+from pathlib import Path
+import pandas as pd
+
+
+class ElectionDataStore:
+    """
+    統合済みCSV（data/merged_output/*_merged.csv）をプロセス全体で共有するデータストア
+
+    起動時に全ファイルを一度だけ読み込み・整形し、(市町村コード, 選挙種別) をキーとして
+    メモリ上に保持する。ファイルの更新時刻（mtime）が変わったエントリだけを再読み込みする。
+    merge.pyが出力する型付きの列指向ファイル（elections.feather）がある場合はそちらを優先し、
+    読み込めない場合はCSVにフォールバックする。dataset.py で作成した共有データセットがある場合は
+    さらにそれを優先する（複数のワーカープロセスが同じファイルをメモリマップで共有し、current.json が
+    書き換えられると再起動せずに新しいバージョンに切り替える）。
+    返されるDataFrameは全セッションで共有されるため、呼び出し側で書き換えないこと。
+
+    Parameters:
+    -----------
+    data_dir : str or Path
+        統合済みCSVが格納されているディレクトリ
+    loader : callable
+        (市町村コード, 選挙種別) を受け取り、生のDataFrame（またはNone）を返す関数
+    processor : callable or None
+        読み込んだDataFrameを整形する関数（例: process_dataframe）
+    columnar_path : str or Path or None
+        型付きの列指向ファイルのパス（Noneの場合はCSVのみを使う）
+    dataset_dir : str or Path or None
+        共有データセットのディレクトリ（Noneの場合は使わない）
+    """
+
+    filename_pattern = re.compile(r"^(.+)_([a-z])_merged\.csv$")
+
+    def __init__(self, data_dir, loader, processor=None, columnar_path=None, dataset_dir=None):
+        self.data_dir = Path(data_dir)
+        self.loader = loader
+        self.processor = processor
+        self.columnar_path = Path(columnar_path) if columnar_path is not None else None
+        self.dataset_dir = Path(dataset_dir) if dataset_dir is not None else None
+        self._entries = {}  # (市町村コード, 選挙種別) -> (mtime, DataFrame)
+        self._columnar = None  # (mtime, {(市町村コード, 選挙種別): DataFrame} or None)
+        self._dataset = None  # (current.json のmtime, SharedDataset or None)
+        self._combined = None  # (各エントリのバージョン, 全エントリを結合したDataFrame)
+        self._lock = threading.Lock()
+        # 同じファイルを複数のスレッド（warm_up とセッション）が同時に読み込まないようにするロック
+        self._load_lock = threading.Lock()
+
+    def path_for(self, municipality_code, vote_type):
+        """キーに対応する統合済みCSVのパスを返す"""
+        return self.data_dir / f"{municipality_code}_{vote_type}_merged.csv"
+
+    def preload(self):
+        """
+        ディレクトリ内のすべての統合済みCSVを読み込む
+
+        Returns:
+        --------
+        int
+            読み込み済みのエントリ数
+        """
+        columnar = self._shared_entries()
+        if columnar is not None:
+            return len(columnar)
+
+        for csv_path in sorted(self.data_dir.glob("*_merged.csv")):
+            match = self.filename_pattern.match(csv_path.name)
+            if match:
+                self.get(match.group(1), match.group(2))
+        return len(self._entries)
+
+    def get(self, municipality_code, vote_type):
+        """
+        整形済みのDataFrameを返す（ファイルが更新されていれば読み込み直す）
+
+        Returns:
+        --------
+        pandas.DataFrame or None
+        """
+        key = (municipality_code, vote_type)
+        columnar = self._shared_entries()
+        if columnar is not None:
+            return columnar.get(key)
+
+        try:
+            mtime = self.path_for(municipality_code, vote_type).stat().st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        df = self.loader(municipality_code, vote_type)
+        if df is not None and self.processor is not None:
+            df = self.processor(df)
+
+        with self._lock:
+            self._entries[key] = (mtime, df)
+        return df
+
+    def _columnar_entries(self):
+        """列指向ファイルの (mtime, エントリ) を返す（ファイルが無い場合はNone、読み込めない場合のエントリはNone）"""
+        if self.columnar_path is None:
+            return None
+        try:
+            mtime = self.columnar_path.stat().st_mtime_ns
+        except OSError:
+            # ファイルが消された場合は、読み込み済みのエントリを使い続けない
+            with self._lock:
+                self._columnar = None
+            return None
+
+        with self._lock:
+            columnar = self._columnar
+        if columnar is not None and columnar[0] == mtime:
+            return columnar
+
+        with self._load_lock:
+            # 待っている間に他のスレッドが読み込み終えていれば、それを使う
+            with self._lock:
+                columnar = self._columnar
+            if columnar is not None and columnar[0] == mtime:
+                return columnar
+            # 読み込みに失敗した場合もmtimeごとに記録し、同じファイルを何度も読み直さない
+            columnar = (mtime, read_columnar_file(self.columnar_path))
+            with self._lock:
+                self._columnar = columnar
+        return columnar
+
+    def _dataset_entries(self):
+        """共有データセットを返す（current.json が無い・読めない場合はNone）"""
+        if self.dataset_dir is None:
+            return None
+        from dataset import CURRENT_NAME, attach_dataset
+        try:
+            mtime = (self.dataset_dir / CURRENT_NAME).stat().st_mtime_ns
+        except OSError:
+            # current.json が消された場合は、読み込み済みのデータセットを使い続けない
+            with self._lock:
+                self._dataset = None
+            return None
+
+        with self._lock:
+            dataset = self._dataset
+        if dataset is not None and dataset[0] == mtime:
+            return dataset[1]
+
+        with self._load_lock:
+            with self._lock:
+                dataset = self._dataset
+            if dataset is not None and dataset[0] == mtime:
+                return dataset[1]
+            # 古いバージョンのDataFrameを使っているセッションがあっても、参照が残る限りそのまま使える
+            entries = attach_dataset(self.dataset_dir)
+            with self._lock:
+                self._dataset = (mtime, entries)
+        return entries
+
+    def _shared_source(self):
+        """
+        共有データセット、無ければ列指向ファイルの (バージョン, エントリ) を返す（どちらも無い場合はNone）
+
+        バージョンは共有データセットの場合はデータセットのバージョン、列指向ファイルの場合はファイルのmtime。
+        """
+        dataset = self._dataset_entries()
+        if dataset is not None:
+            return dataset.version, dataset
+        columnar = self._columnar_entries()
+        if columnar is not None and columnar[1] is not None:
+            return columnar
+        return None
+
+    def _shared_entries(self):
+        """共有データセット、無ければ列指向ファイルのエントリを返す（どちらも無い場合はNone）"""
+        source = self._shared_source()
+        return source[1] if source is not None else None
+
+    def uses_dataset(self):
+        """共有データセットを使っているかを返す"""
+        return self._dataset_entries() is not None
+
+    def version(self, municipality_code, vote_type):
+        """
+        エントリのバージョンを返す（エントリが無い・未読み込みならNone）
+
+        get() と同じ読み込み元（共有データセット・列指向ファイル・統合済みCSV）から求める。
+        共有データセットの場合はデータセットのバージョン、それ以外はファイルのmtime。
+        """
+        key = (municipality_code, vote_type)
+        source = self._shared_source()
+        if source is not None:
+            return source[0] if key in source[1] else None
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def combined(self):
+        """
+        全エントリを縦に結合したDataFrameを返す（府内全体の集計用）
+
+        各行に 'municipality_code' と 'vote_type' 列を持つ。エントリが更新された場合だけ作り直す。
+
+        Returns:
+        --------
+        pandas.DataFrame or None
+            エントリが1つも無い場合はNone
+        """
+        dataset = self._dataset_entries()
+        if dataset is not None:
+            # 共有データセットは全エントリを並べた表をそのまま使う（ワーカーごとに一度だけ作成する）
+            return dataset.frame() if len(dataset) else None
+        columnar = self._shared_entries()
+        if columnar is not None:
+            frames = columnar
+        else:
+            frames = {}
+            for csv_path in sorted(self.data_dir.glob("*_merged.csv")):
+                match = self.filename_pattern.match(csv_path.name)
+                if match:
+                    frames[(match.group(1), match.group(2))] = self.get(match.group(1), match.group(2))
+        frames = {key: df for key, df in frames.items() if df is not None}
+        signature = tuple((key, self.version(*key)) for key in sorted(frames))
+
+        with self._lock:
+            combined = self._combined
+        if combined is not None and combined[0] == signature:
+            return combined[1]
+
+        if frames:
+            df = pd.concat(
+                [frame.assign(municipality_code=key[0], vote_type=key[1]) for key, frame in sorted(frames.items())],
+                ignore_index=True
+            )
+        else:
+            df = None
+        with self._lock:
+            self._combined = (signature, df)
+        return df
+
+    def keys(self):
+        """キーの一覧を返す（get() と同じ読み込み元から。統合済みCSVの場合は読み込み済みのキー）"""
+        entries = self._shared_entries()
+        if entries is not None:
+            return sorted(entries)
+        with self._lock:
+            return sorted(self._entries)
+
+
+def read_columnar_file(path):
+    """
+    merge.pyが出力した型付きの列指向ファイルをメモリマップで読み込み、キーごとに分割する
+
+    Returns:
+    --------
+    dict or None
+        (市町村コード, 選挙種別) -> DataFrame（pyarrowが無い・読み込めない場合はNone）
+    """
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        print("⚠️ pyarrowが見つからないため、統合済みCSVから読み込みます")
+        return None
+
+    try:
+        df = feather.read_feather(path, memory_map=True)
+    except Exception as e:
+        print(f"❌ 列指向ファイルの読み込みに失敗しました: {e}")
+        return None
+
+    print(f"✅ 列指向ファイル読み込み成功: {path} ({len(df)} 行)")
+    return {
+        (str(code), str(vote_type)): group.reset_index(drop=True)
+        for (code, vote_type), group in df.groupby(['municipality_code', 'vote_type'], observed=True, sort=False)
+    }
+
+
+def filter_years(df, year_range):
+    """
+    年度範囲でDataFrameを絞り込む（メモリ上のフィルタのみで、ファイルは読まない）
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame or None
+        'year' 列を持つ整形済みデータ
+    year_range : tuple
+        (開始年, 終了年)
+
+    Returns:
+    --------
+    pandas.DataFrame or None
+    """
+    if df is None or 'year' not in df.columns:
+        return None
+    return df[df['year'].between(year_range[0], year_range[1])]
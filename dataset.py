@@ -0,0 +1,216 @@
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+import pandas as pd
+import typer
+from estat import ESTAT_DIR, ESTAT_FILES
+from municipalities import load_covariate_table
+
+# uv run dataset.py と入力すると、app.py の複数のワーカープロセスで共有する読み取り専用のデータセットを
+# data/dataset/ に作成します（作成済みの場合、merge.py・pipeline.py が列指向ファイルを出力するたびに作り直します）
+
+DATASET_DIR = Path(__file__).parent / "data" / "dataset"
+COLUMNAR_PATH = Path(__file__).parent / "data" / "merged_output" / "elections.feather"
+
+# 現在のデータセットのファイル名とバージョンを記録するファイル（ワーカーはこのファイルの更新で作り直しを検知する）
+CURRENT_NAME = "current.json"
+
+# 古いデータセットを消さずに残す数（作り直した直後に、まだ古いものを読んでいるワーカーのため）
+KEEP_VERSIONS = 2
+
+KEY_COLUMNS = ['municipality_code', 'vote_type']
+
+def dataset_version(columnar_path=COLUMNAR_PATH, estat_paths=None):
+    """
+    データセットのバージョン（元の列指向ファイルとe-StatのCSVの内容のハッシュ）を返す
+
+    同じ内容から作り直した場合は同じバージョンになる。
+    """
+    estat_paths = estat_paths or [ESTAT_DIR / filename for filename in ESTAT_FILES]
+    digest = hashlib.sha256()
+    for path in [columnar_path, *estat_paths]:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()[:16]
+
+def build_dataset_table(columnar_path=COLUMNAR_PATH):
+    """
+    型付きの選挙データ（merge.py の列指向ファイル）の各行に、e-Statの統計データの列を結合した表を作成する
+
+    Returns:
+    --------
+    pandas.DataFrame
+        市町村・選挙種別・投票日の順に並んだ表
+    """
+    elections = pd.read_feather(columnar_path)
+    covariates = load_covariate_table()
+    if covariates:
+        long = pd.concat(covariates, names=['municipality_code', 'year']).reset_index()
+        long['municipality_code'] = long['municipality_code'].astype(elections['municipality_code'].dtype)
+        long['year'] = long['year'].astype(elections['year'].dtype)
+        elections = elections.merge(long, how='left', on=['municipality_code', 'year'])
+    return elections.sort_values(KEY_COLUMNS + ['vote_date'], ignore_index=True)
+
+def build_dataset(dataset_dir=DATASET_DIR, columnar_path=COLUMNAR_PATH):
+    """
+    共有データセットを作成し、current.json を新しいバージョンに書き換える
+
+    Arrowの列指向ファイル（非圧縮）として書き出すため、各ワーカーはメモリマップでコピーせずに読み込める。
+
+    Returns:
+    --------
+    str
+        データセットのバージョン
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    from shared import atomic_write
+
+    dataset_dir = Path(dataset_dir)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    version = dataset_version(columnar_path)
+    filename = f"elections-{version}.arrow"
+
+    if not (dataset_dir / filename).exists():
+        table = pa.Table.from_pandas(build_dataset_table(columnar_path), preserve_index=False)
+        table = table.replace_schema_metadata({**table.schema.metadata, b'version': version.encode()})
+        def write_table(tmp_path):
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        atomic_write(dataset_dir / filename, write_table)
+
+    current = {'version': version, 'file': filename, 'created': time.strftime("%Y-%m-%dT%H:%M:%S")}
+    text = json.dumps(current, ensure_ascii=False, indent=2)
+    atomic_write(dataset_dir / CURRENT_NAME, lambda tmp_path: tmp_path.write_text(text, encoding="utf-8"))
+
+    # 古いバージョンのファイルを消す（Linuxではメモリマップ中のファイルを消しても読み続けられる）
+    old_files = sorted(dataset_dir.glob("elections-*.arrow"), key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for path in [path for path in old_files if path.name != filename][KEEP_VERSIONS - 1:]:
+        path.unlink(missing_ok=True)
+    return version
+
+def refresh_dataset(dataset_dir=DATASET_DIR, columnar_path=COLUMNAR_PATH):
+    """
+    共有データセットが作成済みの場合だけ作り直す（merge.py・pipeline.py が列指向ファイルを出力した後に呼ぶ）
+    """
+    if not (Path(dataset_dir) / CURRENT_NAME).exists():
+        return None
+    try:
+        version = build_dataset(dataset_dir, columnar_path)
+    except Exception as e:
+        print(f"❌ 共有データセットの作成に失敗しました: {e}")
+        return None
+    print(f"✓ 共有データセット更新: {version}")
+    return version
+
+
+class SharedDataset(Mapping):
+    """
+    共有データセットをメモリマップで読み込み、(市町村コード, 選挙種別) ごとのDataFrameを返す
+
+    Arrowの表はファイルをメモリマップしたまま保持し（全ワーカーでページキャッシュを共有する）、
+    pandasのDataFrameへの変換は初めて要求された時に表全体を一度だけ、Arrowの列のまま（pd.ArrowDtype、
+    コピーしない）行う。キーごとのDataFrameはその行の範囲を切り出したもの、全体のDataFrameは
+    府内全体の集計（ElectionDataStore.combined()）にそのまま使う。
+
+    Parameters:
+    -----------
+    path : str or Path
+        データセットのファイル（current.json が指すファイル）
+    version : str
+        データセットのバージョン
+    """
+
+    def __init__(self, path, version):
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+
+        self.path = Path(path)
+        self.version = version
+        self.table = ipc.open_file(pa.memory_map(str(self.path), "r")).read_all()
+        # 行は市町村・選挙種別の順に並んでいるため、キーごとの行の範囲を記録しておく
+        keys = self.table.select(KEY_COLUMNS).to_pandas()
+        codes = keys['municipality_code'].astype(str).to_numpy()
+        vote_types = keys['vote_type'].astype(str).to_numpy()
+        self._ranges = {}
+        start = 0
+        for index in range(1, len(codes) + 1):
+            if index == len(codes) or codes[index] != codes[start] or vote_types[index] != vote_types[start]:
+                self._ranges[(str(codes[start]), str(vote_types[start]))] = (start, index - start)
+                start = index
+        self._frame = None
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def frame(self):
+        """
+        全エントリのDataFrameを返す（市町村・選挙種別・投票日の順。'municipality_code'・'vote_type' 列を持つ）
+        """
+        with self._lock:
+            if self._frame is None:
+                self._frame = self.table.to_pandas(types_mapper=arrow_dtype)
+            return self._frame
+
+    def __getitem__(self, key):
+        frame = self._frames.get(key)
+        if frame is None:
+            offset, length = self._ranges[key]
+            frame = self.frame().iloc[offset:offset + length].reset_index(drop=True)
+            self._frames[key] = frame
+        return frame
+
+    def __iter__(self):
+        return iter(self._ranges)
+
+    def __len__(self):
+        return len(self._ranges)
+
+
+def arrow_dtype(arrow_type):
+    """Arrowの列の型に対応する pandas の型（辞書型は pandas のカテゴリ型のままにする）"""
+    import pyarrow as pa
+    return None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+
+def read_current(dataset_dir=DATASET_DIR):
+    """current.json の内容を返す（無い・壊れている場合はNone）"""
+    try:
+        with open(Path(dataset_dir) / CURRENT_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def attach_dataset(dataset_dir=DATASET_DIR):
+    """
+    現在の共有データセットを読み込む
+
+    Returns:
+    --------
+    SharedDataset or None
+        データセットが無い・読み込めない場合はNone
+    """
+    current = read_current(dataset_dir)
+    if current is None:
+        return None
+    try:
+        dataset = SharedDataset(Path(dataset_dir) / current['file'], current['version'])
+    except Exception as e:
+        print(f"❌ 共有データセットの読み込みに失敗しました: {e}")
+        return None
+    print(f"✅ 共有データセット読み込み成功: {current['file']} ({dataset.table.num_rows} 行)")
+    return dataset
+
+def main(dataset_dir: str = str(DATASET_DIR)):
+    """
+    merge.py の列指向ファイルとe-Statのデータから、ワーカー間で共有するデータセットを作成する
+    """
+    start = time.perf_counter()
+    version = build_dataset(dataset_dir)
+    dataset = attach_dataset(dataset_dir)
+    print(f"✓ 共有データセット: バージョン {version} / {len(dataset)} グループ "
+          f"({time.perf_counter() - start:.2f} 秒)")
+
+if __name__ == "__main__":
+    typer.run(main)
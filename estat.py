@@ -0,0 +1,244 @@
+import re
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import typer
+
+# e-Stat（都道府県・市区町村のすがた）からダウンロードした市区町村別の統計データ
+ESTAT_DIR = Path(__file__).parent
+ESTAT_FILES = (
+    "データ_1_人口・面積.csv",
+    "データ_2_GDP.csv",
+    "データ_3_歳入・歳出1.csv",
+    "データ_4_歳出2.csv",
+)
+
+# 解析済みのデータを保存する列指向ファイル（zstd圧縮、元のCSVより新しければこちらを読み込む）
+ESTAT_CACHE_PATH = Path(__file__).parent / "data" / "estat.feather"
+
+# 表題・公開日・空行・項目コードの4行を読み飛ばし、項目名の行を列名とする
+HEADER_SKIP_ROWS = 4
+
+# 数値が得られない（***）・該当なし（-）・秘匿（X）のセル
+MISSING_VALUES = ["***", "-", "X"]
+
+# 索引に使う列
+INDEX_COLUMNS = ['地域コード', '調査年']
+
+# "A1101_総人口【人】" → 項目コード・項目名・単位
+ITEM_PATTERN = re.compile(r"^#?[A-Z0-9]+_(.+?)(?:【(.*)】)?$")
+
+def item_name(column):
+    """
+    e-Statの列名を (項目名, 単位) に分解する
+
+    項目コードと「（市町村財政）」は取り除く（例: "D320303_民生費（市町村財政）【千円】" → ("民生費", "千円")）
+    """
+    match = ITEM_PATTERN.match(column)
+    if not match:
+        return column, ""
+    return match.group(1).replace("（市町村財政）", ""), match.group(2) or ""
+
+def read_estat_csv(path):
+    """
+    e-StatのCSVを1つ読み込み、(地域コード, 調査年) を索引とするDataFrameを返す
+
+    "***" などはNaN、桁区切りの数値はfloatに変換する。
+
+    Returns:
+    --------
+    tuple
+        (DataFrame, {項目名: 単位})
+    """
+    df = pd.read_csv(path, skiprows=HEADER_SKIP_ROWS, encoding='utf-8-sig', dtype={'地域 コード': str},
+                     na_values=MISSING_VALUES, keep_default_na=False, thousands=',')
+
+    items = {column: item_name(column) for column in df.columns[5:]}
+    result = df[list(items)].astype('float64')
+    result.columns = [name for name, _ in items.values()]
+    result.insert(0, '地域', df['地域'])
+    result.insert(0, '調査年', df['調査年'].str.extract(r'^(\d{4})', expand=False).astype('int64'))
+    result.insert(0, '地域コード', df['地域 コード'].str.zfill(5))
+    return result.set_index(INDEX_COLUMNS), dict(items.values())
+
+def build_estat_table(paths=None):
+    """
+    e-StatのCSVをすべて読み込み、(地域コード, 調査年) ごとに1行の表にまとめる
+
+    Returns:
+    --------
+    pandas.DataFrame
+        索引は (地域コード, 調査年)、列は '地域' と各項目。attrs['units'] に各項目の単位を持つ
+    """
+    paths = paths or [ESTAT_DIR / filename for filename in ESTAT_FILES]
+    tables = []
+    units = {}
+    for path in paths:
+        table, table_units = read_estat_csv(path)
+        tables.append(table)
+        units.update(table_units)
+
+    # 地域名はどのファイルにもあるため、1つの列にまとめる
+    names = pd.concat([table['地域'] for table in tables])
+    names = names[~names.index.duplicated()]
+    combined = pd.concat([table.drop(columns='地域') for table in tables], axis=1, join='outer')
+    combined.insert(0, '地域', names.reindex(combined.index).astype('category'))
+    combined = combined.sort_index()
+    combined.attrs['units'] = units
+    return combined
+
+def is_cache_fresh(cache_path, paths):
+    """列指向ファイルがすべての元のCSVより新しい場合にTrueを返す"""
+    try:
+        cache_mtime = Path(cache_path).stat().st_mtime_ns
+        return all(Path(path).stat().st_mtime_ns <= cache_mtime for path in paths)
+    except OSError:
+        return False
+
+def load_estat(cache_path=ESTAT_CACHE_PATH, paths=None):
+    """
+    e-Statの統計データを読み込む
+
+    列指向ファイルが元のCSVより新しければそれを読み込み、古い・無い場合はCSVを解析して書き直す
+    （pyarrowが無い場合は毎回CSVを解析する）。
+
+    Returns:
+    --------
+    pandas.DataFrame
+        索引は (地域コード, 調査年)
+    """
+    paths = paths or [ESTAT_DIR / filename for filename in ESTAT_FILES]
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        print("⚠️ pyarrowが見つからないため、e-StatのCSVを毎回解析します")
+        return build_estat_table(paths)
+
+    if is_cache_fresh(cache_path, paths):
+        try:
+            return feather.read_feather(cache_path).set_index(INDEX_COLUMNS)
+        except Exception as e:
+            print(f"⚠️ e-Statの列指向ファイルを読み込めないため作り直します: {e}")
+
+    # shared は requests などを読み込むため、列指向ファイルを書き直す時だけ読み込む（app の起動を遅くしない）
+    from shared import atomic_write
+
+    table = build_estat_table(paths)
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(cache_path, lambda tmp_path: table.reset_index().to_feather(tmp_path, compression='zstd'))
+    return table
+
+def region_codes(table):
+    """地域名（例: "大阪府 大阪市"）から地域コード（例: "27100"）への対応を返す"""
+    names = table['地域'].droplevel('調査年')
+    names = names[~names.index.duplicated()]
+    return {str(name): code for code, name in names.items()}
+
+def nearest_year_table(rows, items, years, max_gap=5):
+    """
+    1つの地域について、各年に最も近い調査年の値を並べた表を作成する
+
+    項目ごとに値のある調査年から選ぶ（国勢調査の項目は5年ごと、財政の項目は毎年）。
+    最も近い調査年が max_gap 年より離れている場合はNaNとする。
+
+    Parameters:
+    -----------
+    rows : pandas.DataFrame
+        load_estat() の結果から1つの地域の行を調査年順に切り出したもの
+    items : dict
+        出力する列名 -> e-Statの項目名
+    years : iterable of int
+        行とする年
+
+    Returns:
+    --------
+    pandas.DataFrame
+        索引は年（'year'）、列は items のキー
+    """
+    survey_years = rows.index.get_level_values('調査年').to_numpy(dtype='int64')
+    target = np.asarray(list(years), dtype='int64')
+    columns = {}
+    for column, item in items.items():
+        values = rows[item].to_numpy(dtype='float64')
+        valid = ~np.isnan(values)
+        columns[column] = nearest_values(survey_years[valid], values[valid], target, max_gap)
+    return pd.DataFrame(columns, index=pd.Index(target, name='year'))
+
+def nearest_values(survey_years, values, target, max_gap):
+    """
+    各年（target）に最も近い調査年の値を返す（同じ距離の場合は後の調査年、max_gap 年より離れていればNaN）
+
+    survey_years は昇順で、values はそれに対応する欠損の無い値とする。
+    """
+    if len(survey_years) == 0:
+        return np.full(len(target), np.nan)
+    # target 以上となる最初の調査年と、その1つ前の調査年のうち近い方を選ぶ
+    after = np.searchsorted(survey_years, target).clip(0, len(survey_years) - 1)
+    before = (after - 1).clip(0)
+    use_before = np.abs(target - survey_years[before]) < np.abs(survey_years[after] - target)
+    nearest = np.where(use_before, before, after)
+    gap = np.abs(survey_years[nearest] - target)
+    return np.where(gap <= max_gap, values[nearest], np.nan)
+
+def build_covariate_table(table, regions, items, years, max_gap=5):
+    """
+    選挙データに結合するための、地域ごとの年別の統計データを作成する
+
+    Parameters:
+    -----------
+    regions : dict
+        キー（例: 市町村コード "oosk"） -> e-Statの地域名（例: "大阪府 大阪市"）
+    items, years, max_gap :
+        nearest_year_table() と同じ
+
+    Returns:
+    --------
+    dict
+        キー -> nearest_year_table() の結果（地域名が見つからないキーは含めない）
+    """
+    codes = region_codes(table)
+    # 地域ごとに切り出す前に、使う項目だけに絞っておく
+    # （attrsの単位はpandasの操作のたびにdeepcopyされ遅くなるため、ここでは外す）
+    subset = table[list(dict.fromkeys(items.values()))]
+    subset.attrs = {}
+    # 索引は (地域コード, 調査年) の順に並んでいるため、地域ごとの行は二分探索で切り出せる
+    region_level = subset.index.get_level_values('地域コード').to_numpy()
+    covariates = {}
+    for key, name in regions.items():
+        if name not in codes:
+            print(f"⚠️ e-Statデータに地域が見つかりません: {name}")
+            continue
+        start = np.searchsorted(region_level, codes[name], side='left')
+        stop = np.searchsorted(region_level, codes[name], side='right')
+        covariates[key] = nearest_year_table(subset.iloc[start:stop], items, years, max_gap)
+    return covariates
+
+def join_covariates(df, covariates, year_column='year'):
+    """
+    選挙データの各行に、その年の統計データの列を追加したDataFrameを返す（元のDataFrameは書き換えない）
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        年の列を持つ選挙データ
+    covariates : pandas.DataFrame
+        nearest_year_table() の結果
+    """
+    values = covariates.reindex(pd.to_numeric(df[year_column], errors='coerce').to_numpy(dtype='float64'))
+    values.index = df.index
+    return pd.concat([df, values], axis=1)
+
+def main(rebuild: bool = False):
+    """
+    e-StatのCSVを解析して列指向ファイル（data/estat.feather）を作成する
+    """
+    if rebuild:
+        ESTAT_CACHE_PATH.unlink(missing_ok=True)
+    table = load_estat()
+    years = table.index.get_level_values('調査年')
+    print(f"✓ e-Statデータ: {table.index.get_level_values('地域コード').nunique()} 地域 / "
+          f"{years.min()} - {years.max()}年 / {len(table.columns) - 1} 項目 ({len(table)} 行)")
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -7,6 +7,8 @@ import typer
 import shared
 
 # uv run get_data.py get-data (url) (自治体名の略_西暦) と入力してください
+# まとめて取得する場合は url,name の2列のCSVを用意して
+# uv run get_data.py get-batch (CSVファイル) と入力してください
 
 app = typer.Typer()
 
@@ -18,6 +20,22 @@ def callback():
 @app.command()
 def get_data(url, name):
     typer.echo(shared.get_data(url, name)) 
+
+@app.command()
+def get_batch(manifest: str, workers: int = 4, interval: float = 1.0, retries: int = 3,
+              timeout: float = 30.0, force: bool = False):
+    """
+    url,name の2列のCSVに書かれたページをまとめて取得する（変更の無いページはスキップ）
+    """
+    entries = shared.read_manifest(manifest)
+    results = shared.get_batch(entries, workers=workers, min_interval=interval, retries=retries,
+                               timeout=timeout, force=force)
+
+    typer.echo(f"取得: {len(results['downloaded'])} 件 / 変更なし: {len(results['not_modified'])} 件 / 失敗: {len(results['failed'])} 件")
+    for name, error in results['failed']:
+        typer.echo(f"❌ {name}: {error}")
+    if results['failed']:
+        raise typer.Exit(1)
        
 if __name__ == "__main__":
     app()
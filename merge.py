@@ -1,8 +1,16 @@
-import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import re
+import contextlib
+import hashlib
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import typer
+from schema import normalize_election_frame, report_failures
+from shared import atomic_write
 
 def convert_japanese_date(date_str):
     """
@@ -13,12 +21,25 @@ def convert_japanese_date(date_str):
     - "2025/1/2" → "2025-01-02"
     - "2025-1-2" → "2025-01-02"
     - "2025年1月" → "2025-01-01" (日が無い場合は1日とする)
+    - "令和7年1月2日" → "2025-01-02" (令和・平成・昭和の和暦、"元年"にも対応)
+    
+    列全体を変換する場合はベクトル化された convert_japanese_dates を使うこと。
     """
     if pd.isna(date_str) or date_str == "":
         return None
     
     date_str = str(date_str).strip()
     
+    # 和暦形式: "令和7年1月2日"
+    era_pattern = r'(令和|平成|昭和)(\d+|元)年(\d+)月(?:(\d+)日)?'
+    match = re.match(era_pattern, date_str)
+    if match:
+        era, era_year, month, day = match.groups()
+        year = ERA_START_YEARS[era] + (1 if era_year == '元' else int(era_year)) - 1
+        month = int(month)
+        day = int(day) if day else 1
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    
     # 西暦形式: "2025年1月2日"
     year_pattern = r'(\d{4})年(\d+)月(?:(\d+)日)?'
     match = re.match(year_pattern, date_str)
@@ -52,10 +73,149 @@ def convert_japanese_date(date_str):
     # 変換できない場合は元の値を返す
     return date_str
 
+# 各元号の元年（1年目）の西暦
+ERA_START_YEARS = {'令和': 2019, '平成': 1989, '昭和': 1926}
+
+# convert_japanese_date の各形式を1つにまとめた正規表現（先頭一致）
+JAPANESE_DATE_PATTERN = (
+    r'^(?:'
+    r'(?P<era>令和|平成|昭和)(?P<era_year>\d+|元)年(?P<era_month>\d+)月(?:(?P<era_day>\d+)日)?'
+    r'|(?P<year>\d{4})(?:'
+    r'年(?P<ja_month>\d+)月(?:(?P<ja_day>\d+)日)?'
+    r'|/(?P<slash_month>\d+)/(?P<slash_day>\d+)'
+    r'|-(?P<hyphen_month>\d+)-(?P<hyphen_day>\d+)'
+    r'))'
+)
+
+def extract_date_parts(text):
+    """
+    日付文字列の列から年・月・日を読み取り、floatの配列（該当しない値はNaN）で返す
+    
+    pyarrowがある場合はArrowの正規表現（C++実装）で一括処理し、無い場合は str.extract を使う。
+    """
+    fields = ['era', 'era_year', 'year', 'era_month', 'ja_month', 'slash_month', 'hyphen_month',
+              'era_day', 'ja_day', 'slash_day', 'hyphen_day']
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        parts = text.str.extract(JAPANESE_DATE_PATTERN).astype(object)
+        era = parts['era'].map(ERA_START_YEARS).to_numpy(dtype='float64')
+        numbers = {
+            name: pd.to_numeric(parts[name].replace('元', '1'), errors='coerce').to_numpy(dtype='float64')
+            for name in fields[1:]
+        }
+        return era, numbers
+    
+    extracted = pc.extract_regex(pa.array(text.array), JAPANESE_DATE_PATTERN)
+    if isinstance(extracted, pa.ChunkedArray):
+        extracted = extracted.combine_chunks()
+    era_names = extracted.field('era')
+    era = pa.nulls(len(era_names), pa.float64())
+    for name, start_year in ERA_START_YEARS.items():
+        era = pc.if_else(pc.equal(era_names, name), float(start_year), era)
+    
+    numbers = {}
+    for name in fields[1:]:
+        values = extracted.field(name)
+        # 一致しなかった選択肢のグループは空文字になるため欠損として扱う
+        values = pc.if_else(pc.equal(values, ""), pa.scalar(None, pa.string()), values)
+        values = pc.replace_substring(values, '元', '1')
+        numbers[name] = pc.cast(values, pa.float64()).to_numpy(zero_copy_only=False)
+    return era.to_numpy(zero_copy_only=False), numbers
+
+def assemble_dates(year, month, day):
+    """
+    年・月・日のfloat配列からdatetime64[us]の配列を作る（存在しない日付や欠損はNaT）
+    """
+    result = np.full(len(year), np.datetime64('NaT', 'us'), dtype='datetime64[us]')
+    valid = ~(np.isnan(year) | np.isnan(month) | np.isnan(day))
+    valid[valid] &= (month[valid] >= 1) & (month[valid] <= 12) & (day[valid] >= 1)
+    
+    y = year[valid].astype('int64')
+    m = month[valid].astype('int64')
+    d = day[valid].astype('int64')
+    month_start = ((y - 1970) * 12 + (m - 1)).astype('datetime64[M]').astype('datetime64[D]')
+    next_month_start = ((y - 1970) * 12 + m).astype('datetime64[M]').astype('datetime64[D]')
+    days_in_month = (next_month_start - month_start).astype('int64')
+    
+    in_month = d <= days_in_month
+    positions = np.flatnonzero(valid)[in_month]
+    result[positions] = (month_start[in_month] + (d[in_month] - 1)).astype('datetime64[us]')
+    return result
+
+def convert_japanese_dates(values):
+    """
+    日付の列をまとめてdatetime64に変換する（convert_japanese_date のベクトル化版）
+    
+    1回の正規表現抽出で西暦（年月日・スラッシュ・ハイフン）と和暦（令和・平成・昭和）の
+    各形式を読み取り、年・月・日の配列から直接datetime64を組み立てる。全角の数字にも対応する。
+    どの形式にも一致しない値はpandasの日付解析に任せ、解析できなければNaTとする。
+    
+    Parameters:
+    -----------
+    values : pandas.Series
+        日付文字列の列
+    
+    Returns:
+    --------
+    pandas.Series
+        datetime64の列（元のインデックスを保持）
+    """
+    # 同じ日付が繰り返し現れることが多いため、重複を除いた値だけを変換する
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return pd.Series(pd.NaT, index=values.index, dtype='datetime64[us]')
+    # 全角の数字（"２０２５年１月２日"）はArrowの正規表現の \d に一致しないため、NFKCで半角にしてから読み取る
+    text = pd.Series(uniques, dtype=object).astype("string").str.normalize("NFKC").str.strip()
+    era_start, parts = extract_date_parts(text)
+    
+    # 和暦は元号の元年に年数を足して西暦にする
+    year = np.where(np.isnan(parts['year']), era_start + parts['era_year'] - 1, parts['year'])
+    month = parts['era_month']
+    day = parts['era_day']
+    for form in ['ja', 'slash', 'hyphen']:
+        month = np.where(np.isnan(month), parts[f'{form}_month'], month)
+        day = np.where(np.isnan(day), parts[f'{form}_day'], day)
+    # 年月のみ（日が無い）の場合は1日とする
+    day = np.where(np.isnan(day), 1.0, day)
+    
+    converted = pd.Series(assemble_dates(year, month, day))
+    
+    # どの形式にも一致しなかった値（形式が値ごとに異なるため、形式の推定の警告を出さずに1つずつ解析する）
+    unmatched = (text != "") & np.isnan(year)
+    if unmatched.any():
+        converted[unmatched] = pd.to_datetime(text[unmatched], errors='coerce', format='mixed')
+    
+    # 欠損値（codes == -1）はNaTとする
+    dates = converted.to_numpy()
+    result = np.where(codes >= 0, dates[codes], np.datetime64('NaT', 'us'))
+    return pd.Series(result.astype(converted.dtype), index=values.index)
+
+# clean_data.pyが出力する *_cleaned.csv の列構成
+CLEANED_COLUMNS = ('投票日', '告示日', '投票率', '前回投票率', '定数/候補者数', '有権者数', '男性', '女性', '前回より')
+
+# 列構成が既知のファイルの日付列（値のサンプリングを行わずにそのまま使う）
+KNOWN_DATE_COLUMNS = {
+    CLEANED_COLUMNS: ['投票日', '告示日']
+}
+
+# 未知の列構成について、ヘッダーごとに一度だけ行った検出結果
+_detected_date_columns = {}
+
 def detect_date_columns(df):
     """
     データフレーム内の日付列を自動検出
+    
+    列構成が KNOWN_DATE_COLUMNS に宣言されている場合はその日付列を返す。
+    未知の列構成は値をサンプリングして検出し、結果をヘッダーごとに記録して再利用する。
     """
+    header = tuple(str(col) for col in df.columns)
+    if header in KNOWN_DATE_COLUMNS:
+        return list(KNOWN_DATE_COLUMNS[header])
+    if header in _detected_date_columns:
+        return list(_detected_date_columns[header])
+    
     date_columns = []
     
     for col in df.columns:
@@ -68,39 +228,125 @@ def detect_date_columns(df):
         sample = df[col].dropna().head(10)
         if len(sample) > 0:
             # 日本語の日付パターンが含まれるかチェック
-            date_pattern = r'(\d{4}年|\d{4}/|\d{4}-)'
+            date_pattern = r'(?:\d{4}年|\d{4}/|\d{4}-)'
             if sample.astype(str).str.contains(date_pattern).any():
                 date_columns.append(col)
     
-    return date_columns
+    _detected_date_columns[header] = date_columns
+    return list(date_columns)
+
+# 全市町村をまとめた列指向ファイル（Arrow IPC / Feather形式、非圧縮でメモリマップ可能）
+COLUMNAR_FILENAME = "elections.feather"
 
-def merge_csv_files(directory_path, convert_dates=True, date_columns=None):
+def build_typed_frame(merged_df, city_code, data_type):
     """
-    指定ディレクトリ内のCSVファイルを条件に従って統合する
+    統合済みのDataFrameを型付きの列（schema.ELECTION_SCHEMA）に変換する
+    
+    変換できなかった値があれば、その行・列・値を出力する。
     
     Parameters:
     -----------
-    directory_path : str
-        CSVファイルが格納されているディレクトリのパス
-    convert_dates : bool
-        日付変換を行うかどうか（デフォルト: True）
-    date_columns : list or None
-        変換対象の日付列名のリスト（Noneの場合は自動検出）
+    merged_df : pandas.DataFrame
+        統合済み（日付変換済み）のDataFrame
+    city_code : str
+        市町村コード
+    data_type : str
+        データ区別符号（"a": 首長選挙, "b": 議員選挙）
+    
+    Returns:
+    --------
+    pandas.DataFrame
+    """
+    typed, failures = normalize_election_frame(merged_df, city_code, data_type)
+    report_failures(failures, f"{city_code}_{data_type}")
+    return typed
+
+def write_columnar_file(typed_frames, output_dir):
+    """
+    型付きのDataFrameを1つの列指向ファイルにまとめて出力する（pyarrowが無い場合は出力しない）
+    
+    Returns:
+    --------
+    Path or None
+        出力したファイルのパス
     """
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        print("⚠️ pyarrowが見つからないため、列指向ファイルの出力をスキップします")
+        return None
+    
+    if not typed_frames:
+        return None
+    
+    combined = pd.concat(typed_frames, ignore_index=True)
+    combined = combined.sort_values(['municipality_code', 'vote_type', 'vote_date'], ignore_index=True)
+    combined['municipality_code'] = combined['municipality_code'].astype('category')
+    combined['vote_type'] = combined['vote_type'].astype('category')
+    
+    output_path = Path(output_dir) / COLUMNAR_FILENAME
+    atomic_write(output_path, lambda tmp_path: feather.write_feather(combined, tmp_path, compression='uncompressed'))
     
+    print(f"✓ 列指向ファイル出力: {output_path.name} (合計 {len(combined)} 行)")
+    
+    # app.py が使う共有データセットを作成済みなら作り直す（各ワーカーは再起動せずに新しいバージョンを読み込む）
+    from dataset import COLUMNAR_PATH, refresh_dataset
+    if output_path.resolve() == COLUMNAR_PATH.resolve():
+        refresh_dataset()
+    return output_path
+
+# スクレイピング時のファイル名（{市町村名の略称}{西暦}{データ区別符号}、例: "kuma2012a"）
+ELECTION_NAME_PATTERN = re.compile(r"^(.+?)(\d{4})([a-z])$")
+
+def parse_election_name(name):
+    """
+    選挙データの名前を (市町村コード, 年号, データ区別符号) に分解する（形式が異なる場合はNone）
+    """
+    match = ELECTION_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2)), match.group(3)
+
+def group_election_files(file_info):
+    """
+    ファイル情報を (市町村コード, データ区別符号) ごとにまとめ、年号順にソートする
+    
+    Parameters:
+    -----------
+    file_info : list of dict
+        'city_code'・'year'・'data_type'・'filename' と、'path'（CSVのパス）または
+        'df'（読み込み済みのDataFrame）を持つファイル情報
+    """
+    # city_code と data_type でグループ化
+    groups = {}
+    for info in file_info:
+        key = (info['city_code'], info['data_type'])
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(info)
+    
+    # 各グループを年号順にソート
+    return {key: sorted(files, key=lambda x: x['year']) for key, files in sorted(groups.items())}
+
+def scan_cleaned_files(directory_path):
+    """
+    ディレクトリ内の *_cleaned.csv を (市町村コード, データ区別符号) ごとにまとめる
+    
+    Returns:
+    --------
+    dict
+        (city_code, data_type) -> 年号順にソートしたファイル情報のリスト
+    """
     # ディレクトリ内のすべてのCSVファイルを取得
     csv_files = list(Path(directory_path).glob("*_cleaned.csv"))
     
     # ファイル情報を解析して辞書に格納
     file_info = []
-    pattern = r"^(.+?)(\d{4})([a-z])_cleaned\.csv$"
     
     for file_path in csv_files:
-        match = re.match(pattern, file_path.name)
-        if match:
-            city_code = match.group(1)  # 市町村名の略称
-            year = int(match.group(2))   # 年号
-            data_type = match.group(3)   # データ区別符号
+        parsed = parse_election_name(file_path.name[:-len("_cleaned.csv")])
+        if parsed:
+            city_code, year, data_type = parsed  # 市町村名の略称・年号・データ区別符号
             
             file_info.append({
                 'path': file_path,
@@ -110,71 +356,271 @@ def merge_csv_files(directory_path, convert_dates=True, date_columns=None):
                 'filename': file_path.name
             })
     
-    # city_code と data_type でグループ化
-    groups = {}
-    for info in file_info:
-        key = (info['city_code'], info['data_type'])
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(info)
+    return group_election_files(file_info)
+
+def merge_group(files_sorted, city_code, data_type, output_dir, convert_dates=True, date_columns=None):
+    """
+    1つのグループ（市町村・データ区別符号）のCSVを結合して出力する
     
-    # 各グループを年号順にソートして統合
-    output_dir = Path(directory_path) / "merged_output"
-    output_dir.mkdir(exist_ok=True)
+    ファイル情報に 'df'（読み込み済みのDataFrame）がある場合はCSVを読まずにそれを使う。
     
-    for (city_code, data_type), files in groups.items():
-        # 年号順にソート
-        files_sorted = sorted(files, key=lambda x: x['year'])
-        
-        # DataFrameを順番に結合
-        dfs = []
-        for file_info in files_sorted:
-            df = pd.read_csv(file_info['path'])
-            dfs.append(df)
-            print(f"読み込み: {file_info['filename']} ({len(df)} 行)")
-        
-        # 縦に結合
-        merged_df = pd.concat(dfs, ignore_index=True)
+    Returns:
+    --------
+    pandas.DataFrame
+        列指向ファイル用の型付きDataFrame
+    """
+    # DataFrameを順番に結合
+    dfs = []
+    for file_info in files_sorted:
+        df = file_info['df'] if 'df' in file_info else pd.read_csv(file_info['path'])
+        dfs.append(df)
+        print(f"読み込み: {file_info['filename']} ({len(df)} 行)")
+    
+    # 縦に結合
+    merged_df = pd.concat(dfs, ignore_index=True)
+    
+    # 日付変換処理
+    if convert_dates:
+        # 日付列を自動検出または指定されたものを使用
+        if date_columns is None:
+            detected_columns = detect_date_columns(merged_df)
+        else:
+            detected_columns = [col for col in date_columns if col in merged_df.columns]
         
-        # 日付変換処理
-        if convert_dates:
-            # 日付列を自動検出または指定されたものを使用
-            if date_columns is None:
-                detected_columns = detect_date_columns(merged_df)
-            else:
-                detected_columns = [col for col in date_columns if col in merged_df.columns]
+        if detected_columns:
+            print(f"  日付変換対象列: {detected_columns}")
             
-            if detected_columns:
-                print(f"  日付変換対象列: {detected_columns}")
-                
-                for col in detected_columns:
-                    print(f"  変換中: {col}")
-                    merged_df[col] = merged_df[col].apply(convert_japanese_date)
-                    
-                    # datetime型に変換（エラーは無視）
-                    try:
-                        merged_df[col] = pd.to_datetime(merged_df[col], errors='coerce')
-                    except:
-                        pass
-        
-        # 出力ファイル名を生成
-        output_filename = f"{city_code}_{data_type}_merged.csv"
-        output_path = output_dir / output_filename
+            for col in detected_columns:
+                print(f"  変換中: {col}")
+                merged_df[col] = convert_japanese_dates(merged_df[col])
+    
+    # 出力ファイル名を生成
+    output_filename = f"{city_code}_{data_type}_merged.csv"
+    output_path = Path(output_dir) / output_filename
+    
+    # CSV出力
+    merged_df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    
+    print(f"✓ 統合完了: {output_filename} (合計 {len(merged_df)} 行)")
+    print(f"  - 統合ファイル数: {len(files_sorted)}")
+    print(f"  - 年号範囲: {files_sorted[0]['year']} - {files_sorted[-1]['year']}")
+    print()
+    
+    return build_typed_frame(merged_df, city_code, data_type)
+
+def merge_group_task(task):
+    """
+    プロセスプールで実行する1グループ分の統合処理
+    
+    ログは標準出力に直接書かず文字列として返し、呼び出し側でグループ順にまとめて出力する。
+    
+    Returns:
+    --------
+    tuple
+        ((city_code, data_type), 型付きDataFrame, ログ文字列)
+    """
+    files_sorted, city_code, data_type, output_dir, convert_dates, date_columns = task
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        typed = merge_group(files_sorted, city_code, data_type, output_dir, convert_dates, date_columns)
+    return (city_code, data_type), typed, log.getvalue()
+
+def run_merge_tasks(tasks, workers=1):
+    """
+    統合処理をグループごとに実行する（workers > 1 の場合はプロセスプールで並列に実行）
+    
+    結果は tasks と同じ順で返すため、出力内容・ログの順序はワーカー数に依存しない。
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        yield from map(merge_group_task, tasks)
+        return
+    
+    # グループ数が多い場合はまとめて渡してプロセス間通信の回数を減らす
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(merge_group_task, tasks, chunksize=chunksize)
+
+# 前回の統合時の入力ファイル情報を記録するファイル
+MANIFEST_FILENAME = "merge_manifest.json"
+
+def file_fingerprint(path):
+    """入力ファイルのサイズ・更新時刻・ハッシュ値を返す"""
+    stat = Path(path).stat()
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    }
+
+def load_manifest(output_dir):
+    """前回の統合時のマニフェストを読み込む（無い・壊れている場合は空）"""
+    manifest_path = Path(output_dir) / MANIFEST_FILENAME
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'options': None, 'groups': {}}
+    manifest.setdefault('options', None)
+    manifest.setdefault('groups', {})
+    return manifest
+
+def save_manifest(output_dir, manifest):
+    """マニフェストを書き込む（一時ファイルに書いてから置き換える）"""
+    text = json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True)
+    atomic_write(Path(output_dir) / MANIFEST_FILENAME, lambda tmp_path: tmp_path.write_text(text, encoding='utf-8'))
+
+def group_inputs(files_sorted, previous_inputs):
+    """
+    グループの入力ファイル情報を作成する
+    
+    サイズと更新時刻が前回と同じファイルはハッシュ値を計算し直さずに前回の値を使う。
+    """
+    previous = {item['filename']: item for item in previous_inputs}
+    inputs = []
+    for file_info in files_sorted:
+        stat = file_info['path'].stat()
+        old = previous.get(file_info['filename'])
+        if old is not None and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns:
+            inputs.append(old)
+        else:
+            inputs.append({'filename': file_info['filename'], **file_fingerprint(file_info['path'])})
+    return inputs
+
+def group_changed(inputs, previous_inputs):
+    """入力ファイルの構成・内容が前回から変わったかどうか（更新時刻だけの変化は無視）"""
+    if len(inputs) != len(previous_inputs):
+        return True
+    return any(
+        new['filename'] != old['filename'] or new['size'] != old['size'] or new['sha256'] != old['sha256']
+        for new, old in zip(inputs, previous_inputs)
+    )
+
+def load_existing_typed_frames(output_dir, keys):
+    """
+    再構築しないグループの型付きDataFrameを既存の出力から取得する
+    
+    列指向ファイルがあればそこから切り出し、無い・壊れている場合は統合済みCSVから作り直す。
+    """
+    frames = {}
+    columnar_path = Path(output_dir) / COLUMNAR_FILENAME
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        feather = None
+    
+    if feather is not None:
+        try:
+            existing = feather.read_feather(columnar_path, memory_map=True)
+            for (city_code, data_type), group in existing.groupby(['municipality_code', 'vote_type'], observed=True):
+                if (city_code, data_type) in keys:
+                    frames[(city_code, data_type)] = group.astype({'municipality_code': 'object', 'vote_type': 'object'})
+        except (OSError, pa.ArrowInvalid) as e:
+            if columnar_path.exists():
+                print(f"⚠️ 列指向ファイルを読み込めないため、統合済みCSVから作り直します: {e}")
+            frames = {}
+    
+    for city_code, data_type in keys:
+        if (city_code, data_type) not in frames:
+            merged_df = pd.read_csv(Path(output_dir) / f"{city_code}_{data_type}_merged.csv")
+            frames[(city_code, data_type)] = build_typed_frame(merged_df, city_code, data_type)
+    return frames
+
+def merge_csv_files(directory_path, convert_dates=True, date_columns=None, full=False, workers=1):
+    """
+    指定ディレクトリ内のCSVファイルを条件に従って統合する
+    
+    前回の統合時の入力ファイル（パス・サイズ・更新時刻・ハッシュ値）をマニフェストに記録し、
+    入力が変わったグループだけを読み込み・出力し直す。
+    
+    Parameters:
+    -----------
+    directory_path : str
+        CSVファイルが格納されているディレクトリのパス
+    convert_dates : bool
+        日付変換を行うかどうか（デフォルト: True）
+    date_columns : list or None
+        変換対象の日付列名のリスト（Noneの場合は自動検出）
+    full : bool
+        Trueの場合はマニフェストを無視してすべてのグループを統合し直す
+    workers : int
+        統合処理を並列に実行するプロセス数（1の場合は逐次実行）
+    
+    Returns:
+    --------
+    dict
+        'rebuilt'（統合し直したグループ）・'skipped'（変更が無くスキップしたグループ）・
+        'removed'（入力ファイルが無くなり、統合済みCSVを消したグループ）のキーのリスト
+    """
+    groups = scan_cleaned_files(directory_path)
+    
+    output_dir = Path(directory_path) / "merged_output"
+    output_dir.mkdir(exist_ok=True)
+    
+    # 前回と統合オプションが異なる場合は出力内容が変わるため、すべて統合し直す
+    options = {'convert_dates': convert_dates, 'date_columns': date_columns}
+    manifest = load_manifest(output_dir)
+    if full or manifest['options'] != options:
+        manifest = {'options': options, 'groups': {}}
+    
+    new_manifest = {'options': options, 'groups': {}}
+    rebuilt, skipped = [], []
+    tasks = []
+    typed_frames = {}
+    
+    for (city_code, data_type), files_sorted in groups.items():
+        group_id = f"{city_code}_{data_type}"
+        previous = manifest['groups'].get(group_id)
+        previous_inputs = previous['inputs'] if previous else []
+        inputs = group_inputs(files_sorted, previous_inputs)
+        new_manifest['groups'][group_id] = {'inputs': inputs, 'output': f"{group_id}_merged.csv"}
         
-        # CSV出力
-        merged_df.to_csv(output_path, index=False, encoding='utf-8-sig')
+        output_exists = (output_dir / f"{group_id}_merged.csv").exists()
+        if previous and output_exists and not group_changed(inputs, previous_inputs):
+            skipped.append((city_code, data_type))
+            continue
         
-        print(f"✓ 統合完了: {output_filename} (合計 {len(merged_df)} 行)")
-        print(f"  - 統合ファイル数: {len(files_sorted)}")
-        print(f"  - 年号範囲: {files_sorted[0]['year']} - {files_sorted[-1]['year']}")
-        print()
+        tasks.append((files_sorted, city_code, data_type, output_dir, convert_dates, date_columns))
+        rebuilt.append((city_code, data_type))
+    
+    for key, typed, log in run_merge_tasks(tasks, workers):
+        print(log, end='')
+        typed_frames[key] = typed
+    
+    # 入力ファイルが無くなったグループ（前回の記録、または統合済みCSVだけが残っているもの）の出力を消す
+    # （残しておくと pipeline.py の統合やアプリのCSVからの読み込みで再び使われるため）
+    previous_groups = {tuple(group_id.rsplit('_', 1)) for group_id in manifest['groups']}
+    output_groups = {
+        tuple(path.name[:-len("_merged.csv")].rsplit('_', 1)) for path in output_dir.glob("*_merged.csv")
+    }
+    removed = sorted((previous_groups | output_groups) - set(groups))
+    for city_code, data_type in removed:
+        (output_dir / f"{city_code}_{data_type}_merged.csv").unlink(missing_ok=True)
+    
+    # 全市町村をまとめた型付きの列指向ファイル（アプリや分析スクリプトから高速に読み込める）
+    columnar_exists = (output_dir / COLUMNAR_FILENAME).exists()
+    if rebuilt or removed or not columnar_exists:
+        typed_frames.update(load_existing_typed_frames(output_dir, set(skipped)))
+        write_columnar_file([typed_frames[key] for key in sorted(typed_frames)], output_dir)
+    
+    save_manifest(output_dir, new_manifest)
+    
+    print(f"統合: {len(rebuilt)} グループ / スキップ（変更なし）: {len(skipped)} グループ"
+          + (f" / 入力なし: {len(removed)} グループ" if removed else ""))
+    
+    return {'rebuilt': rebuilt, 'skipped': skipped, 'removed': removed}
 
-# 使用例
-if __name__ == "__main__":
-    # 処理対象のディレクトリパスを指定
-    target_directory = Path(__file__).parent / "data"  # ここを実際のパスに変更してください
+def main(directory: str = str(Path(__file__).parent / "data"), full: bool = False, workers: int = 1):
+    """
+    data/ 内の *_cleaned.csv を市町村・選挙種別ごとに統合する
     
+    前回から入力が変わったグループだけを統合し直す（--full ですべて統合し直す）。
+    --workers N でグループごとの統合をN個のプロセスで並列に実行する。
+    """
     # 日付列を自動検出して変換
-    merge_csv_files(target_directory, convert_dates=True)
+    merge_csv_files(directory, convert_dates=True, full=full, workers=workers)
     
-    print("すべての処理が完了しました！")
\ No newline at end of file
+    print("すべての処理が完了しました！")
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,261 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+# 環境変数 ELECTION_METRICS=1 で計測を有効にする（無効の場合、timer() は何もしない）
+# ELECTION_METRICS_LOG に出力先のパス（"-" は標準エラー出力）を指定すると、計測ごとに1行のJSONを書き出す
+METRICS_ENV = "ELECTION_METRICS"
+METRICS_LOG_ENV = "ELECTION_METRICS_LOG"
+
+# Prometheusのメトリクス名に使えない文字
+METRIC_NAME_PATTERN = re.compile(r"[^a-zA-Z0-9_]")
+
+# ヒストグラムの区切り（秒）。最後の区切りより遅いものは +Inf に数える
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """
+    処理時間の分布（区切りごとの件数・合計・最大）
+
+    Parameters:
+    -----------
+    buckets : tuple of float
+        区切りの秒数（昇順）
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """1回分の処理時間を記録する"""
+        index = 0
+        while index < len(self.buckets) and seconds > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        """件数・合計・平均・最大と、区切りごとの累積件数を返す"""
+        cumulative = []
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'buckets': cumulative,
+        }
+
+
+class _NullTimer:
+    """計測が無効な場合に timer() が返す、何もしないコンテキストマネージャ"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """with ブロックの処理時間を Metrics に記録するコンテキストマネージャ"""
+
+    __slots__ = ('metrics', 'name', 'session_id', 'start')
+
+    def __init__(self, metrics, name, session_id):
+        self.metrics = metrics
+        self.name = name
+        self.session_id = session_id
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, self.session_id, failed=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """
+    処理ごと（読み込み・整形・絞り込み・描画など）の処理時間を集計する
+
+    全体の集計と、セッションごとの集計の両方を持つ。セッションの集計は session_ended() で破棄する。
+    描画キャッシュのヒット率など、他のオブジェクトが持つ値は add_source() で登録しておき、
+    出力のたびに取得する。
+
+    Parameters:
+    -----------
+    enabled : bool
+        Falseの場合は timer() が何もしないオブジェクトを返す（計測のコストはほぼゼロ）
+    log_path : str or None
+        計測ごとに1行のJSONを書き出す先（"-" は標準エラー出力、Noneは書き出さない）
+    """
+
+    def __init__(self, enabled=False, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self._histograms = defaultdict(Histogram)  # 処理名 -> Histogram
+        self._errors = defaultdict(int)  # 処理名 -> 例外で終わった回数
+        self._sessions = {}  # セッションID -> {処理名 -> Histogram}
+        self._session_count = 0
+        self._sources = {}  # 名前 -> 値の辞書を返す関数
+        self._lock = threading.Lock()
+        self._log_file = None
+
+    def timer(self, name, session_id=None):
+        """
+        with ブロックの処理時間を name として記録する
+
+        Parameters:
+        -----------
+        name : str
+            処理名（例: "load", "render"）
+        session_id : str or None
+            セッションごとの集計にも記録する場合のセッションID
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, session_id)
+
+    def observe(self, name, seconds, session_id=None, failed=False):
+        """処理時間を1回分記録する"""
+        with self._lock:
+            self._histograms[name].observe(seconds)
+            if failed:
+                self._errors[name] += 1
+            if session_id is not None and session_id in self._sessions:
+                session = self._sessions[session_id]
+                session.setdefault(name, Histogram()).observe(seconds)
+        if self.log_path:
+            self._log({'event': 'timing', 'name': name, 'seconds': round(seconds, 6),
+                       'session': session_id, 'failed': failed})
+
+    def session_started(self, session_id):
+        """セッションの開始を記録する"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._sessions[session_id] = {}
+            self._session_count += 1
+        if self.log_path:
+            self._log({'event': 'session_started', 'session': session_id})
+
+    def session_ended(self, session_id):
+        """セッションの終了を記録し、そのセッションの集計を破棄する"""
+        if not self.enabled:
+            return
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if self.log_path and session is not None:
+            self._log({'event': 'session_ended', 'session': session_id,
+                       'timings': {name: histogram.summary()['sum'] for name, histogram in session.items()}})
+
+    def add_source(self, name, function):
+        """出力のたびに呼び出して値を取得する関数（例: PlotCache.stats）を登録する"""
+        self._sources[name] = function
+
+    def snapshot(self):
+        """
+        現在の集計を辞書で返す
+
+        Returns:
+        --------
+        dict
+            'timings'（処理名 -> Histogram.summary()）・'errors'・'active_sessions'・'total_sessions'・
+            'sessions'（セッションID -> 処理名 -> 件数・合計・最大）と、登録した各関数の値
+        """
+        with self._lock:
+            result = {
+                'timings': {name: histogram.summary() for name, histogram in sorted(self._histograms.items())},
+                'errors': dict(self._errors),
+                'active_sessions': len(self._sessions),
+                'total_sessions': self._session_count,
+                'sessions': {
+                    session_id: {
+                        name: {'count': histogram.count, 'sum': histogram.sum, 'max': histogram.max}
+                        for name, histogram in session.items()
+                    }
+                    for session_id, session in self._sessions.items()
+                },
+            }
+        for name, function in self._sources.items():
+            result[name] = function()
+        return result
+
+    def prometheus_text(self, prefix="election"):
+        """集計をPrometheusのテキスト形式で返す（セッションごとの集計は含めない）"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, summary in snapshot['timings'].items():
+            for bound, count in summary['buckets']:
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {summary["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {summary["count"]}')
+        lines.append(f"# TYPE {prefix}_stage_errors_total counter")
+        for name, count in sorted(snapshot['errors'].items()):
+            lines.append(f'{prefix}_stage_errors_total{{stage="{name}"}} {count}')
+        lines.append(f"# TYPE {prefix}_active_sessions gauge")
+        lines.append(f"{prefix}_active_sessions {snapshot['active_sessions']}")
+        lines.append(f"# TYPE {prefix}_sessions_total counter")
+        lines.append(f"{prefix}_sessions_total {snapshot['total_sessions']}")
+
+        # 登録した関数の値のうち数値のものを、"{prefix}_{名前}_{キー}" のゲージとして出力する
+        for name in self._sources:
+            for key, value in snapshot[name].items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"{prefix}_{METRIC_NAME_PATTERN.sub('_', f'{name}_{key}')} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _log(self, record):
+        """1行のJSONを書き出す"""
+        record = {'ts': round(time.time(), 3), **record}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._log_file is None:
+                self._log_file = sys.stderr if self.log_path == "-" else open(self.log_path, "a", encoding="utf-8")
+            self._log_file.write(line)
+            self._log_file.flush()
+
+
+def metrics_from_env():
+    """環境変数（ELECTION_METRICS・ELECTION_METRICS_LOG）の設定で Metrics を作成する"""
+    enabled = os.environ.get(METRICS_ENV, "").lower() in ("1", "true", "yes")
+    return Metrics(enabled=enabled, log_path=os.environ.get(METRICS_LOG_ENV) or None)
+
+
+def metrics_route(metrics, path="/metrics"):
+    """
+    集計を返すStarletteのルートを作成する
+
+    既定はPrometheusのテキスト形式で、?format=json の場合はセッションごとの集計を含むJSONを返す。
+    """
+    from starlette.responses import JSONResponse, PlainTextResponse
+    from starlette.routing import Route
+
+    async def endpoint(request):
+        if request.query_params.get("format") == "json":
+            return JSONResponse(metrics.snapshot())
+        return PlainTextResponse(metrics.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    return Route(path, endpoint)
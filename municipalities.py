@@ -0,0 +1,44 @@
+from estat import load_estat, build_covariate_table
+
+# 市町村データとコードのマッピング
+municipalities_mapping = {
+    "null": "選択なし", "oosk": "大阪市", "ski": "堺市", "tynk": "豊中市", "suita": "吹田市", "tktk": "高槻市",
+    "hrkt": "枚方市", "yo": "八尾市", "nygw": "寝屋川市", "hoska": "東大阪市", "kswd": "岸和田市",
+    "ikd": "池田市", "izmot": "泉大津市", "kizk": "貝塚市", "mrgt": "守口市", "ibrk": "茨木市",
+    "dit": "大東市", "izmi": "和泉市", "mno": "箕面市", "kswr": "柏原市", "hbkn": "羽曳野市",
+    "kdma": "門真市", "stt": "摂津市", "tkis": "高石市", "fuji": "藤井寺市", "sennan": "泉南市",
+    "sijo": "四條畷市", "kata": "交野市", "osksa": "大阪狭山市", "hannan": "阪南市", "izmsn": "泉佐野市",
+    "tdbys": "富田林市", "kwtngn": "河内長野市", "mtbr": "松原市", "smam": "島本町", "tyn": "豊能町",
+    "nose": "能勢町", "tdok": "忠岡町", "kuma": "熊取町", "tjr": "田尻町", "mski": "岬町",
+    "tis": "太子町", "kanan": "河南町", "chyaksk": "千早赤阪村"
+}
+
+# 選挙データに結合するe-Statの統計データ（統計項目名 -> e-Statの項目名）
+covariate_items = {
+    "population": "総人口",
+    "elderly_ratio": "65歳以上人口割合",
+    "fiscal_strength": "財政力指数",
+    "welfare_cost": "民生費"
+}
+
+# e-Statの地域名は「都道府県名 市町村名」（例: "大阪府 大阪市"）
+PREFECTURE_NAME = "大阪府"
+
+def load_covariate_table():
+    """
+    市町村コードごとに、各年に最も近い調査年の統計データを並べた表を作成する
+
+    Returns:
+    --------
+    dict
+        市町村コード -> 年を索引とするDataFrame（e-Statのデータが読み込めない場合は空）
+    """
+    try:
+        table = load_estat()
+    except Exception as e:
+        print(f"❌ e-Statデータの読み込みに失敗しました: {e}")
+        return {}
+    regions = {
+        code: f"{PREFECTURE_NAME} {name}" for code, name in municipalities_mapping.items() if code != "null"
+    }
+    return build_covariate_table(table, regions, covariate_items, range(1970, 2031))
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from plotting import pyplot
+
+# 府内全体の一覧に使う列
+OVERVIEW_COLUMNS = ['municipality_code', 'vote_type', 'year', 'vote_date', 'turnout_rate', 'total_voters',
+                    'turnout_change', 'candidates_per_seat']
+
+def build_turnout_table(combined):
+    """
+    全市町村・全選挙の投票率を1つの long 形式の表にまとめる
+
+    同じ年に同じ種類の選挙が複数ある場合（再選挙など）は、投票日が最も新しいものを使う。
+
+    Parameters:
+    -----------
+    combined : pandas.DataFrame or None
+        analytics.build_indicators() の結果（ElectionDataStore.combined() の結果も可。その場合、指標の列はNaN）
+
+    Returns:
+    --------
+    pandas.DataFrame
+        OVERVIEW_COLUMNS の列を持つ表
+    """
+    if combined is None or len(combined) == 0:
+        return pd.DataFrame(columns=OVERVIEW_COLUMNS)
+
+    table = combined.reindex(columns=OVERVIEW_COLUMNS)
+    table = table[table['year'].notna()].astype({
+        'municipality_code': 'str',
+        'vote_type': 'str',
+        'year': 'int64',
+        'turnout_rate': 'float64',
+        'total_voters': 'float64',
+        'turnout_change': 'float64',
+        'candidates_per_seat': 'float64'
+    })
+    table = table.sort_values(['municipality_code', 'vote_type', 'year', 'vote_date'])
+    return table.drop_duplicates(['municipality_code', 'vote_type', 'year'], keep='last').reset_index(drop=True)
+
+def select_elections(table, vote_type, year_range):
+    """選挙種別と年度範囲で一覧用の表を絞り込む"""
+    mask = (table['vote_type'] == vote_type) & table['year'].between(year_range[0], year_range[1])
+    return table[mask]
+
+def turnout_matrix(table, vote_type, year_range, municipalities):
+    """
+    市町村 × 年の投票率の表を作成する（選挙の無い年はNaN）
+
+    Parameters:
+    -----------
+    table : pandas.DataFrame
+        build_turnout_table() の結果
+    vote_type : str
+        選挙種別（"a": 首長選挙, "b": 議員選挙）
+    year_range : tuple
+        (開始年, 終了年)
+    municipalities : dict
+        市町村コード -> 市町村名（行の並び順）
+
+    Returns:
+    --------
+    pandas.DataFrame
+        索引は市町村名、列はいずれかの市町村で選挙があった年
+    """
+    selected = select_elections(table, vote_type, year_range)
+    matrix = selected.pivot(index='municipality_code', columns='year', values='turnout_rate')
+    matrix = matrix.reindex(index=list(municipalities))
+    matrix.index = [municipalities[code] for code in matrix.index]
+    return matrix
+
+def turnout_ranking(table, vote_type, year_range, municipalities):
+    """
+    年度範囲内で直近の選挙の投票率が高い順に市町村を並べる
+
+    Returns:
+    --------
+    pandas.DataFrame
+        順位・市町村・選挙年・投票率（％）・前回比（ポイント）・候補者/定数・有権者数 の列を持つ表
+    """
+    selected = select_elections(table, vote_type, year_range)
+    selected = selected[selected['municipality_code'].isin(list(municipalities))]
+    latest = selected.drop_duplicates('municipality_code', keep='last')
+    latest = latest.sort_values('turnout_rate', ascending=False, na_position='last')
+
+    return pd.DataFrame({
+        '順位': latest['turnout_rate'].rank(ascending=False, method='min').astype('Int64').array,
+        '市町村': latest['municipality_code'].map(municipalities).to_numpy(),
+        '選挙年': latest['year'].to_numpy(),
+        '投票率（％）': latest['turnout_rate'].round(2).to_numpy(),
+        '前回比（ポイント）': latest['turnout_change'].round(2).to_numpy(),
+        '候補者/定数': latest['candidates_per_seat'].round(2).to_numpy(),
+        '有権者数': latest['total_voters'].astype('Int64').array
+    })
+
+def build_overview_figure(matrix, title):
+    """
+    市町村 × 年の投票率のヒートマップ（matplotlibのFigure）を作成する
+
+    Parameters:
+    -----------
+    matrix : pandas.DataFrame
+        turnout_matrix() の結果
+    title : str
+        グラフのタイトル
+
+    Returns:
+    --------
+    matplotlib.figure.Figure
+    """
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(12, 12))
+    if matrix.shape[1] == 0:
+        ax.text(0.5, 0.5, '表示できる選挙データがありません',
+               ha='center', va='center', transform=ax.transAxes, fontsize=16, color='red')
+        ax.axis('off')
+        return fig
+
+    values = np.ma.masked_invalid(matrix.to_numpy(dtype='float64'))
+    image = ax.imshow(values, aspect='auto', cmap='YlGnBu', vmin=20, vmax=80, interpolation='nearest')
+
+    ax.set_xticks(range(matrix.shape[1]))
+    ax.set_xticklabels([str(year) for year in matrix.columns], rotation=90, fontsize=9)
+    ax.set_yticks(range(matrix.shape[0]))
+    ax.set_yticklabels(matrix.index, fontsize=9)
+    ax.set_xlabel('年', fontsize=12)
+    ax.set_title(title, fontsize=14, fontweight='bold', pad=15)
+
+    # 選挙の無い年（空白）と区別できるよう、セルの境界に線を引く
+    ax.set_xticks(np.arange(-0.5, matrix.shape[1]), minor=True)
+    ax.set_yticks(np.arange(-0.5, matrix.shape[0]), minor=True)
+    ax.grid(which='minor', color='white', linewidth=0.5)
+    ax.tick_params(which='minor', length=0)
+
+    colorbar = fig.colorbar(image, ax=ax, fraction=0.03, pad=0.02)
+    colorbar.set_label('投票率（％）', fontsize=12)
+
+    plt.subplots_adjust(top=0.94, bottom=0.08, left=0.14, right=0.95)
+    return fig
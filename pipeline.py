@@ -0,0 +1,208 @@
+import re
+import threading
+import time
+from pathlib import Path
+import pandas as pd
+import typer
+import shared
+import clean_data
+import merge
+
+# uv run pipeline.py run (CSVファイル) と入力すると、url,name の2列のCSVに書かれたページを取得し、
+# 整理・統合までを取得した表のCSVを経由せずにまとめて行います（整理済みの *_cleaned.csv は出力します）
+# 取得済みの data/*.csv から作り直す場合は uv run pipeline.py rebuild と入力してください
+
+app = typer.Typer()
+
+# 整理済みCSVを pd.read_csv で読み込んだ場合と同じ型にするための数値の形式
+INTEGER_PATTERN = re.compile(r"[+-]?\d+")
+FLOAT_PATTERN = re.compile(r"[+-]?(\d+\.\d*|\.\d+)")
+
+def table_rows(table):
+    """
+    read_htmlで読み込んだ表を、data/{name}.csv を pd.read_csv(header=None) で読み込んだ場合と同じ行の並びにする
+
+    save_table は列名を1行目に出力するため、列名も1行目のセルとして扱う。
+    """
+    yield [str(column) for column in table.columns]
+    yield from table.to_numpy(dtype=object).tolist()
+
+def infer_value(text):
+    """整理済みの値（文字列）を pd.read_csv と同じ規則で数値・欠損値に変換する"""
+    if text == '':
+        return float('nan')
+    if INTEGER_PATTERN.fullmatch(text):
+        return int(text)
+    if FLOAT_PATTERN.fullmatch(text):
+        return float(text)
+    return text
+
+def record_frame(record):
+    """
+    整理した値（clean_data.scan_election_cells の結果）を、*_cleaned.csv を読み込んだ場合と同じ1行のDataFrameにする
+    """
+    return pd.DataFrame([{label: infer_value(value) for label, value in record.items()}])
+
+def election_info(name, cleaned_df):
+    """統合処理（merge.merge_group）に渡すファイル情報を作成する（名前の形式が異なる場合はNone）"""
+    parsed = merge.parse_election_name(name)
+    if parsed is None:
+        return None
+    city_code, year, data_type = parsed
+    return {
+        'df': cleaned_df,
+        'city_code': city_code,
+        'year': year,
+        'data_type': data_type,
+        'filename': f"{name}_cleaned.csv"
+    }
+
+def merge_elections(cleaned, directory_path=shared.DATA_DIR, workers=1):
+    """
+    整理済みのDataFrameを市町村・選挙種別ごとに統合し、統合済みCSVと列指向ファイルを出力する
+
+    今回整理したデータを含むグループだけを統合し直す。グループ内の今回整理していない年のデータは
+    既存の *_cleaned.csv から読み込むため、今回整理したデータも先に *_cleaned.csv に出力しておくこと
+    （出力していない年は、次に同じグループを統合し直した時や merge.py の実行時に失われる）。
+
+    Parameters:
+    -----------
+    cleaned : dict
+        名前（例: "kuma2012a"） -> 整理済みの1行のDataFrame
+    directory_path : str or Path
+        *_cleaned.csv が格納されているディレクトリ（統合結果はその下の merged_output に出力する）
+    workers : int
+        統合処理を並列に実行するプロセス数
+
+    Returns:
+    --------
+    list
+        統合し直したグループのキーのリスト
+    """
+    file_info = []
+    for name, cleaned_df in cleaned.items():
+        info = election_info(name, cleaned_df)
+        if info is None:
+            print(f"⚠️ {name}: 名前の形式が異なるため統合しません")
+            continue
+        file_info.append(info)
+    groups = merge.group_election_files(file_info)
+
+    # 今回整理していない年のデータは既存の整理済みCSVから読み込む
+    existing_groups = merge.scan_cleaned_files(directory_path)
+    for key, files_sorted in groups.items():
+        years = {info['year'] for info in files_sorted}
+        existing = [info for info in existing_groups.get(key, []) if info['year'] not in years]
+        groups[key] = sorted(files_sorted + existing, key=lambda x: x['year'])
+
+    output_dir = Path(directory_path) / "merged_output"
+    output_dir.mkdir(exist_ok=True)
+
+    tasks = [
+        (files_sorted, city_code, data_type, output_dir, True, None)
+        for (city_code, data_type), files_sorted in groups.items()
+    ]
+    typed_frames = {}
+    for key, typed, log in merge.run_merge_tasks(tasks, workers):
+        print(log, end='')
+        typed_frames[key] = typed
+
+    # 統合し直していないグループは既存の出力から取得して、列指向ファイルを作り直す
+    skipped = {
+        tuple(path.name[:-len("_merged.csv")].rsplit('_', 1))
+        for path in output_dir.glob("*_merged.csv")
+    } - set(typed_frames)
+    typed_frames.update(merge.load_existing_typed_frames(output_dir, skipped))
+    merge.write_columnar_file([typed_frames[key] for key in sorted(typed_frames)], output_dir)
+
+    # merge.py のマニフェストに、統合し直したグループの整理済みCSVを記録する
+    # （統合結果は整理済みCSVと同じ内容から作成しているため、次回の merge.py はこのグループをスキップできる）
+    manifest = merge.load_manifest(output_dir)
+    if manifest['options'] == {'convert_dates': True, 'date_columns': None}:
+        all_groups = merge.scan_cleaned_files(directory_path)
+        for city_code, data_type in groups:
+            group_id = f"{city_code}_{data_type}"
+            previous = manifest['groups'].pop(group_id, None)
+            if (city_code, data_type) in all_groups:
+                previous_inputs = previous['inputs'] if previous else []
+                manifest['groups'][group_id] = {
+                    'inputs': merge.group_inputs(all_groups[(city_code, data_type)], previous_inputs),
+                    'output': f"{group_id}_merged.csv"
+                }
+        merge.save_manifest(output_dir, manifest)
+
+    return list(groups)
+
+def save_cleaned(record, name, directory_path=shared.DATA_DIR):
+    """
+    整理した値を {name}_cleaned.csv に出力する（clean_data.py と同じ内容）
+
+    グループを統合し直す際の他の年のデータと merge.py の入力になるため、中間ファイルを残さない場合も出力する。
+    """
+    pd.DataFrame([record]).to_csv(Path(directory_path) / f"{name}_cleaned.csv", index=False, encoding='utf-8-sig')
+
+@app.callback()
+def callback():
+    """
+    取得・整理・統合をまとめて行うパイプライン
+    """
+
+@app.command()
+def run(manifest: str, workers: int = 4, interval: float = 1.0, retries: int = 3,
+        timeout: float = 30.0, force: bool = False, keep_intermediates: bool = False):
+    """
+    url,name の2列のCSVに書かれたページを取得し、整理・統合までをメモリ上で行う
+
+    整理した結果は data/{name}_cleaned.csv に出力する（--keep-intermediates で取得した表の data/{name}.csv も出力する）。
+    変更の無いページ（304）は統合し直さない（同じグループの他のページを取得した場合は、出力済みの
+    data/{name}_cleaned.csv から統合する）。
+    """
+    start = time.perf_counter()
+    cleaned = {}
+    lock = threading.Lock()
+
+    def handle(html, name):
+        if keep_intermediates:
+            table = shared.read_table(html)
+            table.to_csv(shared.DATA_DIR / f"{name}.csv", index=False)
+            record = clean_data.scan_election_cells(table_rows(table))
+        else:
+            # 中間ファイルを出力しない場合はDataFrameを作らず、表のセルから直接読み取る
+            record = clean_data.scan_election_cells(shared.read_table_rows(html))
+        save_cleaned(record, name)
+        with lock:
+            cleaned[name] = record_frame(record)
+
+    # 変更の無いページは data/{name}_cleaned.csv から統合するため、そのファイルがあるページだけ条件付きリクエストにする
+    entries = shared.read_manifest(manifest)
+    results = shared.get_batch(entries, workers=workers, min_interval=interval, retries=retries,
+                               timeout=timeout, force=force, handler=handle,
+                               output_path=lambda name: shared.DATA_DIR / f"{name}_cleaned.csv")
+    # 取得したページを含むグループだけを統合し直す（すべて変更なしの場合は統合済みのファイルを書き換えない）
+    rebuilt = merge_elections(cleaned) if cleaned else []
+
+    typer.echo(f"取得: {len(results['downloaded'])} 件 / 変更なし: {len(results['not_modified'])} 件 / "
+               f"失敗: {len(results['failed'])} 件 / 統合: {len(rebuilt)} グループ "
+               f"({time.perf_counter() - start:.2f} 秒)")
+    for name, error in results['failed']:
+        typer.echo(f"❌ {name}: {error}")
+    if results['failed']:
+        raise typer.Exit(1)
+
+@app.command()
+def rebuild(directory: str = str(shared.DATA_DIR), workers: int = 1):
+    """
+    取得済みの data/*.csv から、整理・統合までをまとめて行う（*_cleaned.csv は出力するが、統合時に読み直さない）
+    """
+    start = time.perf_counter()
+    cleaned = {}
+    for raw_path in clean_data.find_raw_files(directory):
+        record = clean_data.scan_election_cells(pd.read_csv(raw_path, header=None))
+        save_cleaned(record, raw_path.stem, directory)
+        cleaned[raw_path.stem] = record_frame(record)
+
+    rebuilt = merge_elections(cleaned, directory, workers=workers)
+    typer.echo(f"整理: {len(cleaned)} 件 / 統合: {len(rebuilt)} グループ ({time.perf_counter() - start:.2f} 秒)")
+
+if __name__ == "__main__":
+    app()
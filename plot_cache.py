@@ -0,0 +1,133 @@
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class PlotCache:
+    """
+    描画済み画像（PNGのバイト列）を入力ごとに再利用するLRUキャッシュ
+
+    エントリ数と合計バイト数の上限を超えた場合は、最も長く使われていないものから破棄する。
+
+    Parameters:
+    -----------
+    max_entries : int
+        保持するエントリ数の上限
+    max_bytes : int
+        保持する画像の合計バイト数の上限
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # キー -> PNGのバイト列
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """キャッシュされた画像を返す（無ければNone）"""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        """画像を登録し、上限を超えた分を古い順に破棄する"""
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= len(old)
+            self._entries[key] = png
+            self._total_bytes += len(png)
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def clear(self):
+        """すべてのエントリと統計を消去する"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ヒット数・ミス数・ヒット率・使用量を返す"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+            }
+
+
+def prerender_key_text(key):
+    """
+    描画結果のキャッシュキー（app.plot_cache_key の結果）を、事前描画のマニフェストのキーとなる文字列にする
+
+    例: "oosk@1760000000000000000|a|2000-2025|turnout_rate"
+    """
+    municipalities, vote_type, year_range, metrics = key
+    codes = "+".join(f"{code}@{version}" for code, version in municipalities)
+    return f"{codes}|{vote_type}|{year_range[0]}-{year_range[1]}|{','.join(metrics)}"
+
+
+class PrerenderedImages:
+    """
+    prerender.py で事前に描画した画像（www/prerendered/）の一覧
+
+    manifest.json の内容を保持し、ファイルが更新された場合は読み込み直す。
+    キーにはデータのバージョンが含まれるため、データが更新された後は古い画像を使わない。
+
+    Parameters:
+    -----------
+    directory : str or Path
+        画像と manifest.json を置くディレクトリ
+    url_prefix : str
+        画像のURL（静的ファイルとして配信する際のパス）の先頭
+    """
+
+    manifest_name = "manifest.json"
+
+    def __init__(self, directory, url_prefix="prerendered"):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self._manifest = (None, {})  # (manifest.json のmtime, キーの文字列 -> ファイル名)
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """キャッシュキーに対応する事前描画の画像のURLを返す（無ければNone）"""
+        filename = self._images().get(prerender_key_text(key))
+        return f"{self.url_prefix}/{filename}" if filename else None
+
+    def _images(self):
+        """manifest.json の images を返す（無い・壊れている場合は空）"""
+        path = self.directory / self.manifest_name
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            if self._manifest[0] == mtime:
+                return self._manifest[1]
+        try:
+            with open(path, encoding="utf-8") as f:
+                images = json.load(f).get("images", {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 事前描画のマニフェストを読み込めません: {e}")
+            images = {}
+        with self._lock:
+            self._manifest = (mtime, images)
+        return images
@@ -0,0 +1,32 @@
+import threading
+import warnings
+
+# matplotlib（日本語フォントの登録を含む）は読み込みに時間がかかるため、初めて描画する時に読み込む
+pyplot_state = {'module': None}
+_pyplot_lock = threading.Lock()
+
+def pyplot():
+    """
+    日本語フォントを設定した matplotlib.pyplot を返す（初回のみ読み込む。複数のスレッドから呼び出してよい）
+
+    画像はPNGに変換して送るだけなので、バックエンドは画面を使わない Agg に固定する。
+    """
+    with _pyplot_lock:
+        if pyplot_state['module'] is None:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+
+            # matplotlibの警告を抑制
+            warnings.filterwarnings('ignore', category=UserWarning, module='matplotlib')
+
+            # 日本語フォントの設定
+            try:
+                import japanize_matplotlib
+            except ImportError:
+                # japanize_matplotlibがない場合は手動でフォント設定
+                # DejaVu Sansを除外し、日本語対応フォントのみを指定
+                plt.rcParams['font.sans-serif'] = ['Hiragino Sans', 'Yu Gothic', 'Meiryo', 'MS Gothic', 'Arial Unicode MS', 'sans-serif']
+                plt.rcParams['axes.unicode_minus'] = False  # マイナス記号の文字化け対策
+            pyplot_state['module'] = plt
+        return pyplot_state['module']
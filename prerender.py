@@ -0,0 +1,119 @@
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import typer
+from municipalities import municipalities_mapping
+from plot_cache import prerender_key_text
+from shared import atomic_write
+
+# uv run prerender.py と入力すると、よく表示されるグラフ（1市町村・既定の年度範囲・主な統計項目の組み合わせ）を
+# 事前に描画して www/prerendered/ に保存します。app.py は入力が一致する場合にこの画像を返します
+# データ（merge.py の出力）を更新した後は、もう一度実行してください
+
+PRERENDER_DIR = Path(__file__).parent / "www" / "prerendered"
+
+# 事前に描画する選挙種別・年度範囲（app.py の既定値）・統計項目の組み合わせ
+VOTE_TYPES = ("a", "b")
+DEFAULT_YEAR_RANGE = (2000, 2025)
+METRIC_SETS = (
+    ("turnout_rate",),
+    ("turnout_rate", "total_voters"),
+    ("total_voters", "male_voters", "female_voters"),
+    ("turnout_rate", "candidate_ratio"),
+)
+
+def image_filename(code, vote_type, key_text):
+    """画像のファイル名（キーが変われば名前も変わるため、ブラウザに古い画像が残らない）"""
+    digest = hashlib.sha1(key_text.encode("utf-8")).hexdigest()[:12]
+    return f"{code}_{vote_type}_{digest}.png"
+
+def render_municipality(task):
+    """
+    1つの市町村について、すべての選挙種別・統計項目の組み合わせのグラフを描画して保存する（ワーカープロセスで実行）
+
+    app.py の statistics_plot と同じ手順（読み込み → 統計データの結合 → 年度範囲の絞り込み → 描画）で描画する。
+
+    Parameters:
+    -----------
+    task : tuple
+        (市町村コード, 出力先ディレクトリ, 年度範囲)
+
+    Returns:
+    --------
+    list of tuple
+        (キーの文字列, ファイル名) のリスト
+    """
+    code, output_dir, year_range = task
+    # 読み込み時のメッセージはワーカーごとに出力されるため捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        from data_store import filter_years
+
+        images = []
+        for vote_type in VOTE_TYPES:
+            data = app.attach_covariates(app.data_store.get(code, vote_type), code)
+            if data is None:
+                continue
+            df = filter_years(data, year_range)
+            if df is None or len(df) == 0:
+                continue
+            valid_data = [{'code': code, 'name': app.municipalities_mapping[code], 'data': df, 'success': True}]
+            for metrics in METRIC_SETS:
+                key = app.plot_cache_key(valid_data, metrics, year_range, vote_type)
+                key_text = prerender_key_text(key)
+                filename = image_filename(code, vote_type, key_text)
+                png = app.figure_to_png(app.build_statistics_figure(valid_data, key[3], year_range, vote_type))
+                atomic_write(Path(output_dir) / filename, lambda tmp_path: tmp_path.write_bytes(png))
+                images.append((key_text, filename))
+    return images
+
+def main(output_dir: str = str(PRERENDER_DIR), workers: int = os.cpu_count() or 1,
+         year_start: int = DEFAULT_YEAR_RANGE[0], year_end: int = DEFAULT_YEAR_RANGE[1]):
+    """
+    全市町村 × 選挙種別 × 統計項目の組み合わせのグラフを並列に描画し、画像とマニフェストを出力する
+    """
+    start = time.perf_counter()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    year_range = (year_start, year_end)
+
+    codes = [code for code in municipalities_mapping if code != "null"]
+    tasks = [(code, str(output_dir), year_range) for code in codes]
+    images = {}
+    if workers > 1:
+        # app は各ワーカーで読み込む。親プロセスのスレッドやロックを引き継がないよう、fork ではなく spawn で起動する
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            for results in executor.map(render_municipality, tasks):
+                images.update(results)
+    else:
+        for task in tasks:
+            images.update(render_municipality(task))
+
+    # マニフェストを書き換えてから、どのキーからも使われなくなった画像を消す
+    manifest = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'year_range': list(year_range),
+        'metric_sets': [list(metrics) for metrics in METRIC_SETS],
+        'images': dict(sorted(images.items()))
+    }
+    text = json.dumps(manifest, ensure_ascii=False, indent=2)
+    atomic_write(output_dir / "manifest.json", lambda tmp_path: tmp_path.write_text(text, encoding="utf-8"))
+
+    used = set(images.values())
+    removed = 0
+    for path in output_dir.glob("*.png"):
+        if path.name not in used:
+            path.unlink()
+            removed += 1
+
+    print(f"✓ 事前描画: {len(codes)} 市町村 / {len(images)} 枚 (削除: {removed} 枚) "
+          f"({time.perf_counter() - start:.2f} 秒, workers={workers})")
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,193 @@
+import re
+import numpy as np
+import pandas as pd
+
+# 統合済みの選挙データ（*_merged.csv）の列と、変換後の列名・型
+# merge.pyが列指向ファイルを出力する際と、app.pyが統合済みCSVを直接読み込む際の両方で使う
+ELECTION_SCHEMA = {
+    '投票日': ('vote_date', 'datetime64[s]'),
+    '告示日': ('announcement_date', 'datetime64[s]'),
+    '投票率': ('turnout_rate', 'float32'),
+    '前回投票率': ('previous_turnout_rate', 'float32'),
+    '有権者数': ('total_voters', 'Int32'),
+    '男性': ('male_voters', 'Int32'),
+    '女性': ('female_voters', 'Int32'),
+    '前回より': ('change_from_previous', 'Int32'),
+}
+
+# "20/25" 形式の定数/候補者数の列
+SEATS_CANDIDATES_COLUMN = '定数/候補者数'
+
+# 変換後のすべての列と型（キーの列・元の列・派生列）
+TYPED_COLUMNS = {
+    'municipality_code': 'category',
+    'vote_type': 'category',
+    **{column: dtype for column, dtype in ELECTION_SCHEMA.values()},
+    'year': 'Int32',
+    'fixed_seats': 'Int32',
+    'candidate_count': 'Int32',
+    'candidate_ratio': 'float32',
+}
+
+# 数値に変換する前に取り除く文字（%・桁区切り・全角カンマ・空白）
+NUMBER_NOISE_PATTERN = re.compile(r"[%,，\s]")
+
+# 取り除いた後に数値として扱う文字列（符号・小数点・指数を含む。全角の数字は含めない）
+NUMBER_PATTERN = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+# "20/25" 形式の定数/候補者数
+SEATS_CANDIDATES_PATTERN = re.compile(r"(\d+)\s*/\s*(\d+)")
+
+DATE_SOURCES = [source for source, (_, dtype) in ELECTION_SCHEMA.items() if dtype.startswith('datetime64')]
+NUMBER_SOURCES = [source for source in ELECTION_SCHEMA if source not in DATE_SOURCES]
+
+# 変換前の列（日付の列・数値の列・定数/候補者数の列の順）
+SOURCE_COLUMNS = DATE_SOURCES + NUMBER_SOURCES + [SEATS_CANDIDATES_COLUMN]
+
+def unique_text(columns):
+    """
+    複数の元の列をつなげて重複を除き、その値を前後の空白を除いた文字列の列にする
+
+    Returns:
+    --------
+    tuple
+        (各列・各行の値が何番目の値か（NaNは -1）の (列数, 行数) の配列, 重複を除いた値の文字列の列（空欄は欠損値）)
+    """
+    values = columns[0] if len(columns) == 1 else pd.concat(columns, ignore_index=True)
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques.astype('str').str.strip()).replace("", np.nan)
+    return codes.reshape(len(columns), -1), text
+
+def take_rows(values, codes, fill):
+    """重複を除いた値の配列から各行の値を取り出す（NaNだった行は fill）"""
+    return np.append(values, np.array([fill], dtype=values.dtype))[codes]
+
+def parse_numbers(text):
+    """
+    文字列の列をfloatの配列にする（数値として読めない値はNaN）
+
+    pd.to_numeric は文字列を1つずつPythonで解析するため、NUMBER_PATTERN に一致する値だけを残して
+    文字列の列のまま一括で型変換する。
+    """
+    valid = text.str.fullmatch(NUMBER_PATTERN.pattern)
+    return text.where(valid).astype('float64').to_numpy(dtype='float64', na_value=np.nan)
+
+def normalize_election_frame(df, municipality_code=None, vote_type=None):
+    """
+    統合済みの選挙データを ELECTION_SCHEMA に従って型付きの列に変換する
+
+    日付の列・数値の列はそれぞれ1つにつなげ、重複を除いた値（同じ投票日・定数/候補者数などが
+    繰り返し現れることが多い）だけを文字列化して前後の空白を除き、その結果を変換と空欄の判定の両方に使う。
+    変換は pandas の文字列操作（str.strip・str.replace・str.fullmatch・str.extract）と型変換・to_datetime で
+    まとめて行い、セルごとのPythonの処理は行わない。read_csv が数値として読み込んだ列はそのまま使う。
+    値があるのに変換できなかったセルは NaN/NA とし、その行・列・元の値を戻り値で報告する
+    （例外で処理を止めない）。
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        統合済みのDataFrame（列名は日本語、日付は "2024-04-21" 形式）
+    municipality_code : str or None
+        市町村コード（指定した場合は 'municipality_code' 列を追加する）
+    vote_type : str or None
+        選挙種別（指定した場合は 'vote_type' 列を追加する）
+
+    Returns:
+    --------
+    tuple
+        (変換後のDataFrame, 変換できなかったセルのDataFrame（row・column・value の列）)
+    """
+    rows = len(df)
+    source = df.reindex(columns=SOURCE_COLUMNS)
+    checks = []  # (変換後の列名のリスト, 各列・各行の値の番号, 重複を除いた文字列, 変換後の値が欠損値か)
+
+    typed = {}
+    if municipality_code is not None:
+        typed['municipality_code'] = pd.Categorical([municipality_code] * rows)
+    if vote_type is not None:
+        typed['vote_type'] = pd.Categorical([vote_type] * rows)
+
+    codes, text = unique_text([source[column_name] for column_name in DATE_SOURCES])
+    dates = pd.to_datetime(text, errors='coerce').to_numpy(dtype='datetime64[s]')
+    columns = [ELECTION_SCHEMA[column_name][0] for column_name in DATE_SOURCES]
+    checks.append((columns, codes, text, np.isnat(dates)))
+    for column, column_codes in zip(columns, codes):
+        typed[column] = take_rows(dates, column_codes, np.datetime64('NaT'))
+
+    # read_csv が数値として読み込んだ列（男性・女性・前回より など）は文字列にせずそのまま使う
+    numbers = {}
+    text_sources = []
+    for column_name in NUMBER_SOURCES:
+        if pd.api.types.is_numeric_dtype(source[column_name]):
+            numbers[column_name] = source[column_name].to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            text_sources.append(column_name)
+    if text_sources:
+        codes, text = unique_text([source[column_name] for column_name in text_sources])
+        values = parse_numbers(text.str.replace(NUMBER_NOISE_PATTERN.pattern, "", regex=True))
+        checks.append(([ELECTION_SCHEMA[column_name][0] for column_name in text_sources], codes, text,
+                       np.isnan(values)))
+        for column_name, column_codes in zip(text_sources, codes):
+            numbers[column_name] = take_rows(values, column_codes, np.nan)
+    for column_name in NUMBER_SOURCES:
+        column, dtype = ELECTION_SCHEMA[column_name]
+        values = numbers[column_name]
+        typed[column] = pd.array(np.round(values), dtype=dtype) if dtype.startswith('Int') else values.astype(dtype)
+
+    codes, text = unique_text([source[SEATS_CANDIDATES_COLUMN]])
+    split = text.str.extract(SEATS_CANDIDATES_PATTERN.pattern).to_numpy(dtype='float64', na_value=np.nan)
+    seats, candidates = split[:, 0], split[:, 1]
+    checks.append((['seats_candidates'], codes, text, np.isnan(seats)))
+    seats = take_rows(seats, codes[0], np.nan)
+    candidates = take_rows(candidates, codes[0], np.nan)
+    typed['fixed_seats'] = pd.array(seats, dtype='Int32')
+    typed['candidate_count'] = pd.array(candidates, dtype='Int32')
+
+    result = pd.DataFrame(typed)
+    vote_dates = typed['vote_date']
+    year = pd.DatetimeIndex(vote_dates).year.to_numpy(dtype='float64')
+    result.insert(list(result.columns).index('vote_date') + 1, 'year',
+                  pd.array(np.where(np.isnat(vote_dates), np.nan, year), dtype='Int32'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(candidates != 0, seats / candidates, np.nan)
+    result['candidate_ratio'] = ratio.astype('float32')
+
+    return result, conversion_failures(df.index, checks)
+
+def conversion_failures(index, checks):
+    """
+    値があるのに変換できなかったセルを (row, column, value) の表で返す
+
+    判定は重複を除いた値ごとに行い、該当する値がある場合だけ行に展開する（列ごとにまとめ、元の行の順に並べる）。
+
+    Parameters:
+    -----------
+    index : pandas.Index
+        元のDataFrameの行のインデックス
+    checks : list of tuple
+        (変換後の列名のリスト, 各列・各行の値の番号（NaNは -1）, 重複を除いた前後の空白のない文字列
+        （空欄は欠損値）, 変換後の値が欠損値かどうかの配列)
+    """
+    frames = []
+    for columns, codes, text, missing in checks:
+        failed = text.notna().to_numpy() & missing
+        if not failed.any():
+            continue
+        values = text.to_numpy(dtype=object)
+        for column, column_codes in zip(columns, codes):
+            rows = take_rows(failed, column_codes, False)
+            if rows.any():
+                frames.append(pd.DataFrame({'row': index[rows], 'column': column,
+                                            'value': take_rows(values, column_codes, None)[rows]}))
+    if not frames:
+        return pd.DataFrame({'row': pd.Series(dtype='int64'), 'column': pd.Series(dtype='str'),
+                             'value': pd.Series(dtype='object')})
+    return pd.concat(frames, ignore_index=True)
+
+def report_failures(failures, label):
+    """変換できなかったセルを出力する（無ければ何もしない）"""
+    if len(failures) == 0:
+        return
+    print(f"⚠️ {label}: {len(failures)} 個の値を変換できませんでした")
+    for row in failures.head(5).itertuples(index=False):
+        print(f"    {row.row} 行目 {row.column}: {row.value!r}")
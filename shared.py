@@ -2,16 +2,330 @@ import requests
 from pathlib import Path
 from io import StringIO
 import pandas as pd
+import csv
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 
-def get_data(url, name):
+DATA_DIR = Path(__file__).parent / "data"
+
+# 条件付きリクエスト用のETag/Last-Modifiedを記録するファイル
+HTTP_CACHE_PATH = DATA_DIR / "http_cache.json"
+
+# 選挙の概要の表（投票日・投票率などの表）に含まれる文字列。ページ内でこれを含む最初の表を使う
+SUMMARY_TABLE_MATCH = "投票日"
+
+# 表を探す際にHTMLを解析する単位（文字数）。概要の表が見つかった時点で残りは解析しない
+PARSE_CHUNK_SIZE = 16 * 1024
+
+# セル内の改行と連続する空白（pd.read_html と同じ規則で1つの空白にする）
+CELL_WHITESPACE_PATTERN = re.compile(r"[\r\n]+|\s{2,}")
+
+def create_session(retries=3, backoff=1.0, pool_size=10):
+    """
+    接続を再利用し、失敗時にバックオフ付きで再試行するSessionを作成する
+
+    Parameters:
+    -----------
+    retries : int
+        再試行回数（接続エラー・429・5xxが対象）
+    backoff : float
+        再試行間隔の基準秒数（1回目はすぐに再試行し、n回目（n ≥ 2）は backoff × 2^(n-1) 秒待つ）
+    pool_size : int
+        ホストごとに保持する接続数
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class HostRateLimiter:
+    """
+    同じホストへのリクエストの間隔を min_interval 秒以上空ける（ホストが異なれば並行して取得する）
+    """
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._next_time = {}  # ホスト -> 次にリクエストしてよい時刻
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time.get(host, now))
+            self._next_time[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+def load_http_cache(path=HTTP_CACHE_PATH):
+    """条件付きリクエスト用の記録を読み込む（無い・壊れている場合は空）"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def atomic_write(path, writer):
+    """
+    書き込み途中のファイルを読まれないよう、一時ファイル（{path}.tmp）に書いてから置き換える
+
+    Parameters:
+    -----------
+    path : str or Path
+        出力するファイル
+    writer : callable
+        一時ファイルのパス（Path）を受け取り、そこに書き込む関数（失敗した場合は一時ファイルを消す）
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def save_http_cache(cache, path=HTTP_CACHE_PATH):
+    """条件付きリクエスト用の記録を書き込む（一時ファイルに書いてから置き換える）"""
+    text = json.dumps(cache, ensure_ascii=False, indent=2, sort_keys=True)
+    atomic_write(path, lambda tmp_path: tmp_path.write_text(text, encoding="utf-8"))
+
+def fetch_page(url, session=None, cache_entry=None, timeout=30):
+    """
+    ページを取得する
+
+    cache_entry（前回のETag/Last-Modified）があれば条件付きリクエストにし、
+    変更が無い場合（304）はNoneを返す。
+
+    Returns:
+    --------
+    requests.Response or None
+    """
+    session = session or create_session()
+    headers = {}
+    if cache_entry:
+        if cache_entry.get("etag"):
+            headers["If-None-Match"] = cache_entry["etag"]
+        if cache_entry.get("last_modified"):
+            headers["If-Modified-Since"] = cache_entry["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
     # utf-8でHTMLを取得
-    response = requests.get(url)
     response.encoding = 'utf-8'
+    return response
+
+def find_summary_table(html, match=SUMMARY_TABLE_MATCH):
+    """
+    HTMLを先頭から少しずつ解析し、match を含む最初の表の要素を返す
+
+    表の終わりまで解析した時点で止めるため、それより後ろの部分（候補者の一覧など）は解析しない。
+    表の中に表がある場合は外側の表を1つの表として扱う（pd.read_html で最初に見つかる表と同じ）。
+
+    Parameters:
+    -----------
+    html : str
+        ページのHTML
+    match : str or None
+        表に含まれる文字列（Noneの場合はページ内の最初の表）
 
+    Returns:
+    --------
+    lxml.etree._Element
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"), tag="table")
+    depth = 0
+    for offset in range(0, len(html) + PARSE_CHUNK_SIZE, PARSE_CHUNK_SIZE):
+        if offset < len(html):
+            parser.feed(html[offset:offset + PARSE_CHUNK_SIZE])
+        else:
+            parser.close()
+        for event, element in parser.read_events():
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0:
+                if match is None or match in element.xpath("string()"):
+                    return element
+                # 使わない表は捨ててメモリを空ける
+                element.clear()
+    raise ValueError(f"No tables found matching '{match}'")
+
+def table_rows_from_element(table):
+    """
+    表の要素を、セルの文字列の行のリストにする（pd.read_html と同じく colspan・rowspan のセルは繰り返す）
+
+    見出し（thead）・本体・フッター（tfoot）の順に並べる。数値への変換は行わない。
+    """
+    rows = (table.xpath("./thead//tr") + table.xpath(".//tbody//tr") + table.xpath("./tr")
+            + table.xpath("./tfoot//tr"))
+    all_texts = []
+    remainder = []  # (列の位置, 文字列, 残りの行数) 前の行の rowspan のセル
+    for tr in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+        for td in tr.xpath("./td|./th"):
+            while remainder and remainder[0][0] <= index:
+                prev_index, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+                index += 1
+
+            text = CELL_WHITESPACE_PATTERN.sub(" ", td.xpath("string()").strip())
+            rowspan = int(td.get("rowspan") or 1)
+            colspan = int(td.get("colspan") or 1)
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+
+        for prev_index, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    return all_texts
+
+def read_table_rows(html, match=SUMMARY_TABLE_MATCH):
+    """
+    HTML内の選挙の概要の表を、セルの文字列の行のリストとして返す
+
+    DataFrameを作らないため、clean_data.scan_election_cells に直接渡す場合はこちらを使う。
+    """
+    return table_rows_from_element(find_summary_table(html, match))
+
+def read_table(html, match=SUMMARY_TABLE_MATCH):
+    """
+    HTML内の選挙の概要の表をDataFrameとして返す
+
+    ページ全体ではなく、find_summary_table で切り出した表だけを pd.read_html で読み込む
+    （data/{name}.csv に出力する内容はページ全体を読み込んだ場合と同じ）。
+    """
+    table = find_summary_table(html, match)
     # pandasでテーブルを読み込みリストに格納
-    tables = pd.read_html(StringIO(response.text))
+    tables = pd.read_html(StringIO(etree.tostring(table, encoding="unicode", method="html")))
 
     # テーブルリストからデータフレームを取得
-    df = tables[0]
+    return tables[0]
+
+def save_table(html, name):
+    """HTML内の最初のテーブルを data/{name}.csv に出力する"""
+    df = read_table(html)
     # csvファイルに出力
-    df.to_csv(Path(__file__).parent / f"data/{name}.csv", index=False)
\ No newline at end of file
+    df.to_csv(DATA_DIR / f"{name}.csv", index=False)
+
+def get_data(url, name, session=None, timeout=30):
+    response = fetch_page(url, session=session, timeout=timeout)
+    save_table(response.text, name)
+
+def read_manifest(manifest_path):
+    """
+    取得対象の一覧（url,name の2列のCSV）を読み込む
+
+    Returns:
+    --------
+    list of tuple
+        (url, name) のリスト
+    """
+    with open(manifest_path, encoding="utf-8-sig", newline="") as f:
+        rows = [row for row in csv.DictReader(f) if row.get("url") and row.get("name")]
+    return [(row["url"].strip(), row["name"].strip()) for row in rows]
+
+def raw_table_path(name):
+    """get_batch の既定の出力先（data/{name}.csv）"""
+    return DATA_DIR / f"{name}.csv"
+
+def get_batch(entries, workers=4, min_interval=1.0, retries=3, timeout=30, force=False,
+              cache_path=HTTP_CACHE_PATH, handler=save_table, output_path=raw_table_path, backoff=1.0):
+    """
+    複数のページをまとめて取得し、それぞれ data/{name}.csv に出力する
+
+    接続はSessionで再利用し、ホストごとに min_interval 秒以上の間隔を空けながら並行して取得する。
+    前回のETag/Last-Modifiedを記録しておき、変更の無いページはダウンロードしない。
+
+    Parameters:
+    -----------
+    entries : list of tuple
+        (url, name) のリスト
+    workers : int
+        同時に取得するスレッド数
+    min_interval : float
+        同じホストへのリクエスト間隔（秒）
+    retries : int
+        失敗時の再試行回数
+    backoff : float
+        再試行間隔の基準秒数（create_session の backoff）
+    timeout : float
+        1リクエストのタイムアウト（秒）
+    force : bool
+        Trueの場合は条件付きリクエストを使わずにすべて取得し直す
+    handler : callable
+        取得したHTMLと名前を受け取る関数（デフォルトは data/{name}.csv に出力する save_table）
+    output_path : callable
+        名前を受け取り、handler が出力するファイルのパスを返す関数。このファイルが残っている
+        ページだけ条件付きリクエストにする（304の場合は、呼び出し側がこのファイルを使う）
+
+    Returns:
+    --------
+    dict
+        'downloaded'・'not_modified'・'failed'（(name, エラー内容) のリスト）
+    """
+    cache = load_http_cache(cache_path)
+    cache_lock = threading.Lock()
+    limiter = HostRateLimiter(min_interval)
+    session = create_session(retries=retries, backoff=backoff, pool_size=max(workers, 1))
+    results = {"downloaded": [], "not_modified": [], "failed": []}
+
+    def fetch(entry):
+        url, name = entry
+        output_exists = Path(output_path(name)).exists()
+        with cache_lock:
+            cache_entry = None if force or not output_exists else cache.get(url)
+        limiter.wait(url)
+        try:
+            response = fetch_page(url, session=session, cache_entry=cache_entry, timeout=timeout)
+            if response is None:
+                return "not_modified", name
+            handler(response.text, name)
+        except Exception as e:
+            return "failed", (name, str(e))
+        with cache_lock:
+            cache[url] = {
+                "name": name,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+        return "downloaded", name
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for status, value in executor.map(fetch, entries):
+                results[status].append(value)
+    finally:
+        session.close()
+        save_http_cache(cache, cache_path)
+
+    return results
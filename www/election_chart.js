@@ -0,0 +1,177 @@
+// ブラウザ描画モードのグラフ（app.pyの build_chart_payload から送られる系列データを描画する）
+// 年度範囲の変更とズームはブラウザ側だけで処理し、サーバーには描画を依頼しない。
+(function () {
+  var CHART_ID = "election_chart";
+  var MARKERS = ["circle", "square"];      // 市町村1: 丸、市町村2: 四角
+  var DASHES = ["solid", "dash"];          // 市町村1: 実線、市町村2: 破線
+  var SEAT_COLORS = ["#808080", "#b0b0b0"]; // 定数（市町村1: 濃いグレー、市町村2: 薄いグレー）
+  var BAR_WIDTH = 0.3;
+  var COVARIATE_HEIGHT = 0.18;             // 統計データ（人口・財政）の段の高さ（グラフ全体に対する割合）
+  var COVARIATE_GAP = 0.06;                // 段の間隔
+  // Plotly はブラウザ描画モードで最初にデータを受け取った時に読み込む（画像モードだけの利用では読み込まない）
+  var PLOTLY_SRC = "https://cdn.plot.ly/plotly-2.35.2.min.js";
+  var plotlyRequested = false;
+
+  var lastPayload = null;
+  var yearRange = null;
+
+  function xRange() {
+    return [yearRange[0] - 0.5, yearRange[1] + 0.5];
+  }
+
+  // 統計データの段の縦軸名（"y3", "y4", ...。上の段から順に割り当てる）
+  function covariateAxis(payload, metric) {
+    var index = (payload.covariates || []).indexOf(metric);
+    return index === -1 ? null : "y" + (index + 3);
+  }
+
+  function buildTraces(payload) {
+    var traces = [];
+    var count = payload.municipalities.length;
+
+    payload.metrics.forEach(function (metric) {
+      payload.municipalities.forEach(function (municipality, idx) {
+        var series = municipality.series;
+        var color = payload.colors[metric][idx];
+
+        if (metric === "candidate_ratio") {
+          // 棒グラフで表示（候補者数と定数を重ねる）
+          if (!series.candidate_count || !series.fixed_seats) {
+            return;
+          }
+          var offset = count === 2 ? (idx - 0.5) * BAR_WIDTH : 0;
+          var x = series.year.map(function (year) { return year + offset; });
+          traces.push({
+            type: "bar", x: x, y: series.candidate_count, yaxis: "y2",
+            width: BAR_WIDTH, opacity: 0.6, marker: { color: color },
+            name: municipality.name + " - 候補者数"
+          });
+          traces.push({
+            type: "bar", x: x, y: series.fixed_seats, yaxis: "y2",
+            width: BAR_WIDTH, opacity: 0.8, marker: { color: SEAT_COLORS[idx] },
+            name: municipality.name + " - 定数"
+          });
+          return;
+        }
+
+        if (!series[metric]) {
+          return;
+        }
+        // 投票率は左軸、有権者数は右軸、統計データはそれぞれの段に線グラフで表示
+        var axis = covariateAxis(payload, metric) || (metric === "turnout_rate" ? "y" : "y2");
+        traces.push({
+          type: "scatter", mode: "lines+markers",
+          x: series.year, y: series[metric],
+          yaxis: axis,
+          line: { color: color, width: 2.5, dash: DASHES[idx] },
+          marker: { color: color, size: 7, symbol: MARKERS[idx] },
+          name: municipality.name + " - " + payload.labels[metric]
+        });
+      });
+    });
+
+    return traces;
+  }
+
+  function buildTitle(payload) {
+    var names = payload.municipalities.map(function (m) { return m.name; }).join(" & ");
+    return names + " - " + payload.vote_type_name + "データの推移（" +
+      yearRange[0] + "年 - " + yearRange[1] + "年）";
+  }
+
+  // Plotly を読み込み、読み込み終わったら描画する（読み込み済み・読み込み中なら何もしない）
+  function loadPlotly() {
+    if (plotlyRequested) {
+      return;
+    }
+    plotlyRequested = true;
+    var script = document.createElement("script");
+    script.src = PLOTLY_SRC;
+    script.onload = render;
+    document.head.appendChild(script);
+  }
+
+  function render() {
+    var element = document.getElementById(CHART_ID);
+    if (!element || !lastPayload) {
+      return;
+    }
+    if (typeof Plotly === "undefined") {
+      loadPlotly();
+      return;
+    }
+
+    var payload = lastPayload;
+    if (payload.municipalities.length === 0 || payload.metrics.length === 0) {
+      var message = payload.municipalities.length === 0 ? "市町村を選択してください" : "統計項目を選択してください";
+      Plotly.react(element, [], {
+        xaxis: { visible: false }, yaxis: { visible: false },
+        annotations: [{ text: message, showarrow: false, font: { size: 16, color: "red" } }]
+      }, { responsive: true });
+      return;
+    }
+
+    var layout = {
+      title: { text: buildTitle(payload), font: { size: 16 } },
+      barmode: "overlay",
+      xaxis: { title: { text: "年" }, range: xRange(), rangeslider: { visible: true } },
+      yaxis: { showgrid: true },
+      yaxis2: {
+        title: { text: "有権者数 (人)" }, overlaying: "y", side: "right",
+        tickformat: ",d", showgrid: false
+      },
+      legend: { orientation: "h", y: 1.15 },
+      margin: { t: 120 }
+    };
+    // 統計データは単位が異なるため、グラフの下に項目ごとの段を設ける
+    var covariates = payload.covariates || [];
+    if (covariates.length > 0) {
+      var step = COVARIATE_HEIGHT + COVARIATE_GAP;
+      layout.yaxis.domain = [covariates.length * step, 1];
+      covariates.forEach(function (metric, index) {
+        var top = (covariates.length - index) * step - COVARIATE_GAP;
+        layout["yaxis" + (index + 3)] = {
+          domain: [top - COVARIATE_HEIGHT, top], anchor: "x",
+          title: { text: payload.labels[metric], font: { size: 11 } }, showgrid: true
+        };
+      });
+      layout.xaxis.rangeslider.visible = false;
+      layout.height = 700 + 150 * covariates.length;
+    }
+    if (payload.metrics.indexOf("turnout_rate") !== -1) {
+      // 投票率の縦軸は20-80%に固定
+      layout.yaxis.title = { text: "投票率（％）", font: { color: "#2563eb" } };
+      layout.yaxis.tickfont = { color: "#2563eb" };
+      layout.yaxis.range = [20, 80];
+    }
+
+    Plotly.react(element, buildTraces(payload), layout, { responsive: true });
+  }
+
+  // 年度範囲スライダーの変更はサーバーを介さずに表示範囲だけを変更する
+  $(document).on("shiny:inputchanged", function (event) {
+    if (event.name !== "year_range" || !event.value) {
+      return;
+    }
+    yearRange = event.value;
+    var element = document.getElementById(CHART_ID);
+    if (lastPayload && element && element.data) {
+      Plotly.relayout(element, { "xaxis.range": xRange(), "title.text": buildTitle(lastPayload) });
+    }
+  });
+
+  var registered = false;
+  $(document).on("shiny:connected", function () {
+    if (registered) {
+      return;
+    }
+    registered = true;
+    Shiny.addCustomMessageHandler("election_chart", function (payload) {
+      lastPayload = payload;
+      if (yearRange === null) {
+        yearRange = payload.year_range;
+      }
+      render();
+    });
+  });
+})();